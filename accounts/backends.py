@@ -0,0 +1,36 @@
+"""Authentication backend caching the signed-in user.
+
+AuthenticationMiddleware loads ``request.user`` through the backend's
+``get_user`` on every request. ``CachedModelBackend`` keeps the loaded
+UserProfile in the cache for ``USER_TIMEOUT`` seconds, so with the cached
+sessions (SESSION_ENGINE in settings) a signed-in page view runs no auth
+queries once both are warm. Saving or deleting a user drops its entry on
+commit (accounts/signals.py); the timeout bounds how long bulk updates,
+which skip the signals, can go unseen. Settings use plain ModelBackend when
+those drops would not reach every process (see parkeasy/cacheprofiles.py).
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+USER_TIMEOUT = 60
+
+
+def user_key(user_id) -> str:
+    return f'user:{user_id}'
+
+
+def forget_user(user_id) -> None:
+    """Drop the cached user once the current transaction commits."""
+    transaction.on_commit(lambda: cache.delete(user_key(user_id)))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_TIMEOUT)
+        return user
@@ -0,0 +1,143 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.templatetags.static import static
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from owner import slots as slot_ops
+from owner.models import ParkingPlace
+from parkeasy import loadtest, metrics
+from parkeasy.bench import bench_users
+
+# (name, role, path) of pages extending templates/base.html and the static
+# files they link to; {place} is the benchmark's place.
+PAGES = (
+    ('home', None, '/'),
+    ('login', None, '/accounts/login/'),
+    ('customer_home', 'customer', '/customer/'),
+    ('search', 'customer', '/customer/search/?city=Pune'),
+    ('place_detail', 'customer', '/customer/place/{place}/'),
+    ('my_bookings', 'customer', '/customer/my-bookings/'),
+    ('owner_home', 'place_owner', '/owner/'),
+    ('owner_bookings', 'place_owner', '/owner/bookings/'),
+)
+ASSETS = ('css/style.css', 'images/imgi_2.png')
+
+
+class Command(BaseCommand):
+    help = (
+        'Fetch the pages built on templates/base.html and their static files as a browser '
+        'accepting gzip and brotli would, and report bytes transferred, latency and template render time.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per page')
+        parser.add_argument('--accept-encoding', default='gzip, deflate, br', help='Accept-Encoding sent with each request')
+        parser.add_argument('--output', help='Also save the JSON report to this file')
+        parser.add_argument('--compare', help='Show the change against a report saved with --output')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **opts):
+        if opts['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        baseline = self._load_json(opts['compare']) if opts['compare'] else None
+        with bench_users() as (owner, customer):
+            place = ParkingPlace.objects.create(
+                owner=owner, name='Bench pages lot', address='-', area='Baner', city='Pune', price_per_hour=40,
+                description='Covered parking', latitude=18.52, longitude=73.85,
+            )
+            slot_ops.create_slots(place, slot_ops.expand_codes('P1-20'))
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                clients = self._clients(opts['accept_encoding'], {'customer': customer, 'place_owner': owner})
+                report = {
+                    'recorded_at': timezone.now().isoformat(),
+                    'profile': settings.SITE_PROFILE.name,
+                    'accept_encoding': opts['accept_encoding'],
+                    'pages': self._measure(clients, place, opts['requests']),
+                }
+        report['total_bytes'] = sum(page['bytes'] for page in report['pages'].values())
+        if opts['output']:
+            Path(opts['output']).write_text(json.dumps(report, indent=2))
+        if opts['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        self._print(report, baseline)
+
+    def _clients(self, accept_encoding, users) -> dict:
+        from parkeasy.wsgi import application
+
+        # runserver serves static files itself while DEBUG is on.
+        app = StaticFilesHandler(application) if settings.DEBUG else application
+        headers = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding else {}
+        clients = {None: loadtest.WSGIClient(app, headers=headers)}
+        for role, user in users.items():
+            clients[role] = loadtest.WSGIClient(app, headers=headers)
+            try:
+                clients[role].login(user.username, 'bench-pass')
+            except loadtest.LoadTestError as exc:
+                raise CommandError(str(exc))
+        return clients
+
+    def _measure(self, clients, place, count: int) -> dict:
+        targets = [(name, role, path.format(place=place.pk)) for name, role, path in PAGES]
+        targets += [(asset, None, static(asset)) for asset in ASSETS]
+        pages = {}
+        for name, role, path in targets:
+            client = clients[role]
+            status, headers, size = client.request('GET', path)
+            if status != 200:
+                raise CommandError(f'GET {path} answered HTTP {status}.')
+            latencies, renders = [], []
+            for _ in range(count):
+                _, rendered_before = metrics.TEMPLATE_TIME.total()
+                started = time.perf_counter()
+                client.request('GET', path)
+                latencies.append(time.perf_counter() - started)
+                renders.append(metrics.TEMPLATE_TIME.total()[1] - rendered_before)
+            headers = {key.lower(): value for key, value in headers.items()}
+            pages[name] = {
+                'path': path,
+                'bytes': size,
+                'encoding': headers.get('content-encoding', 'identity'),
+                'cache_control': headers.get('cache-control', ''),
+                'p50_ms': round(statistics.median(latencies) * 1000, 2),
+                'template_ms': round(statistics.median(renders) * 1000, 2),
+            }
+        return pages
+
+    def _load_json(self, path) -> dict:
+        try:
+            return json.loads(Path(path).read_text())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'{path}: {exc}')
+
+    def _print(self, report, baseline):
+        pages = report['pages']
+        width = max(len(name) for name in pages)
+        self.stdout.write(f'Profile {report["profile"]}, Accept-Encoding: {report["accept_encoding"] or "-"}')
+        self.stdout.write(f'{"page":<{width}} {"bytes":>8} {"encoding":>9} {"p50 ms":>8} {"render ms":>10}  cache-control')
+        for name, page in pages.items():
+            self.stdout.write(
+                f'{name:<{width}} {page["bytes"]:>8} {page["encoding"]:>9} {page["p50_ms"]:>8} '
+                f'{page["template_ms"]:>10}  {page["cache_control"] or "-"}'
+            )
+        self.stdout.write(f'{"total":<{width}} {report["total_bytes"]:>8}')
+        if baseline is None:
+            return
+        self.stdout.write(f'\nAgainst the {baseline.get("profile", "baseline")} profile:')
+        for name, page in pages.items():
+            before = baseline['pages'].get(name)
+            if before is None:
+                continue
+            changes = []
+            for metric in ('bytes', 'p50_ms', 'template_ms'):
+                old, new = before[metric], page[metric]
+                delta = f'{(new - old) / old * 100:+.1f}%' if old else 'n/a'
+                changes.append(f'{metric} {old} -> {new} ({delta})')
+            self.stdout.write(f'{name:<{width}} ' + ', '.join(changes))
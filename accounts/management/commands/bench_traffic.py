@@ -0,0 +1,141 @@
+import json
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from customer.models import Booking
+from owner import slots as slot_ops
+from owner.models import ParkingPlace
+from parkeasy import loadtest
+from parkeasy.bench import bench_users
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a JSONL request stream (or a synthetic one) against the WSGI app in-process '
+        'and report latency percentiles and throughput per endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--traffic', help='JSONL request stream to replay (default: synthetic traffic)')
+        parser.add_argument('--requests', type=int, default=2000, help='Size of the synthetic stream')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the synthetic stream')
+        parser.add_argument('--save-traffic', help='Write the synthetic stream to this JSONL file')
+        parser.add_argument('--threads', type=int, default=8, help='Threads per process')
+        parser.add_argument('--processes', type=int, default=1, help='Forked worker processes')
+        parser.add_argument('--warmup', type=int, default=50, help='Untimed requests replayed first')
+        parser.add_argument('--customer', help='Log in as this existing customer instead of a throwaway one')
+        parser.add_argument('--owner', help='Log in as this existing place owner instead of a throwaway one')
+        parser.add_argument('--password', default='', help='Password of --customer and --owner')
+        parser.add_argument('--slots', type=int, default=20, help='Slots of the throwaway place')
+        parser.add_argument('--output', help='Also save the JSON report to this file')
+        parser.add_argument('--compare', help='Show the change against a report saved with --output')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **opts):
+        baseline = self._load_json(opts['compare']) if opts['compare'] else None
+        entries = self._traffic(opts)
+        if opts['customer'] or opts['owner']:
+            if not (opts['customer'] and opts['owner'] and opts['password']):
+                raise CommandError('--customer, --owner and --password go together.')
+            User = get_user_model()
+            owner, customer = self._user(opts['owner'], User.ROLE_OWNER), self._user(opts['customer'], User.ROLE_CUSTOMER)
+            report = self._run(entries, owner, customer, opts['password'], opts)
+        else:
+            with bench_users() as (owner, customer):
+                place = ParkingPlace.objects.create(
+                    owner=owner, name='Bench traffic lot', address='-', area='Baner', city='Pune', price_per_hour=40,
+                    description='Covered parking', latitude=18.52, longitude=73.85,
+                )
+                slot_ops.create_slots(place, slot_ops.expand_codes(f'T1-{opts["slots"]}'))
+                report = self._run(entries, owner, customer, 'bench-pass', opts)
+
+        if opts['output']:
+            Path(opts['output']).write_text(json.dumps(report, indent=2))
+        if opts['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        self._print(report, baseline)
+
+    def _traffic(self, opts) -> list[dict]:
+        if opts['traffic']:
+            try:
+                with open(opts['traffic']) as f:
+                    return loadtest.read_traffic(f)
+            except (OSError, loadtest.LoadTestError) as exc:
+                raise CommandError(f'{opts["traffic"]}: {exc}')
+        entries = loadtest.synthetic_traffic(opts['requests'], opts['seed'])
+        if opts['save_traffic']:
+            with open(opts['save_traffic'], 'w') as f:
+                f.writelines(json.dumps(entry) + '\n' for entry in entries)
+        return entries
+
+    def _user(self, username, role):
+        try:
+            return get_user_model().objects.get(username=username, role=role)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No {role} named {username!r}.')
+
+    def _run(self, entries, owner, customer, password, opts) -> dict:
+        place = ParkingPlace.objects.filter(owner=owner).order_by('id').first()
+        slot = place.slots.order_by('id').first() if place else None
+        booking = Booking.objects.filter(customer=customer).order_by('-id').first()
+        ids = {'place': place and place.pk, 'slot': slot and slot.pk, 'booking': booking and booking.pk}
+        credentials = {'customer': (customer.username, password), 'place_owner': (owner.username, password)}
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                if opts['warmup']:
+                    loadtest.replay(entries[:opts['warmup']], credentials, ids, threads=1)
+                results, elapsed = loadtest.run(entries, credentials, ids, opts['threads'], opts['processes'])
+        except loadtest.LoadTestError as exc:
+            raise CommandError(str(exc))
+        return {
+            'commit': self._commit(),
+            'recorded_at': timezone.now().isoformat(),
+            'traffic': opts['traffic'] or f'synthetic:{opts["requests"]}:{opts["seed"]}',
+            'threads': opts['threads'],
+            'processes': opts['processes'],
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            **loadtest.report(results, elapsed),
+        }
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _load_json(self, path) -> dict:
+        try:
+            return json.loads(Path(path).read_text())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'{path}: {exc}')
+
+    def _print(self, report, baseline):
+        total = report['total']
+        self.stdout.write(
+            f'{total["count"]} requests in {total["elapsed_s"]}s: {total["throughput_rps"]} req/s, '
+            f'p50 {total["p50_ms"]}ms, p95 {total["p95_ms"]}ms, p99 {total["p99_ms"]}ms, '
+            f'{report["server_errors"]} server errors'
+        )
+        width = max(len(name) for name in report['endpoints']) if report['endpoints'] else 0
+        self.stdout.write(f'{"endpoint":<{width}} {"count":>6} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8}  statuses')
+        for name, stats in report['endpoints'].items():
+            self.stdout.write(
+                f'{name:<{width}} {stats["count"]:>6} {stats["throughput_rps"]:>8} {stats["p50_ms"]:>8} '
+                f'{stats["p95_ms"]:>8} {stats["p99_ms"]:>8}  {stats["statuses"]}'
+            )
+        if baseline is None:
+            return
+        self.stdout.write(f'\nAgainst {baseline.get("commit") or "baseline"}:')
+        for name, metric, old, new, change in loadtest.compare(report, baseline):
+            delta = 'n/a' if change is None else f'{change:+.1f}%'
+            self.stdout.write(f'{name:<{width}} {metric:>15} {old:>10} -> {new:<10} {delta}')
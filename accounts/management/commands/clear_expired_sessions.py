@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.sessions import DEFAULT_BATCH_SIZE, clear_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in batches (a gentler clearsessions for a busy SQLite database).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **opts):
+        started = time.perf_counter()
+        deleted, batches = clear_expired(opts['batch_size'], opts['pause'])
+        self.stdout.write(f'deleted={deleted} batches={batches} duration={(time.perf_counter() - started) * 1000:.0f}ms')
@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from parkeasy.replicas import replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the SQLite primary into the SQLite read replicas (PARKEASY_DB_REPLICAS), '
+        'standing in for replication when testing locally.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Keep copying every this many seconds, simulating replication lag',
+        )
+
+    def handle(self, *args, **opts):
+        primary = connections[DEFAULT_DB_ALIAS].settings_dict
+        replicas = [connections[alias].settings_dict for alias in replica_aliases()]
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or not replicas:
+            raise CommandError('Needs the SQLite profile with PARKEASY_DB_REPLICAS set.')
+        while True:
+            started = time.perf_counter()
+            source = sqlite3.connect(primary['NAME'])
+            try:
+                for replica in replicas:
+                    target = sqlite3.connect(replica['NAME'])
+                    try:
+                        source.backup(target)
+                    finally:
+                        target.close()
+            finally:
+                source.close()
+            self.stdout.write(f'Copied to {len(replicas)} replica(s) in {time.perf_counter() - started:.2f}s.')
+            if not opts['interval']:
+                return
+            time.sleep(opts['interval'])
@@ -0,0 +1,40 @@
+"""Batched removal of expired database sessions.
+
+Django's ``clearsessions`` deletes every expired row in one statement,
+which holds SQLite's write lock for as long as that takes. ``clear_expired``
+deletes them ``batch_size`` at a time, each batch a range on the
+``expire_date`` index and its own transaction, so bookings get the lock
+between batches. Cached copies of the sessions expire with them.
+"""
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def clear_expired(batch_size: int = DEFAULT_BATCH_SIZE, pause: float = 0.0, now=None) -> tuple[int, int]:
+    """Delete expired sessions; returns ``(deleted, batches)``.
+
+    Engines without a session model clear themselves in one call.
+    """
+    store = import_module(settings.SESSION_ENGINE).SessionStore
+    if not hasattr(store, 'get_model_class'):
+        store.clear_expired()
+        return 0, 1
+    model = store.get_model_class()
+    now = now or timezone.now()
+    deleted = batches = 0
+    while True:
+        with transaction.atomic():
+            keys = list(model.objects.filter(expire_date__lt=now).values_list('session_key', flat=True)[:batch_size])
+            if keys:
+                deleted += model.objects.filter(session_key__in=keys).delete()[0]
+        batches += 1
+        if len(keys) < batch_size:
+            return deleted, batches
+        if pause:
+            time.sleep(pause)
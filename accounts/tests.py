@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from parkeasy.testing import PASSWORD, Budget, QueryBudgetMixin, shared_seed
+from .sessions import clear_expired
+
+
+# The budgets cover the views, not the (deliberately slow) production hasher.
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AccountViewBudgetTests(QueryBudgetMixin, TestCase):
+    urls_module = 'accounts.urls'
+    budgets = {
+        'home': Budget(queries=0),
+        'login': Budget(queries=9),
+        'signup': Budget(queries=5),
+        'redirect_after_login': Budget(queries=1),
+        'custom_logout': Budget(queries=3),
+        'select_role': Budget(queries=1),
+    }
+
+    def test_home(self):
+        self.assertWithinBudget('home')
+
+    def test_login(self):
+        self.assertWithinBudget('login')
+
+    def test_login_post(self):
+        customer = self.seed.customer
+        customer.set_password(PASSWORD)
+        customer.save(update_fields=['password'])
+        self.assertWithinBudget('login', method='post', status=302, data={
+            'username': customer.username, 'password': PASSWORD,
+        })
+
+    def test_signup(self):
+        self.assertWithinBudget('signup')
+
+    def test_signup_post(self):
+        self.assertWithinBudget('signup', method='post', status=302, data={
+            'username': 'new-budget-user', 'email': 'new@example.com', 'role': 'customer',
+            'password1': 'Sufficiently-long-9', 'password2': 'Sufficiently-long-9',
+        })
+
+    def test_redirect_after_login(self):
+        self.assertWithinBudget('redirect_after_login', user=self.seed.owner, status=302)
+        self.assertWithinBudget('redirect_after_login', user=self.seed.customer, query='selected_role=customer', status=302)
+
+    def test_logout(self):
+        self.assertWithinBudget('custom_logout', user=self.seed.customer, status=302)
+
+    def test_select_role(self):
+        self.assertWithinBudget('select_role', user=self.seed.customer)
+        self.assertWithinBudget('select_role', user=self.seed.customer, method='post', data={'role': 'customer'}, status=302)
+
+
+class AuthCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = shared_seed()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.seed.customer)
+
+    def auth_queries(self, url) -> list[str]:
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [q['sql'] for q in queries if 'django_session' in q['sql'] or 'accounts_userprofile' in q['sql']]
+
+    def test_warm_requests_skip_auth_queries(self):
+        url = reverse('customer_settings')
+        self.assertEqual(len(self.auth_queries(url)), 1)  # the user
+        self.assertEqual(self.auth_queries(url), [])
+
+    def test_role_change_reaches_next_request(self):
+        self.client.get(reverse('customer_settings'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('select_role'), {'role': 'place_owner'})
+        self.assertEqual(self.client.get(reverse('customer_settings')).status_code, 403)
+
+    def test_logout_revokes_cached_session(self):
+        self.client.get(reverse('customer_settings'))
+        cookie = self.client.cookies['sessionid'].value
+        self.client.get(reverse('custom_logout'))
+        self.client.cookies['sessionid'] = cookie
+        self.assertEqual(self.client.get(reverse('customer_settings')).status_code, 302)
+
+
+class ClearExpiredSessionsTests(TestCase):
+    def test_deletes_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'expired{n}', session_data='', expire_date=now - timedelta(days=1)) for n in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        self.assertEqual(clear_expired(batch_size=2, now=now), (5, 3))
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
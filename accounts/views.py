@@ -49,8 +49,9 @@ def redirect_after_login(request):
     # If user picked a role on login, honor it and persist
     selected = request.GET.get('selected_role')
     if selected in dict(UserProfile.ROLE_CHOICES):
-        request.user.role = selected
-        request.user.save(update_fields=['role'])
+        if request.user.role != selected:
+            request.user.role = selected
+            request.user.save(update_fields=['role'])
         role = selected
     else:
         try:
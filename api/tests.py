@@ -0,0 +1,159 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from customer.models import Booking
+from customer.services import create_booking
+from parkeasy.testing import Budget, QueryBudgetMixin, shared_seed
+
+
+def _window(days: int):
+    start = timezone.localtime().replace(minute=0, second=0, microsecond=0) + timedelta(days=days)
+    return start, start + timedelta(hours=2)
+
+
+class ApiBudgetTests(QueryBudgetMixin, TestCase):
+    urls_module = 'api.urls'
+    budgets = {
+        'api_places': Budget(queries=5),
+        'api_place_detail': Budget(queries=4),
+        'api_bookings': Budget(queries=12),
+        'api_checkout': Budget(queries=9),
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.customer = self.seed.customer
+        self.place = self.seed.place
+
+    def test_places(self):
+        response = self.assertWithinBudget('api_places', user=self.customer, query='per_page=2')
+        cursor = response.json()['next']['cursor']
+        self.assertWithinBudget('api_places', user=self.customer, query=f'cursor={cursor}&per_page=2')
+        self.assertWithinBudget('api_places', user=self.customer, query='city=Pune&vehicle_type=4_wheeler')
+
+    def test_places_full_text_and_nearby(self):
+        self.assertWithinBudget('api_places', user=self.customer, query='q=lot&city=Mumbai&page=2')
+        response = self.assertWithinBudget('api_places', user=self.customer, query='lat=18.5&lng=73.85&k=10')
+        self.assertIn('distance_km', response.json()['results'][0])
+
+    def test_place_detail(self):
+        start, end = _window(30)
+        response = self.assertWithinBudget(
+            'api_place_detail', args=[self.place.id], user=self.customer,
+            query=f'start={start:%Y-%m-%dT%H:%M}&end={end:%Y-%m-%dT%H:%M}&vehicle_type=4_wheeler',
+        )
+        body = response.json()
+        self.assertEqual(body['id'], self.place.id)
+        self.assertEqual(len(body['slots']), self.place.slots.count())
+        self.assertEqual(set(body['slots'][0]), {'id', 'code', 'free', 'amount'})
+        self.assertWithinBudget('api_place_detail', args=[0], user=self.customer, status=404)
+
+    def test_my_bookings(self):
+        response = self.assertWithinBudget('api_bookings', user=self.customer)
+        cursor = response.json()['next']['cursor']
+        self.assertWithinBudget('api_bookings', user=self.customer, query=f'cursor={cursor}')
+
+    def test_create_booking(self):
+        start, end = _window(31)
+        data = {'slot': self.seed.slot.id, 'start': start.isoformat(), 'end': end.isoformat()}
+        response = self.assertWithinBudget(
+            'api_bookings', user=self.customer, method='post', status=201, data=data, content_type='application/json',
+        )
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertWithinBudget(
+            'api_bookings', user=self.customer, method='post', status=409, data=data, content_type='application/json',
+        )
+        self.assertWithinBudget('api_bookings', user=self.customer, method='post', status=400, data={'slot': 'x'})
+        start, _ = _window(35)
+        too_long = {**data, 'start': start.isoformat(), 'end': (start + timedelta(days=30)).isoformat()}
+        response = self.assertWithinBudget(
+            'api_bookings', user=self.customer, method='post', status=400, data=too_long, content_type='application/json',
+        )
+        self.assertIn('at most', response.json()['error'])
+
+    def test_checkout(self):
+        start, end = _window(32)
+        booking = create_booking(self.customer, self.seed.slot.id, start, end)
+        response = self.assertWithinBudget('api_checkout', args=[booking.id], user=self.customer)
+        self.assertIsNone(response.json()['payment'])
+        response = self.assertWithinBudget(
+            'api_checkout', args=[booking.id], user=self.customer, method='post', status=202,
+            data={'idempotency_key': 'api-checkout-1'}, content_type='application/json',
+        )
+        self.assertEqual(response.json()['payment']['status'], 'pending')
+
+    def test_errors_are_json(self):
+        self.assertEqual(self.assertWithinBudget('api_places', status=401).json(), {'error': 'Sign in first.'})
+        self.assertWithinBudget('api_places', user=self.seed.owner, status=403)
+        response = self.assertWithinBudget('api_places', user=self.customer, method='post', status=405)
+        self.assertEqual(response['Allow'], 'GET, HEAD')
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged polls get a 304 without a query; writes change the ETag."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = shared_seed()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.seed.customer)
+        self.window = _window(40)
+        start, end = self.window
+        self.place_url = reverse('api_place_detail', args=[self.seed.place.id]) + (
+            f'?start={start:%Y-%m-%dT%H:%M}&end={end:%Y-%m-%dT%H:%M}'
+        )
+
+    def assertNotModified(self, url: str, etag: str):
+        with self.assertNumQueries(0):
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def slot_free(self, response) -> bool:
+        return next(s['free'] for s in response.json()['slots'] if s['id'] == self.seed.slot.id)
+
+    def test_booking_changes_place_etag(self):
+        first = self.client.get(self.place_url)
+        self.assertTrue(self.slot_free(first))
+        self.assertNotModified(self.place_url, first['ETag'])
+        with self.captureOnCommitCallbacks(execute=True):
+            create_booking(self.seed.customer, self.seed.slot.id, *self.window)
+        second = self.client.get(self.place_url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertFalse(self.slot_free(second))
+
+    @override_settings(CACHE_SHARED=False)
+    def test_unshared_cache_sends_no_etag(self):
+        first = self.client.get(self.place_url)
+        self.assertNotIn('ETag', first)
+        # Booked through another process: the stamp bump never lands here.
+        with self.captureOnCommitCallbacks(execute=False):
+            create_booking(self.seed.customer, self.seed.slot.id, *self.window)
+        self.assertFalse(self.slot_free(self.client.get(self.place_url)))
+
+    def test_status_change_changes_bookings_etag(self):
+        url = reverse('api_bookings')
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = create_booking(self.seed.customer, self.seed.slot.id, *self.window)
+        first = self.client.get(url)
+        self.assertEqual(first.json()['results'][0]['status'], 'pending')
+        self.assertNotModified(url, first['ETag'])
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.status = 'confirmed'
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save(update_fields=['status'])
+        second = self.client.get(url, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['results'][0]['status'], 'confirmed')
+
+    def test_search_etag_ignores_spelling_of_filters(self):
+        first = self.client.get(reverse('api_places') + '?city=Pune')
+        self.assertNotModified(reverse('api_places') + '?city=+pune', first['ETag'])
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('places/', views.places, name='api_places'),
+    path('places/<int:place_id>/', views.place_detail, name='api_place_detail'),
+    path('bookings/', views.bookings, name='api_bookings'),
+    path('bookings/<int:booking_id>/checkout/', views.checkout, name='api_checkout'),
+]
@@ -0,0 +1,276 @@
+"""JSON API for the mobile app, version 1 (mounted at /api/v1/).
+
+It signs in with the site's session and checks the same roles, but answers
+with JSON errors (401, 403, 404, 405) instead of redirects and pages. POSTs
+take a JSON or form-encoded body and, like the site's forms, need the CSRF
+token: an X-CSRFToken header with the value of the csrftoken cookie.
+
+GET responses are versioned by the stamps of owner/caching.py: the place
+list by ``places``, a place by its slot-grid stamp and the booking list by
+the customer's ``bookings`` stamp. The ETag is a digest of the versioned
+cache key, so a poll whose If-None-Match still names it gets a 304 after
+one cache read, with no query and nothing serialized. Bodies are cached as
+bytes under the same key and, like the page fragments, built from the
+primary. Without a cache shared by every process (``caching.enabled()``)
+bodies are built on every request and carry no ETag.
+"""
+import hashlib
+import json
+import uuid
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from customer.availability import WindowTooLong, parse_window, requested_window, slots_with_availability
+from customer.models import Booking
+from customer.search import PlaceSearch
+from customer.services import BookingConflict, amount_due, create_booking
+from owner import caching, pricing
+from owner.models import ParkingPlace, ParkingSlot, VEHICLE_TYPE_CHOICES
+from parkeasy.pagination import keyset_paginate, page_size_from
+from parkeasy.replicas import primary_reads
+from payment.models import Payment
+from payment.pipeline import PaymentError, start_payment
+
+PLACE_DETAIL_FIELDS = (
+    'id', 'name', 'address', 'area', 'city', 'price_per_hour', 'allowed_vehicle_types', 'description',
+    'latitude', 'longitude',
+)
+BOOKING_FIELDS = (
+    'id', 'created_at', 'start_time', 'end_time', 'status', 'vehicle_type', 'slot__code', 'slot__place__name',
+)
+COMPACT = {'separators': (',', ':')}
+
+
+def _json(data, status: int = 200) -> JsonResponse:
+    return JsonResponse(data, status=status, json_dumps_params=COMPACT)
+
+
+def _error(status: int, message: str) -> JsonResponse:
+    return _json({'error': message}, status)
+
+
+def api_view(role: str, methods=('GET',)):
+    """Allow ``methods`` to signed-in users with ``role``; Http404 from the
+    view becomes a JSON 404."""
+    allowed = set(methods) | ({'HEAD'} if 'GET' in methods else set())
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = _error(405, f'Use {" or ".join(methods)}.')
+                response['Allow'] = ', '.join(sorted(allowed))
+                return response
+            if not request.user.is_authenticated:
+                return _error(401, 'Sign in first.')
+            if getattr(request.user, 'role', None) != role:
+                return _error(403, 'This account cannot use this endpoint.')
+            try:
+                return view_func(request, *args, **kwargs)
+            except Http404:
+                return _error(404, 'Not found.')
+        return _wrapped
+    return decorator
+
+
+def _payload(request) -> dict:
+    """The POST body as a dict; raises ValueError when it is not one."""
+    if request.content_type == 'application/json':
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError('Expected a JSON object.')
+        return data
+    return request.POST.dict()
+
+
+def _versioned(request, key: str, timeout: int, build) -> HttpResponse:
+    """``build()`` as JSON, cached under the versioned ``key``, or a 304 when
+    the client's If-None-Match names this version."""
+    if not caching.enabled():
+        body = json.dumps(build(), cls=DjangoJSONEncoder, **COMPACT).encode()
+        return HttpResponse(body, content_type='application/json', headers={'Cache-Control': 'private, no-cache'})
+    etag = quote_etag(hashlib.sha1(key.encode()).hexdigest())
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if get_conditional_response(request, etag=etag) is not None:
+        return HttpResponseNotModified(headers=headers)
+    body = cache.get(key)
+    if body is None:
+        with primary_reads():
+            body = json.dumps(build(), cls=DjangoJSONEncoder, **COMPACT).encode()
+        cache.set(key, body, timeout)
+    return HttpResponse(body, content_type='application/json', headers=headers)
+
+
+def _accepted_vehicle_types(place) -> list[str]:
+    return place.vehicle_type_list or [code for code, _ in VEHICLE_TYPE_CHOICES]
+
+
+def _place(place) -> dict:
+    return {
+        'id': place.id,
+        'name': place.name,
+        'address': place.address,
+        'area': place.area,
+        'city': place.city,
+        'price_per_hour': place.price_per_hour,
+        'vehicle_types': place.vehicle_type_list,
+    }
+
+
+def _booking(booking, slot) -> dict:
+    return {
+        'id': booking.id,
+        'created_at': booking.created_at,
+        'start': booking.start_time,
+        'end': booking.end_time,
+        'status': booking.status,
+        'vehicle_type': booking.vehicle_type,
+        'slot': {'id': slot.id, 'code': slot.code},
+        'place': {'id': slot.place_id, 'name': slot.place.name},
+    }
+
+
+def _payment(payment) -> dict | None:
+    if payment is None:
+        return None
+    return {'id': payment.id, 'amount': payment.amount, 'status': payment.status, 'failure_reason': payment.failure_reason}
+
+
+@api_view('customer')
+def places(request):
+    """Search results; takes the search page's parameters.
+
+    ``next``/``previous`` are the parameters to add for the adjacent page
+    (``cursor``, or ``page`` for ranked ``q`` searches), or null.
+    """
+    search = PlaceSearch.from_params(request.GET)
+
+    def build():
+        found = search.results()
+        results = []
+        for place in found['places']:
+            result = _place(place)
+            if found['geo_mode']:
+                result['distance_km'] = round(place.distance_km, 3)
+            results.append(result)
+        page, cursor_page = found['page'], found['cursor_page']
+        if page is not None:
+            following = {'page': page.next_page_number()} if page.has_next() else None
+            preceding = {'page': page.previous_page_number()} if page.has_previous() else None
+        elif cursor_page is not None:
+            following = {'cursor': cursor_page.next_cursor} if cursor_page.has_next else None
+            preceding = {'cursor': cursor_page.previous_cursor} if cursor_page.has_previous else None
+        else:
+            following = preceding = None
+        return {'results': results, 'next': following, 'previous': preceding}
+
+    key = caching.search_key({'format': 'json', **search.key_params()})
+    return _versioned(request, key, caching.SEARCH_TIMEOUT, build)
+
+
+@api_view('customer')
+def place_detail(request, place_id: int):
+    """A place and its slots for the ``start``/``end`` window (default: the
+    next hour), each with whether it is free and its price for the window.
+    A ``vehicle_type`` the place does not accept is ignored."""
+    start, end = requested_window(request.GET)
+    vehicle_type = request.GET.get('vehicle_type') or ''
+
+    def build():
+        place = get_object_or_404(ParkingPlace.objects.only(*PLACE_DETAIL_FIELDS), id=place_id)
+        applied = vehicle_type if vehicle_type in _accepted_vehicle_types(place) else ''
+        slots = list(slots_with_availability(place, start, end).only('id', 'place', 'code', 'is_available', 'price_per_hour'))
+        quotes = pricing.quote_slots(place, slots, start, end, applied)
+        return {
+            **_place(place),
+            'description': place.description,
+            'latitude': place.latitude,
+            'longitude': place.longitude,
+            'start': start,
+            'end': end,
+            'vehicle_type': applied,
+            'slots': [
+                {'id': s.id, 'code': s.code, 'free': s.is_available and not s.is_booked, 'amount': quotes[s.pk]}
+                for s in slots
+            ],
+        }
+
+    key = caching.grid_key(place_id, 'json', start, end, vehicle_type)
+    return _versioned(request, key, caching.GRID_TIMEOUT, build)
+
+
+@api_view('customer', methods=('GET', 'POST'))
+def bookings(request):
+    """GET: the customer's bookings, newest first, keyset-paginated.
+    POST ``slot``, ``start``, ``end`` (ISO datetimes) and optionally
+    ``vehicle_type``: book the slot, 201 with the pending booking, 409 when
+    the slot is taken, 400 for a window over BOOKING_MAX_HOURS."""
+    if request.method == 'POST':
+        return _create_booking(request)
+    cursor = request.GET.get('cursor', '')
+    page_size = page_size_from(request.GET)
+
+    def build():
+        queryset = Booking.objects.filter(customer=request.user).select_related('slot', 'slot__place').only(*BOOKING_FIELDS)
+        page = keyset_paginate(queryset, cursor, page_size)
+        return {
+            'results': [_booking(booking, booking.slot) for booking in page],
+            'next': {'cursor': page.next_cursor} if page.has_next else None,
+            'previous': {'cursor': page.previous_cursor} if page.has_previous else None,
+        }
+
+    key = caching.bookings_key(request.user.pk, cursor, page_size)
+    return _versioned(request, key, caching.BOOKINGS_TIMEOUT, build)
+
+
+def _create_booking(request):
+    try:
+        data = _payload(request)
+        slot_id = int(data.get('slot'))
+        start, end = parse_window(data.get('start'), data.get('end'), for_booking=True)
+    except WindowTooLong as exc:
+        return _error(400, str(exc))
+    except (TypeError, ValueError):
+        return _error(400, 'Send slot, and start and end as ISO datetimes with end after start.')
+    slot = get_object_or_404(
+        ParkingSlot.objects.select_related('place').only('id', 'code', 'place__name', 'place__allowed_vehicle_types'),
+        id=slot_id, is_available=True,
+    )
+    vehicle_type = str(data.get('vehicle_type') or '')
+    if vehicle_type and vehicle_type not in _accepted_vehicle_types(slot.place):
+        return _error(400, 'This place does not accept that vehicle type.')
+    try:
+        booking = create_booking(request.user, slot.id, start, end, vehicle_type)
+    except BookingConflict as exc:
+        return _error(409, str(exc))
+    return _json(_booking(booking, slot), status=201)
+
+
+@api_view('customer', methods=('GET', 'POST'))
+def checkout(request, booking_id: int):
+    """GET: the amount due and the booking's payment, if any; poll it after
+    paying. POST (optionally with an ``idempotency_key``; resending one is
+    a no-op): start paying, 202 with the pending payment."""
+    booking = get_object_or_404(Booking.objects.select_related('slot__place'), id=booking_id, customer=request.user)
+    payment = Payment.objects.filter(booking=booking).only('id', 'amount', 'status', 'failure_reason').first()
+    amount = amount_due(booking)
+    status = 200
+    if request.method == 'POST' and (payment is None or payment.status != 'success'):
+        try:
+            key = str(_payload(request).get('idempotency_key') or '').strip()[:64] or uuid.uuid4().hex
+        except ValueError:
+            return _error(400, 'Expected a JSON object.')
+        try:
+            payment = start_payment(booking.id, request.user, amount, key)
+        except PaymentError as exc:
+            return _error(409, str(exc))
+        status = 202
+    response = _json({'booking': booking.id, 'amount': amount, 'payment': _payment(payment)}, status)
+    response['Cache-Control'] = 'no-store'
+    return response
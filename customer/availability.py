@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from owner.models import ParkingSlot
+from .models import ACTIVE_BOOKING_STATUSES, Booking
+
+DEFAULT_WINDOW = timedelta(hours=1)
+
+
+class WindowTooLong(ValueError):
+    """The requested booking is longer than BOOKING_MAX_HOURS."""
+
+
+def max_booking_length() -> timedelta:
+    return timedelta(hours=settings.BOOKING_MAX_HOURS)
+
+
+def check_booking_length(start, end) -> None:
+    if end - start > max_booking_length():
+        raise WindowTooLong(f'Bookings can last at most {settings.BOOKING_MAX_HOURS} hours.')
+
+
+def parse_window(start_str, end_str, for_booking: bool = False):
+    """Parse ISO (datetime-local) strings into an aware (start, end) pair.
+
+    Raises ValueError when either value is missing or malformed, or when
+    the window is empty; with ``for_booking``, WindowTooLong when it is
+    longer than a booking may be.
+    """
+    start = datetime.fromisoformat(start_str or '')
+    end = datetime.fromisoformat(end_str or '')
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    if start >= end:
+        raise ValueError('End time must be after start time.')
+    if for_booking:
+        check_booking_length(start, end)
+    return start, end
+
+
+def requested_window(params):
+    """Window from ``start``/``end`` query params, or the next hour."""
+    try:
+        return parse_window(params.get('start'), params.get('end'))
+    except ValueError:
+        start = timezone.now().replace(second=0, microsecond=0)
+        return start, start + DEFAULT_WINDOW
+
+
+def overlapping_bookings(start, end):
+    """Active bookings whose interval intersects [start, end).
+
+    ``end_time__gt`` is the selective bound: it is served by the
+    (slot, end_time, start_time) index and skips a slot's past history.
+    """
+    return Booking.objects.filter(
+        status__in=ACTIVE_BOOKING_STATUSES,
+        end_time__gt=start,
+        start_time__lt=end,
+    )
+
+
+def slots_with_availability(place, start, end):
+    """All slots of ``place`` annotated with ``is_booked`` for the window."""
+    busy = overlapping_bookings(start, end).filter(slot=OuterRef('pk'))
+    return place.slots.annotate(is_booked=Exists(busy)).order_by('code')
+
+
+def free_slots(place, start, end):
+    """Slots of ``place`` that are enabled and unbooked for the window."""
+    return slots_with_availability(place, start, end).filter(is_available=True, is_booked=False)
+
+
+def is_slot_free(slot: ParkingSlot, start, end) -> bool:
+    if not slot.is_available:
+        return False
+    return not overlapping_bookings(start, end).filter(slot=slot).exists()
@@ -0,0 +1,241 @@
+"""Slot-state deltas streamed to open place pages (Server-Sent Events).
+
+Each place has a channel. When a booking holds a slot (``held``), is paid
+for (``paid``) or lets it go (``released``: cancelled, expired or deleted),
+the slot and the booked window are published on it once the transaction
+commits. The place page subscribes from the event number it was rendered
+at, so nothing published while it loaded is lost. Events published on
+commit follow the slot-grid stamp bump (owner/caching.py), so a page
+rendered from an older grid always gets the events it is missing.
+
+An in-process hub only carries the events of its own process, so streams
+on one also send ``refresh`` every ``REFRESH_SECONDS`` (and before a WSGI
+stream ends), on which the page asks for the free slots again.
+
+Under WSGI the ``customer_place_live`` view serves the stream. It holds a
+worker thread, so it ends after ``WSGI_STREAM_SECONDS`` and the browser
+reconnects with the last event id. Under ASGI (parkeasy/asgi.py),
+``LiveStreams`` serves the streams itself: Django's handler would keep a
+thread, and its database connection, per open response. The handshake runs
+on the shared thread Django uses for sync code; after that an idle viewer
+is one suspended coroutine. Requests it would refuse are passed to the view
+for its redirect, 403 or 404, and streams skip the request metrics.
+"""
+import asyncio
+import json
+import time
+from importlib import import_module
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections, transaction
+from django.http import HttpRequest
+from django.http.cookie import parse_cookie
+from django.urls import Resolver404, resolve
+
+from owner.models import ParkingPlace
+from parkeasy.pubsub import config, get_hub
+
+HELD = 'held'
+PAID = 'paid'
+RELEASED = 'released'
+URL_NAME = 'customer_place_live'
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def channel(place_id: int) -> str:
+    return f'place:{place_id}'
+
+
+def last_seq() -> int:
+    return get_hub().last_seq()
+
+
+def _delta(kind: str, slot_id: int, start, end) -> dict:
+    return {'kind': kind, 'slot': slot_id, 'start': start.isoformat(), 'end': end.isoformat()}
+
+
+def _publish(deltas_by_place: dict) -> None:
+    hub = get_hub()
+    for place_id, deltas in deltas_by_place.items():
+        for delta in deltas:
+            hub.publish(channel(place_id), delta)
+
+
+def publish(deltas_by_place: dict) -> None:
+    """Publish ``{place id: [delta, ...]}`` once the current transaction commits."""
+    if deltas_by_place:
+        transaction.on_commit(lambda: _publish(deltas_by_place))
+
+
+def booking_changed(booking, kind: str) -> None:
+    publish({booking.slot.place_id: [_delta(kind, booking.slot_id, booking.start_time, booking.end_time)]})
+
+
+def bookings_released(rows) -> None:
+    """Publish releases for sweeper rows ``(.., .., slot_id, place_id, start, end)``."""
+    deltas = {}
+    for _, _, slot_id, place_id, start, end in rows:
+        deltas.setdefault(place_id, []).append(_delta(RELEASED, slot_id, start, end))
+    publish(deltas)
+
+
+def since(last_event_id: str | None, param: str | None) -> int | None:
+    """The last event a client saw: its Last-Event-ID header on reconnects,
+    else the ``since`` parameter the page was rendered with."""
+    value = last_event_id or param
+    return int(value) if value and value.isdigit() else None
+
+
+def _message(event) -> bytes:
+    return f'id: {event.seq}\nevent: slot\ndata: {json.dumps(event.data)}\n\n'.encode()
+
+
+# Sent first: how long the browser waits before reconnecting.
+RETRY = b'retry: 3000\n\n'
+# Tells the page its grid can no longer be patched and must be reloaded.
+RESET = b'event: reset\ndata: {}\n\n'
+KEEPALIVE = b': keep-alive\n\n'
+# Tells the page to fetch its free slots: changes made in other processes
+# do not reach an in-process hub.
+REFRESH = b'event: refresh\ndata: {}\n\n'
+
+
+def _refresh_seconds(hub) -> float | None:
+    return config()['REFRESH_SECONDS'] if getattr(hub, 'local', False) else None
+
+
+def stream(place_id: int, last_seen: int | None):
+    """Event stream for a WSGI response, ending after ``WSGI_STREAM_SECONDS``."""
+    conf = config()
+    hub = get_hub()
+    refresh_every = _refresh_seconds(hub)
+    deadline = time.monotonic() + conf['WSGI_STREAM_SECONDS']
+    next_refresh = time.monotonic() + refresh_every if refresh_every else None
+    subscription, backlog = hub.subscribe(channel(place_id), last_seen)
+    try:
+        yield RETRY
+        if backlog is None:
+            yield RESET
+            return
+        for event in backlog:
+            yield _message(event)
+        while not subscription.overflowed:
+            now = time.monotonic()
+            if next_refresh is not None and now >= next_refresh:
+                yield REFRESH
+                next_refresh = now + refresh_every
+            remaining = deadline - now
+            if remaining <= 0:
+                if refresh_every:
+                    yield REFRESH
+                return
+            timeout = min(remaining, conf['HEARTBEAT_SECONDS'])
+            if next_refresh is not None:
+                timeout = min(timeout, next_refresh - now)
+            event = subscription.get(timeout)
+            yield KEEPALIVE if event is None else _message(event)
+        yield RESET
+    finally:
+        subscription.close()
+
+
+async def astream(place_id: int, last_seen: int | None):
+    """Open-ended event stream, read on the running event loop."""
+    heartbeat = config()['HEARTBEAT_SECONDS']
+    hub = get_hub()
+    refresh_every = _refresh_seconds(hub)
+    next_refresh = time.monotonic() + refresh_every if refresh_every else None
+    subscription, backlog = hub.subscribe(channel(place_id), last_seen, asyncio.get_running_loop())
+    try:
+        yield RETRY
+        if backlog is None:
+            yield RESET
+            return
+        for event in backlog:
+            yield _message(event)
+        while not subscription.overflowed:
+            now = time.monotonic()
+            if next_refresh is not None and now >= next_refresh:
+                yield REFRESH
+                next_refresh = now + refresh_every
+            timeout = heartbeat if next_refresh is None else min(heartbeat, next_refresh - now)
+            event = await subscription.aget(timeout)
+            yield KEEPALIVE if event is None else _message(event)
+        yield RESET
+    finally:
+        subscription.close()
+
+
+def _place_id(path: str) -> int | None:
+    if not path.endswith('/live/'):
+        return None
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return None
+    return match.kwargs['place_id'] if match.url_name == URL_NAME else None
+
+
+def _admitted(cookies: dict, place_id: int) -> bool:
+    """Whether the view would stream to this client: a signed-in customer
+    and an existing place (its login_required/role_required checks)."""
+    close_old_connections()
+    try:
+        request = HttpRequest()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(cookies.get(settings.SESSION_COOKIE_NAME))
+        user = get_user(request)
+        return (user.is_authenticated and getattr(user, 'role', None) == 'customer'
+                and ParkingPlace.objects.filter(id=place_id).exists())
+    finally:
+        close_old_connections()
+
+
+async def _disconnected(receive) -> None:
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+class LiveStreams:
+    """ASGI application serving ``customer_place_live`` streams without a
+    thread each; everything else goes to ``app``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        place_id = _place_id(scope['path']) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+        if place_id is not None:
+            headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+            if await sync_to_async(_admitted)(parse_cookie(headers.get('cookie', '')), place_id):
+                param = parse_qs(scope['query_string'].decode('latin-1')).get('since', [None])[-1]
+                await self.serve(send, receive, place_id, since(headers.get('last-event-id'), param))
+                return
+        await self.app(scope, receive, send)
+
+    async def serve(self, send, receive, place_id: int, last_seen: int | None) -> None:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [(b'content-type', b'text/event-stream'),
+                        *((name.lower().encode(), value.encode()) for name, value in STREAM_HEADERS.items())],
+        })
+
+        async def events():
+            async for chunk in astream(place_id, last_seen):
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+        streaming = asyncio.create_task(events())
+        listening = asyncio.create_task(_disconnected(receive))
+        try:
+            done, _ = await asyncio.wait({streaming, listening}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # Cancelling the stream unsubscribes it.
+            streaming.cancel()
+            listening.cancel()
+            await asyncio.gather(streaming, listening, return_exceptions=True)
+        if streaming in done:
+            streaming.result()
@@ -0,0 +1,127 @@
+import json
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from customer.availability import ACTIVE_BOOKING_STATUSES, overlapping_bookings, slots_with_availability
+from customer.models import Booking
+from customer.services import BookingConflict, create_booking
+from owner.models import ParkingPlace, ParkingSlot
+from parkeasy.bench import bench_users, summarize
+
+
+class Command(BaseCommand):
+    help = 'Hammer the booking service from many threads and verify there are no double bookings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=2000, help='Total booking attempts')
+        parser.add_argument('--slots', type=int, default=10)
+        parser.add_argument('--windows', type=int, default=24, help='Distinct hourly windows to contend for')
+        parser.add_argument('--readers', type=int, default=0, help='Threads reading slot availability meanwhile')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated fixture rows')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **opts):
+        with bench_users(keep=opts['keep']) as (owner, customer):
+            place = ParkingPlace.objects.create(owner=owner, name='Bench place', address='-', area='Bench', city='Pune')
+            slot_ids = [s.id for s in ParkingSlot.objects.bulk_create(
+                ParkingSlot(place=place, code=f'B{i:03}') for i in range(opts['slots'])
+            )]
+            base = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+            report = self._run(customer, place, slot_ids, base, opts)
+            report['double_bookings'] = self._count_overlaps(place)
+            report['bookings'] = Booking.objects.filter(slot__place=place).count()
+
+        if opts['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        for key, value in report.items():
+            self.stdout.write(f'{key:>16}: {value}')
+        if report['double_bookings']:
+            self.stderr.write(self.style.ERROR('Double bookings detected!'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No double bookings.'))
+
+    def _run(self, customer, place, slot_ids, base, opts):
+        per_thread = max(1, opts['requests'] // opts['threads'])
+        latencies, outcomes = [], {'booked': 0, 'conflicts': 0, 'errors': 0}
+        read_latencies = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(opts['threads'] + opts['readers'])
+        writing = threading.Event()
+        writing.set()
+
+        def worker(seed):
+            rng = random.Random(seed)
+            local_lat, local = [], {'booked': 0, 'conflicts': 0, 'errors': 0}
+            barrier.wait()
+            try:
+                for _ in range(per_thread):
+                    # Half-hour offsets produce partial overlaps, not just exact repeats.
+                    start = base + timedelta(minutes=30 * rng.randrange(opts['windows'] * 2))
+                    end = start + timedelta(hours=rng.choice((1, 2)))
+                    t0 = time.perf_counter()
+                    try:
+                        create_booking(customer, rng.choice(slot_ids), start, end)
+                        local['booked'] += 1
+                    except BookingConflict:
+                        local['conflicts'] += 1
+                    except OperationalError:
+                        local['errors'] += 1
+                    local_lat.append(time.perf_counter() - t0)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(local_lat)
+                for key, value in local.items():
+                    outcomes[key] += value
+
+        def reader(seed):
+            rng = random.Random(-seed)
+            local_lat = []
+            barrier.wait()
+            try:
+                while writing.is_set():
+                    start = base + timedelta(minutes=30 * rng.randrange(opts['windows'] * 2))
+                    t0 = time.perf_counter()
+                    try:
+                        len(slots_with_availability(place, start, start + timedelta(hours=1)))
+                    except OperationalError:
+                        continue
+                    local_lat.append(time.perf_counter() - t0)
+            finally:
+                connection.close()
+            with lock:
+                read_latencies.extend(local_lat)
+
+        close_old_connections()
+        writers = [threading.Thread(target=worker, args=(i,)) for i in range(opts['threads'])]
+        readers = [threading.Thread(target=reader, args=(i,)) for i in range(opts['readers'])]
+        started = time.perf_counter()
+        for t in writers + readers:
+            t.start()
+        for t in writers:
+            t.join()
+        elapsed = time.perf_counter() - started
+        writing.clear()
+        for t in readers:
+            t.join()
+        report = {'threads': opts['threads'], **outcomes, **summarize(latencies, elapsed)}
+        if opts['readers']:
+            report['reads'] = summarize(read_latencies, elapsed)
+        return report
+
+    def _count_overlaps(self, place) -> int:
+        clashes = overlapping_bookings(OuterRef('start_time'), OuterRef('end_time')).filter(
+            slot=OuterRef('slot'),
+        ).exclude(pk=OuterRef('pk'))
+        return Booking.objects.filter(
+            slot__place=place, status__in=ACTIVE_BOOKING_STATUSES,
+        ).filter(Exists(clashes)).count()
@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from parkeasy.dbprofiles import PROFILES
+
+
+class Command(BaseCommand):
+    help = (
+        'Run bench_booking under each database profile (see parkeasy/dbprofiles.py) '
+        'and compare concurrent booking throughput.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', default='',
+            help='Comma-separated profiles (default: both SQLite profiles, plus server when PARKEASY_DB_NAME is set)',
+        )
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--readers', type=int, default=4, help='Availability-reading threads per run')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **opts):
+        profiles = [p for p in opts['profiles'].split(',') if p] or self._default_profiles()
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f'Unknown profile(s): {", ".join(sorted(unknown))}.')
+        bench_args = [
+            'bench_booking', '--json', '--threads', str(opts['threads']),
+            '--readers', str(opts['readers']), '--requests', str(opts['requests']),
+        ]
+        report = {}
+        # Each SQLite profile gets its own copy of one freshly migrated file,
+        # so the runs start from identical databases and never share a lock.
+        with tempfile.TemporaryDirectory(prefix='parkeasy-bench-') as scratch:
+            template = Path(scratch) / 'template.sqlite3'
+            if any(p.startswith('sqlite') for p in profiles):
+                self._manage(['migrate', '--noinput', '-v0'], 'sqlite-rollback', template)
+            for profile in profiles:
+                path = None
+                if profile.startswith('sqlite'):
+                    path = Path(scratch) / f'{profile}.sqlite3'
+                    shutil.copyfile(template, path)
+                self.stderr.write(f'Benchmarking {profile}...')
+                report[profile] = json.loads(self._manage(bench_args, profile, path).strip().splitlines()[-1])
+
+        if opts['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        self.stdout.write(f'{"profile":<16} {"booked/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7} {"reads/s":>8} {"read p95":>9}')
+        for profile, run in report.items():
+            reads = run.get('reads', {})
+            self.stdout.write(
+                f'{profile:<16} {run["throughput_rps"]:>9} {run["p50_ms"]:>8} {run["p95_ms"]:>8} {run["p99_ms"]:>8} '
+                f'{run["errors"]:>7} {reads.get("throughput_rps", "-"):>8} {reads.get("p95_ms", "-"):>9}'
+            )
+
+    def _default_profiles(self) -> list[str]:
+        return ['sqlite-rollback', 'sqlite', *(['server'] if os.environ.get('PARKEASY_DB_NAME') else [])]
+
+    def _manage(self, args: list[str], profile: str, sqlite_path) -> str:
+        env = {**os.environ, 'PARKEASY_DB_PROFILE': profile}
+        if sqlite_path is not None:
+            env['PARKEASY_SQLITE_PATH'] = str(sqlite_path)
+        result = subprocess.run(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), *args],
+            env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'{" ".join(args[:1])} under {profile} failed:\n{result.stderr}')
+        return result.stdout
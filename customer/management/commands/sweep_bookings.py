@@ -0,0 +1,46 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from customer.sweeper import DEFAULT_BATCH_SIZE, sweep
+
+
+class Command(BaseCommand):
+    help = (
+        'Expire unpaid booking holds, complete finished bookings and recover stalled payments, '
+        'once or in a loop.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping every --interval seconds')
+        parser.add_argument('--interval', type=float, default=30.0)
+        parser.add_argument('--json', action='store_true', help='Print one JSON object per sweep')
+
+    def handle(self, *args, **opts):
+        totals = {'sweeps': 0, 'expired': 0, 'completed': 0}
+        try:
+            while True:
+                close_old_connections()
+                result = sweep(batch_size=opts['batch_size'])
+                totals['sweeps'] += 1
+                totals['expired'] += result.expired
+                totals['completed'] += result.completed
+                self._report(result, totals, opts['json'])
+                if not opts['loop']:
+                    break
+                time.sleep(opts['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def _report(self, result, totals, as_json):
+        if as_json:
+            self.stdout.write(json.dumps({**result.as_dict(), 'totals': totals}))
+            return
+        self.stdout.write(
+            f'expired={result.expired} completed={result.completed} '
+            f'payments retried={result.payments_retried} failed={result.payments_failed} batches={result.batches} '
+            f'duration={result.duration_ms}ms (total expired={totals["expired"]} completed={totals["completed"]})'
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def reenable_booked_slots(apps, schema_editor):
+    # Booking used to switch its slot off for good; is_available now means
+    # the owner offers the slot, and owners had no way to switch one off,
+    # so every disabled slot with a booking was disabled by the booking.
+    ParkingSlot = apps.get_model('owner', 'ParkingSlot')
+    Booking = apps.get_model('customer', 'Booking')
+    booked = Booking.objects.values('slot_id')
+    ParkingSlot.objects.filter(is_available=False, id__in=booked).update(is_available=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0001_initial'),
+        ('owner', '0003_parkingplace_allowed_vehicle_types'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['slot', 'end_time', 'start_time'], name='booking_slot_window_idx'),
+        ),
+        migrations.RunPython(reenable_booked_slots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_stats(apps, schema_editor):
+    from customer.stats import rebuild
+
+    rebuild(
+        apps.get_model('owner', 'OwnerStats'),
+        apps.get_model('customer', 'CustomerStats'),
+        apps.get_model('owner', 'ParkingPlace'),
+        apps.get_model('owner', 'ParkingSlot'),
+        apps.get_model('customer', 'Booking'),
+        apps.get_model('payment', 'Payment'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_userprofile_address_userprofile_phone'),
+        ('customer', '0003_recent_first_indexes'),
+        ('owner', '0009_account_stats'),
+        ('payment', '0002_recent_first_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='customer_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('bookings', models.IntegerField(default=0)),
+                ('active_bookings', models.IntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0004_account_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='vehicle_type',
+            field=models.CharField(blank=True, choices=[('2_wheeler', '2 Wheeler'), ('3_wheeler', '3 Wheeler'), ('4_wheeler', '4 Wheeler'), ('single_axle', 'Single Axle'), ('double_axle', 'Double Axle')], max_length=20),
+        ),
+    ]
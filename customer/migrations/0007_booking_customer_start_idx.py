@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer', '0006_booking_sweeper_indexes'),
+        ('owner', '0010_usage_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['customer', 'start_time'], name='booking_customer_start_idx'),
+        ),
+    ]
@@ -1,6 +1,13 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
-from owner.models import ParkingSlot
+from owner.models import VEHICLE_TYPE_CHOICES, ParkingSlot, StatsCounters
+
+# Bookings in these states hold their slot for [start_time, end_time).
+ACTIVE_BOOKING_STATUSES = ('pending', 'confirmed')
+# Bookings in these states no longer hold their slot for analytics purposes.
+RELEASED_BOOKING_STATUSES = ('cancelled', 'expired')
 
 
 class Booking(models.Model):
@@ -9,9 +16,56 @@ class Booking(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
-    status = models.CharField(max_length=20, default='pending')  # pending, confirmed, cancelled
+    status = models.CharField(max_length=20, default='pending')  # pending, confirmed, cancelled, expired, completed
+    vehicle_type = models.CharField(max_length=20, choices=VEHICLE_TYPE_CHOICES, blank=True)
+    # The price quoted when booking, which checkout charges; null for
+    # bookings made before it was stored.
+    amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['slot', 'end_time', 'start_time'], name='booking_slot_window_idx'),
+            models.Index(fields=['customer', '-created_at', '-id'], name='booking_customer_recent_idx'),
+            # The dashboard's upcoming count.
+            models.Index(fields=['customer', 'start_time'], name='booking_customer_start_idx'),
+            models.Index(fields=['-created_at', '-id'], name='booking_recent_idx'),
+            # Sweeper scans: lapsed holds and finished bookings.
+            models.Index(fields=['status', 'created_at'], name='booking_status_created_idx'),
+            models.Index(fields=['status', 'end_time'], name='booking_status_end_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Booking #{self.id} - {self.customer.username} - {self.slot.code}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ACTIVE_BOOKING_STATUSES
+
+    @property
+    def occupies_slot(self) -> bool:
+        return self.status not in RELEASED_BOOKING_STATUSES
+
+    @property
+    def hold_expires_at(self):
+        """When an unpaid (pending) booking stops holding its slot."""
+        return self.created_at + timedelta(minutes=settings.BOOKING_HOLD_MINUTES)
+
+
+class CustomerStats(StatsCounters):
+    customer = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='customer_stats')
+    bookings = models.IntegerField(default=0)
+    active_bookings = models.IntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self) -> str:
+        return f"Stats for customer {self.customer_id}"
 
+    @classmethod
+    def for_customer(cls, customer) -> 'CustomerStats':
+        return cls.objects.filter(customer=customer).first() or cls(customer=customer)
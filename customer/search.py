@@ -0,0 +1,115 @@
+"""Place search as run by the search page and the JSON API.
+
+``PlaceSearch.from_params`` reads the query parameters once; ``key_params``
+normalizes them the way the filters see them, so 'pune ' and 'Pune' share
+a cache entry, and ``results`` runs the search in one of three modes:
+
+- ranked full-text (``q``), the other filters narrowing the match set;
+- geographic (``lat``/``lng`` without ``q``): the nearest within
+  ``radius_km`` (at most ``geo.MAX_RESULTS``), or the ``k`` nearest;
+- otherwise the filtered places, newest first, keyset-paginated.
+"""
+import math
+from dataclasses import dataclass
+
+from django.core.paginator import Paginator
+
+from owner import geo
+from owner.fulltext import RankedPlaces, tokenize
+from owner.models import ParkingPlace, VEHICLE_TYPE_CHOICES, normalize_key
+from owner.search import filter_city_area, filter_vehicle_types
+from parkeasy.pagination import keyset_paginate, page_size_from
+
+MAX_SEARCH_RADIUS_KM = 50.0
+MAX_NEAREST = 50
+SEARCH_PAGE_SIZE = 20
+PLACE_CARD_FIELDS = ('id', 'name', 'address', 'area', 'city', 'price_per_hour', 'allowed_vehicle_types', 'created_at')
+
+
+def _float_param(params, name):
+    try:
+        value = float(params.get(name, ''))
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+@dataclass
+class PlaceSearch:
+    query: str = ''
+    city: str = ''
+    area: str = ''
+    vehicle_types: tuple = ()
+    vehicle_match: str = 'any'
+    lat: float | None = None
+    lng: float | None = None
+    radius_km: float = 2.0
+    nearest_k: int = 0
+    page: str = ''
+    cursor: str = ''
+    per_page: str = ''
+
+    @classmethod
+    def from_params(cls, params) -> 'PlaceSearch':
+        known_types = dict(VEHICLE_TYPE_CHOICES)
+        search = cls(
+            query=(params.get('q') or '').strip(),
+            city=(params.get('city') or '').strip(),
+            area=(params.get('area') or '').strip(),
+            vehicle_types=tuple(v for v in params.getlist('vehicle_type') if v in known_types),
+            vehicle_match='all' if params.get('vehicle_match') == 'all' else 'any',
+            lat=_float_param(params, 'lat'),
+            lng=_float_param(params, 'lng'),
+            radius_km=_float_param(params, 'radius_km') or 2.0,
+            nearest_k=int(_float_param(params, 'k') or 0),
+            page=params.get('page', ''),
+            cursor=params.get('cursor', ''),
+            per_page=params.get('per_page', ''),
+        )
+        if search.geo_mode:
+            search.radius_km = min(max(search.radius_km, 0.1), MAX_SEARCH_RADIUS_KM)
+        return search
+
+    @property
+    def geo_mode(self) -> bool:
+        return self.lat is not None and self.lng is not None and not self.query
+
+    def key_params(self) -> dict:
+        """The parameters as the filters see them, for cache keys."""
+        return {
+            'q': ' '.join(tokenize(self.query)),
+            'city': normalize_key(self.city),
+            'area': normalize_key(self.area),
+            'vehicle_types': sorted(set(self.vehicle_types)),
+            'vehicle_match': self.vehicle_match if len(set(self.vehicle_types)) > 1 else 'any',
+            'geo': [self.lat, self.lng, self.radius_km, self.nearest_k] if self.geo_mode else None,
+            'page': [self.page, self.cursor, self.per_page],
+        }
+
+    def places(self):
+        places = filter_city_area(ParkingPlace.objects.all(), self.city, self.area)
+        if self.vehicle_types:
+            places = filter_vehicle_types(places, self.vehicle_types, match_all=self.vehicle_match == 'all')
+        return places
+
+    def results(self) -> dict:
+        """``places`` found, with the full-text ``page`` or the keyset
+        ``cursor_page`` they came from (None in the other modes)."""
+        places = self.places()
+        page = cursor_page = None
+        if self.query:
+            filtered = bool(self.city or self.area or self.vehicle_types)
+            ranked = RankedPlaces(self.query, restrict_to=places if filtered else None)
+            page = Paginator(ranked, SEARCH_PAGE_SIZE).get_page(self.page)
+            found = page.object_list
+        elif self.geo_mode:
+            if self.nearest_k > 0:
+                found = geo.nearest(places, self.lat, self.lng, min(self.nearest_k, MAX_NEAREST),
+                                    max_radius_km=MAX_SEARCH_RADIUS_KM)
+            else:
+                found = geo.nearby(places, self.lat, self.lng, self.radius_km)
+        else:
+            page_size = page_size_from({'per_page': self.per_page}, SEARCH_PAGE_SIZE)
+            cursor_page = keyset_paginate(places.only(*PLACE_CARD_FIELDS), self.cursor, page_size)
+            found = cursor_page
+        return {'places': found, 'page': page, 'cursor_page': cursor_page, 'geo_mode': self.geo_mode}
@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from django.db import transaction
+
+from owner import pricing
+from owner.models import ParkingSlot
+from .availability import check_booking_length, is_slot_free
+from .models import Booking
+
+
+class BookingConflict(Exception):
+    """The slot is disabled or already booked for the requested window."""
+
+
+def create_booking(customer, slot_id: int, start, end, vehicle_type: str = '') -> Booking:
+    """Atomically book ``slot_id`` for [start, end) or raise BookingConflict.
+
+    The slot row is locked with SELECT ... FOR UPDATE so concurrent bookings
+    of the same slot serialize on the check-then-insert. SQLite ignores row
+    locks; there the IMMEDIATE transaction mode configured in settings takes
+    the database write lock at BEGIN, which gives the same guarantee.
+    Raises WindowTooLong for a window longer than BOOKING_MAX_HOURS. The
+    booking keeps the price quoted now, so later rate changes do not alter
+    what checkout charges.
+    """
+    check_booking_length(start, end)
+    with transaction.atomic():
+        slot = ParkingSlot.objects.select_for_update(of=('self',)).select_related('place').get(id=slot_id)
+        if not is_slot_free(slot, start, end):
+            raise BookingConflict('This slot is already booked for the selected time.')
+        return Booking.objects.create(
+            customer=customer,
+            slot=slot,
+            start_time=start,
+            end_time=end,
+            status='pending',
+            vehicle_type=vehicle_type,
+            amount=pricing.quote(slot, start, end, vehicle_type),
+        )
+
+
+def amount_due(booking: Booking) -> Decimal:
+    """What paying for ``booking`` costs: the price quoted when it was made,
+    or for older bookings that did not store one, the current quote."""
+    if booking.amount is not None:
+        return booking.amount
+    return pricing.quote(booking.slot, booking.start_time, booking.end_time, booking.vehicle_type)
@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from owner import analytics, caching
+from owner.deletion import handlers_muted
+from owner.models import OwnerStats
+from . import live
+from .models import ACTIVE_BOOKING_STATUSES, RELEASED_BOOKING_STATUSES, Booking, CustomerStats
+
+
+def _holding_kind(booking: Booking) -> str:
+    return live.HELD if booking.status == 'pending' else live.PAID
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance: Booking, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_saved_status', None)
+    instance._saved_status = instance.status
+    if created or previous != instance.status:
+        caching.bookings_changed(instance.customer_id)
+    if created:
+        active = int(instance.is_active)
+        CustomerStats.bump_or_create({'customer_id': instance.customer_id}, bookings=1, active_bookings=active)
+        OwnerStats.bump(OwnerStats.of_slot(instance.slot_id), bookings=1, active_bookings=active)
+        if instance.occupies_slot:
+            analytics.record_booking(instance)
+        if instance.is_active:
+            caching.grids_changed(instance.slot.place_id)
+            live.booking_changed(instance, _holding_kind(instance))
+        return
+    if previous is None:
+        return
+    if (previous in ACTIVE_BOOKING_STATUSES) != instance.is_active:
+        delta = 1 if instance.is_active else -1
+        CustomerStats.bump(CustomerStats.objects.filter(customer_id=instance.customer_id), active_bookings=delta)
+        OwnerStats.bump(OwnerStats.of_slot(instance.slot_id), active_bookings=delta)
+        caching.grids_changed(instance.slot.place_id)
+        if instance.is_active:
+            live.booking_changed(instance, _holding_kind(instance))
+        elif instance.status in RELEASED_BOOKING_STATUSES:
+            live.booking_changed(instance, live.RELEASED)
+    elif previous == 'pending' and instance.status == 'confirmed':
+        live.booking_changed(instance, live.PAID)
+    if (previous not in RELEASED_BOOKING_STATUSES) != instance.occupies_slot:
+        analytics.record_booking(instance, 1 if instance.occupies_slot else -1)
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance: Booking, **kwargs):
+    if handlers_muted():
+        return
+    status = getattr(instance, '_saved_status', instance.status)
+    active = -int(status in ACTIVE_BOOKING_STATUSES)
+    CustomerStats.bump(CustomerStats.objects.filter(customer_id=instance.customer_id), bookings=-1, active_bookings=active)
+    OwnerStats.bump(OwnerStats.of_slot(instance.slot_id), bookings=-1, active_bookings=active)
+    if status not in RELEASED_BOOKING_STATUSES:
+        analytics.record_booking(instance, -1)
+    caching.bookings_changed(instance.customer_id)
+    if active:
+        caching.grids_changed(instance.slot.place_id)
+        live.booking_changed(instance, live.RELEASED)
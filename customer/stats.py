@@ -0,0 +1,38 @@
+"""Recompute the materialized OwnerStats/CustomerStats rows from raw data.
+
+Signal handlers keep the counters current incrementally; this is the
+from-scratch path used by ``manage.py rebuild_stats`` and migration 0004.
+Model classes are parameters so the migration can pass historical models.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+
+from .models import ACTIVE_BOOKING_STATUSES
+
+
+def rebuild(OwnerStats, CustomerStats, ParkingPlace, ParkingSlot, Booking, Payment) -> tuple[int, int]:
+    owners = defaultdict(lambda: {'places': 0, 'slots': 0, 'bookings': 0, 'active_bookings': 0, 'revenue': Decimal(0)})
+    customers = defaultdict(lambda: {'bookings': 0, 'active_bookings': 0, 'total_spent': Decimal(0)})
+    active = Q(status__in=ACTIVE_BOOKING_STATUSES)
+
+    for row in ParkingPlace.objects.values('owner_id').annotate(n=Count('id')):
+        owners[row['owner_id']]['places'] = row['n']
+    for row in ParkingSlot.objects.values('place__owner_id').annotate(n=Count('id')):
+        owners[row['place__owner_id']]['slots'] = row['n']
+    for row in Booking.objects.values('slot__place__owner_id').annotate(n=Count('id'), a=Count('id', filter=active)):
+        owners[row['slot__place__owner_id']].update(bookings=row['n'], active_bookings=row['a'])
+    for row in Booking.objects.values('customer_id').annotate(n=Count('id'), a=Count('id', filter=active)):
+        customers[row['customer_id']].update(bookings=row['n'], active_bookings=row['a'])
+    paid = Payment.objects.filter(status='success')
+    for row in paid.values('booking__slot__place__owner_id').annotate(total=Sum('amount')):
+        owners[row['booking__slot__place__owner_id']]['revenue'] = row['total'] or Decimal(0)
+    for row in paid.values('booking__customer_id').annotate(total=Sum('amount')):
+        customers[row['booking__customer_id']]['total_spent'] = row['total'] or Decimal(0)
+
+    OwnerStats.objects.all().delete()
+    CustomerStats.objects.all().delete()
+    OwnerStats.objects.bulk_create((OwnerStats(owner_id=k, **v) for k, v in owners.items()), batch_size=1000)
+    CustomerStats.objects.bulk_create((CustomerStats(customer_id=k, **v) for k, v in customers.items()), batch_size=1000)
+    return len(owners), len(customers)
@@ -0,0 +1,137 @@
+"""Release inventory held by bookings that are over.
+
+Two sweeps, both in batches of one bulk UPDATE each:
+
+* unpaid holds: ``pending`` bookings older than ``BOOKING_HOLD_MINUTES``
+  with no charge in flight become ``expired`` and free their slot;
+* finished stays: ``confirmed`` bookings whose ``end_time`` has passed
+  become ``completed``.
+
+Before them, payments left pending by a stopped process are charged again
+or given up on (see payment/pipeline.py), so their holds can lapse.
+
+Each scan is a range on the ``(status, created_at)`` / ``(status,
+end_time)`` indexes, so its cost tracks the rows to change rather than the
+size of the booking history. Bulk updates skip the model signals, so the
+materialized counters and occupancy rollups are adjusted here per batch.
+"""
+import time
+from collections import Counter, defaultdict
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from owner import analytics, caching
+from owner.models import OwnerStats, ParkingSlot
+from payment.models import Payment
+from payment.pipeline import recover_stale
+from . import live
+from .models import RELEASED_BOOKING_STATUSES, Booking, CustomerStats
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class SweepResult:
+    expired: int = 0
+    completed: int = 0
+    payments_retried: int = 0
+    payments_failed: int = 0
+    batches: int = 0
+    duration_ms: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _batch_rows(ids, status: str) -> list[tuple]:
+    """``(customer_id, owner_id, slot_id, place_id, start, end)`` per booking
+    in ``ids`` now in ``status``.
+
+    Two primary-key lookups: joined in one query, SQLite drives the join
+    from the slot table and scans it.
+    """
+    bookings = list(
+        Booking.objects.filter(id__in=ids, status=status).values_list('customer_id', 'slot_id', 'start_time', 'end_time')
+    )
+    slots = {
+        slot_id: (place_id, owner_id)
+        for slot_id, place_id, owner_id in ParkingSlot.objects.filter(id__in={b[1] for b in bookings})
+        .values_list('id', 'place_id', 'place__owner_id')
+    }
+    return [(customer_id, slots[slot_id][1], slot_id, slots[slot_id][0], start, end)
+            for customer_id, slot_id, start, end in bookings]
+
+
+def _bump_grouped(model, field: str, counts: Counter) -> None:
+    """Subtract ``counts[key]`` from each key's active_bookings, one UPDATE
+    per distinct amount."""
+    by_amount = defaultdict(list)
+    for key, n in counts.items():
+        by_amount[n].append(key)
+    for n, keys in by_amount.items():
+        model.bump(model.objects.filter(**{f'{field}__in': keys}), active_bookings=-n)
+
+
+def _release_active(rows) -> None:
+    """Drop the given (formerly active) bookings from the active counters."""
+    _bump_grouped(CustomerStats, 'customer_id', Counter(row[0] for row in rows))
+    _bump_grouped(OwnerStats, 'owner_id', Counter(row[1] for row in rows))
+
+
+def _release_occupancy(rows) -> None:
+    analytics.record_bookings((row[2:] for row in rows), sign=-1)
+
+
+def _sweep(candidates, new_status: str, batch_size: int, release_occupancy: bool) -> tuple[int, int]:
+    changed = batches = 0
+    while True:
+        with transaction.atomic():
+            # Skip rows a payment is confirming right now; the next run
+            # picks them up if they still qualify. SQLite ignores the lock,
+            # its IMMEDIATE transaction already keeps other writers out.
+            locked = candidates.select_for_update(skip_locked=True, of=('self',))
+            ids = list(locked.order_by().values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return changed, batches
+            # The UPDATE checks the conditions again, and the counters follow
+            # the rows it changed, not the ones selected.
+            count = candidates.filter(id__in=ids).update(status=new_status)
+            rows = _batch_rows(ids, new_status)
+            _release_active(rows)
+            if release_occupancy:
+                _release_occupancy(rows)
+            caching.grids_changed(*{row[3] for row in rows})
+            caching.bookings_changed(*{row[0] for row in rows})
+            if new_status in RELEASED_BOOKING_STATUSES:
+                live.bookings_released(rows)
+        changed += count
+        batches += 1
+        if len(ids) < batch_size:
+            return changed, batches
+
+
+def lapsed_holds(now):
+    cutoff = now - timedelta(minutes=settings.BOOKING_HOLD_MINUTES)
+    charging = Payment.objects.filter(booking=OuterRef('pk'), status='pending')
+    return Booking.objects.filter(status='pending', created_at__lt=cutoff).exclude(Exists(charging))
+
+
+def finished_bookings(now):
+    return Booking.objects.filter(status='confirmed', end_time__lte=now)
+
+
+def sweep(now=None, batch_size: int = DEFAULT_BATCH_SIZE) -> SweepResult:
+    now = now or timezone.now()
+    started = time.perf_counter()
+    result = SweepResult()
+    result.payments_retried, result.payments_failed = recover_stale(now, limit=batch_size)
+    result.expired, expired_batches = _sweep(lapsed_holds(now), 'expired', batch_size, release_occupancy=True)
+    result.completed, completed_batches = _sweep(finished_bookings(now), 'completed', batch_size, release_occupancy=False)
+    result.batches = expired_batches + completed_batches
+    result.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+    return result
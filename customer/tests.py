@@ -0,0 +1,322 @@
+import asyncio
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from owner import slots as slot_ops
+from owner.models import ParkingPlace
+from parkeasy.pubsub import LocalHub, get_hub
+from parkeasy.testing import Budget, QueryBudgetMixin, shared_seed
+from . import live
+from .availability import WindowTooLong
+from .live import LiveStreams
+from .models import Booking
+from .services import create_booking
+from .sweeper import sweep
+
+
+class CustomerViewBudgetTests(QueryBudgetMixin, TestCase):
+    urls_module = 'customer.urls'
+    budgets = {
+        'customer_dashboard': Budget(queries=4),
+        'customer_search': Budget(queries=5),
+        'customer_autocomplete': Budget(queries=2),
+        'customer_place_detail': Budget(queries=4),
+        'customer_place_live': Budget(queries=2),
+        'customer_place_quote': Budget(queries=4),
+        'customer_book': Budget(queries=12),
+        'customer_my_bookings': Budget(queries=2),
+        'customer_profile_edit': Budget(queries=1),
+        'customer_settings': Budget(queries=1),
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.customer = self.seed.customer
+        self.place = self.seed.place
+
+    def window(self, days=30):
+        start = timezone.localtime().replace(minute=0, second=0, microsecond=0) + timedelta(days=days)
+        return start, start + timedelta(hours=2)
+
+    def test_dashboard(self):
+        before = self.assertWithinBudget('customer_dashboard', user=self.customer).context['upcoming_bookings']
+        create_booking(self.customer, self.seed.slot.id, *self.window(33))
+        response = self.assertWithinBudget('customer_dashboard', user=self.customer)
+        self.assertEqual(response.context['upcoming_bookings'], before + 1)
+
+    def test_search_browse(self):
+        response = self.assertWithinBudget('customer_search', user=self.customer)
+        cursor = response.context['cursor_page'].next_cursor
+        self.assertWithinBudget('customer_search', user=self.customer, query=f'cursor={cursor}')
+
+    def test_search_filters(self):
+        self.assertWithinBudget('customer_search', user=self.customer, query='city=Pune&area=Baner&vehicle_type=4_wheeler')
+        self.assertWithinBudget(
+            'customer_search', user=self.customer,
+            query='vehicle_type=2_wheeler&vehicle_type=4_wheeler&vehicle_match=all',
+        )
+
+    def test_search_full_text(self):
+        self.assertWithinBudget('customer_search', user=self.customer, query='q=covered+parking')
+        self.assertWithinBudget('customer_search', user=self.customer, query='q=lot&city=Mumbai&page=2')
+
+    def test_search_nearby(self):
+        self.assertWithinBudget('customer_search', user=self.customer, query='lat=18.5&lng=73.85&radius_km=3')
+        self.assertWithinBudget('customer_search', user=self.customer, query='lat=18.5&lng=73.85&k=10')
+
+    def test_autocomplete(self):
+        self.assertWithinBudget('customer_autocomplete', user=self.customer, query='q=p')
+        self.assertWithinBudget('customer_autocomplete', user=self.customer, query='city=Pune&q=b')
+
+    def test_place_detail(self):
+        start, end = self.window()
+        self.assertWithinBudget('customer_place_detail', args=[self.place.id], user=self.customer)
+        self.assertWithinBudget(
+            'customer_place_detail', args=[self.place.id], user=self.customer,
+            query=f'start={start:%Y-%m-%dT%H:%M}&end={end:%Y-%m-%dT%H:%M}&vehicle_type=4_wheeler',
+        )
+
+    def test_place_quote(self):
+        self.assertWithinBudget('customer_place_quote', args=[self.place.id], user=self.customer)
+
+    def test_place_live(self):
+        seq = get_hub().publish(live.channel(self.place.id), {'kind': live.HELD})
+        response = self.assertWithinBudget('customer_place_live', args=[self.place.id], user=self.customer, query=f'since={seq - 1}')
+        events = iter(response.streaming_content)
+        self.assertEqual(next(events), live.RETRY)
+        self.assertEqual(next(events), f'id: {seq}\nevent: slot\ndata: {{"kind": "held"}}\n\n'.encode())
+        response.close()
+        self.assertEqual(get_hub().subscriber_count(live.channel(self.place.id)), 0)
+        self.assertWithinBudget('customer_place_live', args=[self.place.id], user=self.seed.owner, status=403)
+
+    def test_book(self):
+        self.assertWithinBudget('customer_book', args=[self.seed.slot.id], user=self.customer)
+
+    def test_book_post(self):
+        start, end = self.window()
+        response = self.assertWithinBudget('customer_book', args=[self.seed.slot.id], user=self.customer, method='post', status=302, data={
+            'start_time': f'{start:%Y-%m-%dT%H:%M}', 'end_time': f'{end:%Y-%m-%dT%H:%M}', 'vehicle_type': '',
+        })
+        self.assertIn('/payment/checkout/', response['Location'])
+
+    def test_book_conflict(self):
+        booking = self.seed.booking
+        response = self.assertWithinBudget('customer_book', args=[booking.slot_id], user=self.customer, method='post', status=302, data={
+            'start_time': f'{timezone.localtime(booking.start_time):%Y-%m-%dT%H:%M}',
+            'end_time': f'{timezone.localtime(booking.end_time):%Y-%m-%dT%H:%M}',
+        })
+        self.assertNotIn('/payment/checkout/', response['Location'])
+
+    def test_book_too_long(self):
+        start, _ = self.window(34)
+        end = start + timedelta(hours=settings.BOOKING_MAX_HOURS + 1)
+        response = self.assertWithinBudget('customer_book', args=[self.seed.slot.id], user=self.customer, method='post', status=302, data={
+            'start_time': f'{start:%Y-%m-%dT%H:%M}', 'end_time': f'{end:%Y-%m-%dT%H:%M}',
+        })
+        self.assertNotIn('/payment/checkout/', response['Location'])
+        self.assertFalse(Booking.objects.filter(start_time=start).exists())
+        with self.assertRaises(WindowTooLong):
+            create_booking(self.customer, self.seed.slot.id, start, end)
+
+    def test_my_bookings(self):
+        response = self.assertWithinBudget('customer_my_bookings', user=self.customer)
+        self.assertWithinBudget('customer_my_bookings', user=self.customer, query=f'cursor={response.context["page"].next_cursor}')
+
+    def test_profile_edit(self):
+        self.assertWithinBudget('customer_profile_edit', user=self.customer)
+
+    def test_settings(self):
+        self.assertWithinBudget('customer_settings', user=self.customer)
+
+    def test_owners_are_forbidden(self):
+        self.assertWithinBudget('customer_dashboard', user=self.seed.owner, status=403)
+
+
+class CachedPageTests(TestCase):
+    """Search results and slot grids come from the cache until a write
+    they depend on commits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = shared_seed()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.seed.customer)
+        start = timezone.localtime().replace(minute=0, second=0, microsecond=0) + timedelta(days=40)
+        self.grid_url = reverse('customer_place_detail', args=[self.seed.place.id]) + (
+            f'?start={start:%Y-%m-%dT%H:%M}&end={start + timedelta(hours=1):%Y-%m-%dT%H:%M}'
+        )
+        self.window = start, start + timedelta(hours=1)
+        self.book_link = f'/customer/book/{self.seed.slot.id}/'
+
+    def test_repeated_search_hits_cache(self):
+        url = reverse('customer_search') + '?city=Pune&vehicle_type=4_wheeler'
+        with CaptureQueriesContext(connection) as miss:
+            first = self.client.get(url)
+        with CaptureQueriesContext(connection) as hit:
+            second = self.client.get(reverse('customer_search') + '?city=+pune&vehicle_type=4_wheeler')
+        self.assertLess(len(hit), len(miss))
+        self.assertEqual(first.context['results'], second.context['results'])
+
+    def test_place_change_invalidates_search(self):
+        url = reverse('customer_search') + '?q=zanzibar'
+        self.assertContains(self.client.get(url), 'No places found')
+        place = ParkingPlace.objects.get(pk=self.seed.place.pk)
+        place.name = 'Zanzibar Lot'
+        with self.captureOnCommitCallbacks(execute=True):
+            place.save()
+        self.assertContains(self.client.get(url), 'Zanzibar Lot')
+
+    def test_booking_invalidates_slot_grid(self):
+        self.assertContains(self.client.get(self.grid_url), self.book_link)
+        # The place; the session and user come from the cache.
+        with self.assertNumQueries(1):
+            self.client.get(self.grid_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_booking(self.seed.customer, self.seed.slot.id, *self.window)
+        self.assertNotContains(self.client.get(self.grid_url), self.book_link)
+
+    @override_settings(CACHE_SHARED=False)
+    def test_unshared_cache_is_bypassed(self):
+        self.assertContains(self.client.get(self.grid_url), self.book_link)
+        # Booked through another process: the stamp bump never lands here.
+        with self.captureOnCommitCallbacks(execute=False):
+            create_booking(self.seed.customer, self.seed.slot.id, *self.window)
+        self.assertNotContains(self.client.get(self.grid_url), self.book_link)
+
+    def test_bulk_slot_update_invalidates_slot_grid(self):
+        self.assertContains(self.client.get(self.grid_url), self.book_link)
+        with self.captureOnCommitCallbacks(execute=True):
+            slot_ops.set_availability(self.seed.place, [self.seed.slot.code], False)
+        self.assertNotContains(self.client.get(self.grid_url), self.book_link)
+
+
+class LiveUpdateTests(TestCase):
+    """Booking state changes reach the place's live stream once committed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed = shared_seed()
+
+    def setUp(self):
+        start = timezone.localtime().replace(minute=0, second=0, microsecond=0) + timedelta(days=50)
+        self.window = start, start + timedelta(hours=1)
+        self.subscription, _ = get_hub().subscribe(live.channel(self.seed.place.id))
+        self.addCleanup(self.subscription.close)
+
+    def published(self):
+        events = []
+        while (event := self.subscription.get(0)) is not None:
+            events.append(event.data)
+        return [(data['kind'], data['slot']) for data in events]
+
+    def test_booking_lifecycle(self):
+        slot_id = self.seed.slot.id
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = create_booking(self.seed.customer, slot_id, *self.window)
+            self.assertEqual(self.published(), [])
+        self.assertEqual(self.published(), [(live.HELD, slot_id)])
+        for status, kind in (('confirmed', live.PAID), ('cancelled', live.RELEASED)):
+            booking.status = status
+            with self.captureOnCommitCallbacks(execute=True):
+                booking.save(update_fields=['status'])
+            self.assertEqual(self.published(), [(kind, slot_id)])
+
+    def test_sweep_publishes_expired_holds(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = create_booking(self.seed.customer, self.seed.slot.id, *self.window)
+        self.published()
+        Booking.objects.filter(pk=booking.pk).update(created_at=timezone.now() - timedelta(days=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            sweep()
+        self.assertEqual(self.published(), [(live.RELEASED, self.seed.slot.id)])
+
+    def test_sweep_leaves_holds_confirmed_meanwhile(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = create_booking(self.seed.customer, self.seed.slot.id, *self.window)
+        Booking.objects.filter(pk=booking.pk).update(created_at=timezone.now() - timedelta(days=1))
+        stats = self.seed.customer.customer_stats
+        active = stats.active_bookings
+        confirmed = False
+
+        def confirm_after_select(execute, sql, params, many, context):
+            # A payment confirms the hold once the sweeper has picked it.
+            nonlocal confirmed
+            result = execute(sql, params, many, context)
+            if not confirmed and sql.startswith('SELECT') and 'FROM "customer_booking"' in sql:
+                confirmed = True
+                Booking.objects.filter(pk=booking.pk).update(status='confirmed')
+            return result
+
+        self.published()
+        with connection.execute_wrapper(confirm_after_select), self.captureOnCommitCallbacks(execute=True):
+            sweep()
+        booking.refresh_from_db()
+        stats.refresh_from_db()
+        self.assertTrue(confirmed)
+        self.assertEqual(booking.status, 'confirmed')
+        self.assertEqual(stats.active_bookings, active)
+        self.assertNotIn((live.RELEASED, self.seed.slot.id), self.published())
+
+    def test_local_hub_streams_ask_for_refreshes(self):
+        timing = {**settings.LIVE_UPDATES, 'REFRESH_SECONDS': 0.05, 'WSGI_STREAM_SECONDS': 0.12}
+        with override_settings(LIVE_UPDATES=timing):
+            chunks = list(live.stream(self.seed.place.id, None))
+            self.assertEqual(chunks[0], live.RETRY)
+            self.assertGreaterEqual(chunks.count(live.REFRESH), 3)
+            self.assertEqual(chunks[-1], live.REFRESH)
+            with mock.patch.object(LocalHub, 'local', False):
+                self.assertNotIn(live.REFRESH, list(live.stream(self.seed.place.id, None)))
+
+    async def asgi_get(self, path, headers=()):
+        """GET ``path`` from the ASGI application; returns the queue of
+        messages it sent and a function disconnecting the client."""
+        sent, disconnect = asyncio.Queue(), asyncio.Event()
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'root_path': '', 'scheme': 'http',
+            'headers': [(b'host', b'testserver'), *headers], 'server': ('testserver', 80), 'client': ('127.0.0.1', 1),
+        }
+        app = LiveStreams(get_asgi_application())
+        self.request_task = asyncio.create_task(app(scope, receive, sent.put))
+        return sent, disconnect.set
+
+    async def test_stream_over_asgi(self):
+        await self.async_client.aforce_login(self.seed.customer)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self.async_client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        channel = live.channel(self.seed.place.id)
+        sent, disconnect = await self.asgi_get(
+            reverse('customer_place_live', args=[self.seed.place.id]), [(b'cookie', cookie.encode())],
+        )
+        self.assertEqual((await sent.get())['status'], 200)
+        self.assertEqual((await sent.get())['body'], live.RETRY)
+        seq = get_hub().publish(channel, {'kind': live.RELEASED})
+        self.assertTrue((await sent.get())['body'].startswith(f'id: {seq}\nevent: slot\n'.encode()))
+        self.assertEqual(get_hub().subscriber_count(channel), 2)
+        disconnect()
+        await self.request_task
+        self.assertEqual(get_hub().subscriber_count(channel), 1)  # setUp's
+
+    async def test_asgi_refusals_reach_the_view(self):
+        sent, _ = await self.asgi_get(reverse('customer_place_live', args=[self.seed.place.id]))
+        await self.request_task
+        self.assertEqual((await sent.get())['status'], 302)
@@ -4,7 +4,10 @@ from . import views
 urlpatterns = [
     path('', views.dashboard, name='customer_dashboard'),
     path('search/', views.search, name='customer_search'),
+    path('search/autocomplete/', views.autocomplete, name='customer_autocomplete'),
     path('place/<int:place_id>/', views.place_detail, name='customer_place_detail'),
+    path('place/<int:place_id>/live/', views.place_live, name='customer_place_live'),
+    path('place/<int:place_id>/quote/', views.place_quote, name='customer_place_quote'),
     path('book/<int:slot_id>/', views.book, name='customer_book'),
     path('my-bookings/', views.my_bookings, name='customer_my_bookings'),
     path('profile/', views.profile_edit, name='customer_profile_edit'),
@@ -1,11 +1,18 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
-from datetime import datetime
 from accounts.utils import role_required
-from owner.models import ParkingPlace, ParkingSlot
-from .models import Booking
+from owner.models import ParkingPlace, ParkingSlot, VEHICLE_TYPE_CHOICES
+from owner import caching, pricing
+from owner.search import suggest_areas, suggest_cities
+from . import live
+from .models import ACTIVE_BOOKING_STATUSES, Booking, CustomerStats
+from .availability import WindowTooLong, free_slots, parse_window, requested_window, slots_with_availability
+from .search import PlaceSearch
+from .services import BookingConflict, create_booking
+from parkeasy.pagination import paginate_request
 from django.db import models
 from accounts.forms import UserProfileForm
 
@@ -13,86 +20,184 @@ from accounts.forms import UserProfileForm
 @login_required
 @role_required('customer')
 def dashboard(request):
-    total_bookings = Booking.objects.filter(customer=request.user).count()
-    upcoming = Booking.objects.filter(customer=request.user, start_time__gte=timezone.now()).count()
+    stats = CustomerStats.for_customer(request.user)
     recent_bookings = Booking.objects.filter(customer=request.user).select_related('slot', 'slot__place').order_by('-created_at')[:5]
     ctx = {
-        'total_bookings': total_bookings,
-        'upcoming_bookings': upcoming,
+        'total_bookings': stats.bookings,
+        'active_bookings': stats.active_bookings,
+        # Depends on the clock, so it is counted rather than materialized.
+        'upcoming_bookings': Booking.objects.filter(
+            customer=request.user, start_time__gte=timezone.now(), status__in=ACTIVE_BOOKING_STATUSES,
+        ).count(),
+        'total_spent': stats.total_spent,
         'recent_bookings': recent_bookings,
     }
     return render(request, 'customer/dashboard.html', ctx)
 
 
+MAX_SUGGESTIONS = 25
+
+
 @login_required
 @role_required('customer')
 def search(request):
-    city = (request.GET.get('city') or '').strip()
-    area = (request.GET.get('area') or '').strip()
-    vehicle_type = (request.GET.get('vehicle_type') or '').strip()
-    places = ParkingPlace.objects.all()
-    if city:
-        places = places.filter(city__icontains=city)
-    if area:
-        places = places.filter(area__icontains=area)
-    if vehicle_type:
-        places = places.filter(allowed_vehicle_types__icontains=vehicle_type)
-    vehicle_choices = [
-        ('', 'Any'),
-        ('2_wheeler', '2 Wheeler'),
-        ('3_wheeler', '3 Wheeler'),
-        ('4_wheeler', '4 Wheeler'),
-        ('single_axle', 'Single Axle'),
-        ('double_axle', 'Double Axle'),
-    ]
+    search = PlaceSearch.from_params(request.GET)
     ctx = {
-        'places': places,
-        'city': city,
-        'area': area,
-        'vehicle_type': vehicle_type,
-        'vehicle_choices': vehicle_choices,
+        'results': caching.cached_fragment(
+            caching.search_key(search.key_params()), caching.SEARCH_TIMEOUT,
+            'customer/includes/search_results.html', search.results, request,
+        ),
+        'q': search.query,
+        'city': search.city,
+        'area': search.area,
+        'vehicle_types': list(search.vehicle_types),
+        'vehicle_match': search.vehicle_match,
+        'vehicle_choices': VEHICLE_TYPE_CHOICES,
+        'lat': search.lat,
+        'lng': search.lng,
+        'radius_km': search.radius_km,
+        'k': search.nearest_k or '',
+        'geo_mode': search.geo_mode,
     }
     return render(request, 'customer/search.html', ctx)
 
 
+@login_required
+@role_required('customer')
+def autocomplete(request):
+    """Area suggestions for ``city`` (or city suggestions when no city is
+    given) matching the ``q`` prefix."""
+    city = (request.GET.get('city') or '').strip()
+    prefix = (request.GET.get('q') or '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), MAX_SUGGESTIONS)
+    except ValueError:
+        limit = 10
+    if city:
+        return JsonResponse({'city': city, 'q': prefix, 'areas': suggest_areas(city, prefix, limit)})
+    return JsonResponse({'q': prefix, 'cities': suggest_cities(prefix, limit)})
+
+
+def _vehicle_type(params, place) -> str:
+    """The requested vehicle type if ``place`` accepts it, else ''."""
+    choices = place.vehicle_type_list or [code for code, _ in VEHICLE_TYPE_CHOICES]
+    value = params.get('vehicle_type') or ''
+    return value if value in choices else ''
+
+
+def _vehicle_choices(place):
+    allowed = set(place.vehicle_type_list)
+    return [(code, label) for code, label in VEHICLE_TYPE_CHOICES if not allowed or code in allowed]
+
+
 @login_required
 @role_required('customer')
 def place_detail(request, place_id: int):
     place = get_object_or_404(ParkingPlace, id=place_id)
-    slots = place.slots.all().order_by('code')
-    return render(request, 'customer/place_detail.html', {'place': place, 'slots': slots})
+    start, end = requested_window(request.GET)
+    vehicle_type = _vehicle_type(request.GET, place)
+    # Taken before the grid, which then reflects at least every event up to
+    # it; the page's live updates replay the ones after.
+    live_since = live.last_seq()
+
+    def slot_grid():
+        slots = list(slots_with_availability(place, start, end))
+        quotes = pricing.quote_slots(place, slots, start, end, vehicle_type)
+        for slot in slots:
+            slot.quote = quotes[slot.pk]
+        return {'place': place, 'slots': slots, 'start': start, 'end': end, 'vehicle_type': vehicle_type}
+
+    return render(request, 'customer/place_detail.html', {
+        'place': place,
+        'slot_grid': caching.cached_fragment(
+            caching.grid_key(place.pk, start, end, vehicle_type), caching.GRID_TIMEOUT,
+            'customer/includes/slot_grid.html', slot_grid, request,
+        ),
+        'start': start,
+        'end': end,
+        'vehicle_type': vehicle_type,
+        'vehicle_choices': _vehicle_choices(place),
+        'live_since': live_since,
+    })
+
+
+@login_required
+@role_required('customer')
+def place_live(request, place_id: int):
+    """Server-Sent Events with the place's slot-state deltas.
+
+    Served here under WSGI only; under ASGI, customer.live.LiveStreams
+    answers the requests this view would accept (see customer/live.py).
+    """
+    get_object_or_404(ParkingPlace.objects.only('id'), id=place_id)
+    last_seen = live.since(request.headers.get('Last-Event-ID'), request.GET.get('since'))
+    return StreamingHttpResponse(
+        live.stream(place_id, last_seen), content_type='text/event-stream', headers=live.STREAM_HEADERS,
+    )
+
+
+@login_required
+@role_required('customer')
+def place_quote(request, place_id: int):
+    """Prices of every free slot of the place for the requested window."""
+    place = get_object_or_404(ParkingPlace, id=place_id)
+    start, end = requested_window(request.GET)
+    vehicle_type = _vehicle_type(request.GET, place)
+    slots = list(free_slots(place, start, end).only('id', 'code', 'price_per_hour'))
+    quotes = pricing.quote_slots(place, slots, start, end, vehicle_type)
+    return JsonResponse({
+        'place': place.id,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'billed_end': pricing.billed_end(start, end).isoformat(),
+        'vehicle_type': vehicle_type,
+        'slots': [{'id': s.id, 'code': s.code, 'amount': str(quotes[s.pk])} for s in slots],
+    })
 
 
 @login_required
 @role_required('customer')
 def book(request, slot_id: int):
-    slot = get_object_or_404(ParkingSlot, id=slot_id, is_available=True)
+    slot = get_object_or_404(ParkingSlot.objects.select_related('place'), id=slot_id, is_available=True)
     if request.method == 'POST':
-        start_time_str = request.POST.get('start_time')
-        end_time_str = request.POST.get('end_time')
-        start_time = datetime.fromisoformat(start_time_str)
-        end_time = datetime.fromisoformat(end_time_str)
-        if start_time >= end_time:
-            messages.error(request, 'End time must be after start time.')
-            return redirect('customer_place_detail', place_id=slot.place.id)
-        booking = Booking.objects.create(
-            customer=request.user,
-            slot=slot,
-            start_time=start_time,
-            end_time=end_time,
-            status='pending',
-        )
-        slot.is_available = False
-        slot.save(update_fields=['is_available'])
+        try:
+            start_time, end_time = parse_window(request.POST.get('start_time'), request.POST.get('end_time'), for_booking=True)
+        except WindowTooLong as exc:
+            messages.error(request, str(exc))
+            return redirect('customer_place_detail', place_id=slot.place_id)
+        except ValueError:
+            messages.error(request, 'Enter a valid time range; end time must be after start time.')
+            return redirect('customer_place_detail', place_id=slot.place_id)
+        vehicle_type = _vehicle_type(request.POST, slot.place)
+        if request.POST.get('vehicle_type') and not vehicle_type:
+            messages.error(request, 'This place does not accept that vehicle type.')
+            return redirect('customer_place_detail', place_id=slot.place_id)
+        try:
+            booking = create_booking(request.user, slot.id, start_time, end_time, vehicle_type)
+        except BookingConflict as exc:
+            messages.error(request, str(exc))
+            return redirect('customer_place_detail', place_id=slot.place_id)
         return redirect(f'/payment/checkout/?booking={booking.id}')
-    return render(request, 'customer/book.html', {'slot': slot})
+    start, end = requested_window(request.GET)
+    vehicle_type = _vehicle_type(request.GET, slot.place)
+    return render(request, 'customer/book.html', {
+        'slot': slot,
+        'start': start,
+        'end': end,
+        'vehicle_type': vehicle_type,
+        'vehicle_choices': _vehicle_choices(slot.place),
+        'quote': pricing.quote(slot, start, end, vehicle_type),
+    })
 
 
 @login_required
 @role_required('customer')
 def my_bookings(request):
-    bookings = Booking.objects.filter(customer=request.user).select_related('slot', 'slot__place').order_by('-created_at')
-    return render(request, 'customer/mybookings.html', {'bookings': bookings})
+    bookings = Booking.objects.filter(customer=request.user).select_related('slot', 'slot__place').only(
+        'id', 'created_at', 'start_time', 'end_time', 'status', 'slot__code', 'slot__place__name',
+    )
+    page = paginate_request(request, bookings)
+    return render(request, 'customer/mybookings.html', {'bookings': page, 'page': page})
 
 
 @login_required
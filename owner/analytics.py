@@ -0,0 +1,287 @@
+"""Hourly and daily occupancy/revenue rollups per place and per slot.
+
+Buckets are aligned to UTC epoch multiples of the period length. Signal
+handlers apply each booking and payment to the handful of buckets it
+touches as it happens (``record_booking``/``record_payment``), so a chart
+over any range reads pre-aggregated rows instead of raw bookings.
+``backfill`` recomputes a range from scratch; it buckets with NumPy when it
+is installed and falls back to plain Python otherwise.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from customer.models import RELEASED_BOOKING_STATUSES, Booking
+from payment.models import Payment
+from .models import PlaceUsage, SlotUsage
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional speed-up
+    np = None
+
+PERIODS = {'hour': 3600, 'day': 86400}
+BATCH_SIZE = 2000
+CENTS = Decimal('0.01')
+
+
+def epoch(dt: datetime) -> int:
+    return int(dt.timestamp())
+
+
+def from_epoch(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
+
+
+def bucket_start(dt: datetime, period: str) -> datetime:
+    size = PERIODS[period]
+    return from_epoch(epoch(dt) // size * size)
+
+
+def split_interval(start: datetime, end: datetime, period: str):
+    """(bucket start, seconds inside it) for each bucket [start, end) spans."""
+    size = PERIODS[period]
+    lo, hi = epoch(start), epoch(end)
+    b = lo // size * size
+    while b < hi:
+        yield from_epoch(b), min(hi, b + size) - max(lo, b)
+        b += size
+
+
+COUNTERS = ('occupied_seconds', 'bookings', 'revenue')
+PLACE_KEY = ('place_id', 'period', 'bucket')
+SLOT_KEY = ('slot_id', 'place_id', 'period', 'bucket')
+_UNIQUE = {PlaceUsage: ('place_id', 'period', 'bucket'), SlotUsage: ('slot_id', 'period', 'bucket')}
+
+
+def _bump_orm(model, key: dict, sign: int, deltas: dict) -> None:
+    deltas = {k: sign * v for k, v in deltas.items()}
+    if sign > 0:
+        model.bump_or_create(key, **deltas)
+    else:
+        model.bump(model.objects.filter(**key), **deltas)
+
+
+def _write(model, key_fields, rows: dict, sign: int) -> None:
+    """Add ``sign`` times each row's deltas to its bucket row.
+
+    Additions upsert (creating missing buckets); removals only update,
+    because on cascading deletes the bucket rows may already be gone along
+    with their place or slot. On SQLite and PostgreSQL every row is one
+    execution of a single prepared statement.
+    """
+    if not rows:
+        return
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        for key, deltas in rows.items():
+            _bump_orm(model, dict(zip(key_fields, key)), sign, deltas)
+        return
+    ops, qn = connection.ops, connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    params = []
+    for key, deltas in rows.items():
+        key = [ops.adapt_datetimefield_value(v) if isinstance(v, datetime) else v for v in key]
+        counts = [sign * deltas.get(name, 0) for name in COUNTERS]
+        params.append([*key, *counts] if sign > 0 else [*counts, *key])
+    if sign > 0:
+        columns = [*key_fields, *COUNTERS]
+        sql = (
+            f'INSERT INTO {table} ({", ".join(qn(c) for c in columns)}) '
+            f'VALUES ({", ".join(["%s"] * len(columns))}) '
+            f'ON CONFLICT ({", ".join(qn(c) for c in _UNIQUE[model])}) DO UPDATE SET '
+            + ', '.join(f'{qn(c)} = {table}.{qn(c)} + excluded.{qn(c)}' for c in COUNTERS)
+        )
+    else:
+        sql = (
+            f'UPDATE {table} SET ' + ', '.join(f'{qn(c)} = {qn(c)} + %s' for c in COUNTERS)
+            + ' WHERE ' + ' AND '.join(f'{qn(c)} = %s' for c in key_fields)
+        )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _apply(place_deltas: dict, slot_deltas: dict, sign: int) -> None:
+    _write(PlaceUsage, PLACE_KEY, place_deltas, sign)
+    _write(SlotUsage, SLOT_KEY, slot_deltas, sign)
+
+
+def record_bookings(rows, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) the occupancy of many bookings given
+    as ``(slot_id, place_id, start_time, end_time)`` rows. Deltas are summed
+    per bucket first, so each touched bucket row is updated once."""
+    place_deltas, slot_deltas = defaultdict(Counter), defaultdict(Counter)
+    for slot_id, place_id, start, end in rows:
+        for period in PERIODS:
+            touched = [(bucket, {'occupied_seconds': seconds}) for bucket, seconds in split_interval(start, end, period)]
+            touched.append((bucket_start(start, period), {'bookings': 1}))
+            for bucket, deltas in touched:
+                place_deltas[place_id, period, bucket].update(deltas)
+                slot_deltas[slot_id, place_id, period, bucket].update(deltas)
+    _apply(place_deltas, slot_deltas, sign)
+
+
+def record_booking(booking: Booking, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) ``booking``'s occupancy."""
+    record_bookings([(booking.slot_id, booking.slot.place_id, booking.start_time, booking.end_time)], sign)
+
+
+def record_payment(payment: Payment, sign: int = 1) -> None:
+    """Add (sign=1) or remove (sign=-1) a successful payment's revenue."""
+    slot_id, place_id = Booking.objects.filter(pk=payment.booking_id).values_list('slot_id', 'slot__place_id').get()
+    place_deltas, slot_deltas = {}, {}
+    for period in PERIODS:
+        bucket = bucket_start(payment.created_at, period)
+        place_deltas[place_id, period, bucket] = {'revenue': payment.amount}
+        slot_deltas[slot_id, place_id, period, bucket] = {'revenue': payment.amount}
+    _apply(place_deltas, slot_deltas, sign)
+
+
+def remove_slots(place_id: int, slots) -> None:
+    """Subtract the usage of ``slots`` from their place's rollups before
+    the slots (and their own rollup rows) are deleted."""
+    rows = (
+        SlotUsage.objects.filter(slot__in=slots).values('period', 'bucket')
+        .annotate(occupied_seconds=Sum('occupied_seconds'), bookings=Sum('bookings'), revenue=Sum('revenue'))
+        .order_by()
+    )
+    _write(PlaceUsage, PLACE_KEY, {
+        (place_id, row['period'], row['bucket']): {name: row[name] for name in COUNTERS} for row in rows
+    }, sign=-1)
+
+
+# -- backfill -----------------------------------------------------------------
+
+def _bucketize_numpy(starts, ends, keys, size):
+    starts, ends, keys = (np.asarray(a, dtype=np.int64) for a in (starts, ends, keys))
+    first = starts // size
+    counts = (ends - 1) // size - first + 1
+    # Explode every interval into one row per bucket it overlaps.
+    row = np.repeat(np.arange(len(starts)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    bucket = first[row] + offset
+    seconds = np.minimum(ends[row], (bucket + 1) * size) - np.maximum(starts[row], bucket * size)
+    # Pack (key, bucket) into one int64 so grouping is a 1-D sort.
+    span = int(bucket.max() - bucket.min()) + 1
+    packed = keys[row] * span + (bucket - bucket.min())
+    groups, inverse = np.unique(packed, return_inverse=True)
+    totals = np.bincount(inverse, weights=seconds).astype(np.int64)
+    group_keys, group_buckets = np.divmod(groups, span)
+    group_buckets = (group_buckets + bucket.min()) * size
+    return dict(zip(zip(group_keys.tolist(), group_buckets.tolist()), totals.tolist()))
+
+
+def _bucketize_python(starts, ends, keys, size):
+    totals = defaultdict(int)
+    for lo, hi, key in zip(starts, ends, keys):
+        b = lo // size
+        while b * size < hi:
+            totals[key, b * size] += min(hi, (b + 1) * size) - max(lo, b * size)
+            b += 1
+    return dict(totals)
+
+
+def bucketize(starts, ends, keys, size: int) -> dict:
+    """{(key, bucket epoch): occupied seconds} for [start, end) intervals
+    given as epoch seconds, one key per interval."""
+    if not starts:
+        return {}
+    if np is not None:
+        return _bucketize_numpy(starts, ends, keys, size)
+    return _bucketize_python(starts, ends, keys, size)
+
+
+def backfill(since: datetime, until: datetime, places=None) -> int:
+    """Recompute every rollup row in [since, until) from raw bookings and
+    payments. ``since``/``until`` should be day-aligned so daily buckets are
+    complete; ``places`` optionally limits the work to a queryset of places.
+    Returns the number of rollup rows written.
+    """
+    lo, hi = epoch(since), epoch(until)
+    bookings = Booking.objects.exclude(status__in=RELEASED_BOOKING_STATUSES).filter(
+        end_time__gt=since, start_time__lt=until,
+    )
+    payments = Payment.objects.filter(status='success', created_at__gte=since, created_at__lt=until)
+    if places is not None:
+        bookings = bookings.filter(slot__place__in=places)
+        payments = payments.filter(booking__slot__place__in=places)
+
+    starts, ends, started, slot_ids, place_of = [], [], [], [], {}
+    for start, end, slot_id, place_id in bookings.values_list(
+        'start_time', 'end_time', 'slot_id', 'slot__place_id',
+    ).iterator(chunk_size=BATCH_SIZE):
+        s = epoch(start)
+        # Clip to the range so buckets outside it are left untouched.
+        starts.append(max(s, lo))
+        ends.append(min(epoch(end), hi))
+        started.append(s if s >= lo else None)
+        slot_ids.append(slot_id)
+        place_of[slot_id] = place_id
+    revenue = list(payments.values_list('created_at', 'amount', 'booking__slot_id', 'booking__slot__place_id'))
+    for _, _, slot_id, place_id in revenue:
+        place_of[slot_id] = place_id
+
+    rows = {PlaceUsage: {}, SlotUsage: {}}
+
+    def row(model, ref_id, period, bucket_epoch):
+        key = (ref_id, period, bucket_epoch)
+        if key not in rows[model]:
+            fields = {'place_id': ref_id} if model is PlaceUsage else {'slot_id': ref_id, 'place_id': place_of[ref_id]}
+            rows[model][key] = model(period=period, bucket=from_epoch(bucket_epoch), revenue=Decimal(0), **fields)
+        return rows[model][key]
+
+    place_ids = [place_of[s] for s in slot_ids]
+    for period, size in PERIODS.items():
+        for model, keys in ((SlotUsage, slot_ids), (PlaceUsage, place_ids)):
+            for (ref_id, b), seconds in bucketize(starts, ends, keys, size).items():
+                row(model, ref_id, period, b).occupied_seconds = seconds
+            for s, ref_id in zip(started, keys):
+                if s is not None:
+                    row(model, ref_id, period, s // size * size).bookings += 1
+            for created_at, amount, slot_id, place_id in revenue:
+                ref_id = slot_id if model is SlotUsage else place_id
+                row(model, ref_id, period, epoch(created_at) // size * size).revenue += amount
+
+    with transaction.atomic():
+        for model in (PlaceUsage, SlotUsage):
+            stale = model.objects.filter(bucket__gte=since, bucket__lt=until)
+            if places is not None:
+                stale = stale.filter(place__in=places)
+            stale.delete()
+            model.objects.bulk_create(rows[model].values(), batch_size=BATCH_SIZE)
+    return sum(len(r) for r in rows.values())
+
+
+# -- queries ------------------------------------------------------------------
+
+def series(rollups, period: str, since: datetime, until: datetime, capacity: int) -> list[dict]:
+    """Chart points for every bucket in [since, until), zero-filled.
+
+    ``rollups`` is a PlaceUsage/SlotUsage queryset already narrowed to the
+    places or slot of interest; rows of several places are summed.
+    ``capacity`` is the number of slots the occupancy rate is relative to.
+    """
+    size = PERIODS[period]
+    totals = {
+        row['bucket']: row
+        for row in rollups.filter(period=period, bucket__gte=since, bucket__lt=until)
+        .values('bucket')
+        .annotate(occupied=Sum('occupied_seconds'), started=Sum('bookings'), earned=Sum('revenue'))
+        .order_by()
+    }
+    points = []
+    b = bucket_start(since, period)
+    while b < until:
+        row = totals.get(b, {})
+        occupied = row.get('occupied') or 0
+        points.append({
+            'bucket': b.isoformat(),
+            'occupied_hours': round(occupied / 3600, 2),
+            'occupancy_rate': round(occupied / (capacity * size), 4) if capacity else 0.0,
+            'bookings': row.get('started') or 0,
+            'revenue': str((row.get('earned') or Decimal(0)).quantize(CENTS)),
+        })
+        b += timedelta(seconds=size)
+    return points
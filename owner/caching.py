@@ -0,0 +1,115 @@
+"""Versioned cache keys for search results and slot grids.
+
+Entries are never deleted. Their keys embed stamps that change whenever
+the data behind them does, so one change orphans every dependent entry at
+once and the orphans age out of the cache:
+
+- ``places`` changes when any place is saved or deleted. Search results
+  depend on every place's name, location, price and vehicle types (city
+  and area filters are prefix matches), so one stamp covers them all.
+- ``grid:<place id>`` changes when the place, one of its slots or the
+  active bookings of its slots change; it keys the place's slot grid.
+- ``bookings:<customer id>`` changes when any booking of the customer is
+  created, changes status or is deleted; it versions the API's booking
+  list (api/views.py).
+
+Stamps change on commit. Changing them earlier would let a request read the
+new stamp but the old rows and cache those rows under it. Entries are
+filled from the primary database for the same reason. A stamp is the time
+in nanoseconds rather than a counter, so a stamp evicted from the cache and
+recreated never repeats one that old entries were stored under.
+
+The local-memory cache (the default) is per process. Deployments running
+several processes need the file or Redis backend (PARKEASY_CACHE, see
+parkeasy/cacheprofiles.py) so that invalidations reach every process;
+without one (``settings.CACHE_SHARED`` off) fragments and API bodies are
+built on every request instead.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from parkeasy.replicas import primary_reads
+
+SEARCH_TIMEOUT = 300
+GRID_TIMEOUT = 300
+BOOKINGS_TIMEOUT = 300
+PLACES = 'places'
+
+
+def enabled() -> bool:
+    """Whether stamp changes reach every process, so entries can be served."""
+    return getattr(settings, 'CACHE_SHARED', True)
+
+
+def _stamp_key(name: str) -> str:
+    return f'stamp:{name}'
+
+
+def stamp(name: str) -> int:
+    key = _stamp_key(name)
+    value = cache.get(key)
+    if value is None:
+        value = time.time_ns()
+        if not cache.add(key, value, None):
+            value = cache.get(key, value)
+    return value
+
+
+def _bump(names) -> None:
+    now = time.time_ns()
+    cache.set_many({_stamp_key(name): now for name in names}, None)
+
+
+def bump(*names: str) -> None:
+    """Give ``names`` new stamps once the current transaction commits."""
+    if names:
+        transaction.on_commit(lambda: _bump(names))
+
+
+def places_changed() -> None:
+    bump(PLACES)
+
+
+def grids_changed(*place_ids: int) -> None:
+    bump(*(f'grid:{place_id}' for place_id in set(place_ids)))
+
+
+def bookings_changed(*customer_ids: int) -> None:
+    bump(*(f'bookings:{customer_id}' for customer_id in set(customer_ids)))
+
+
+def _digest(parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def search_key(params: dict) -> str:
+    """Key of the search results for already normalized ``params``."""
+    return f'search:{stamp(PLACES)}:{_digest(params)}'
+
+
+def grid_key(place_id: int, *parts) -> str:
+    return f'grid:{place_id}:{stamp(f"grid:{place_id}")}:{_digest(parts)}'
+
+
+def bookings_key(customer_id: int, *parts) -> str:
+    return f'bookings:{customer_id}:{stamp(f"bookings:{customer_id}")}:{_digest(parts)}'
+
+
+def cached_fragment(key: str, timeout: int, template_name: str, context, request=None) -> str:
+    """``template_name`` rendered with ``context()``, from the cache when
+    ``key`` is there. The context is built reading the primary."""
+    if not enabled():
+        return mark_safe(render_to_string(template_name, context(), request))
+    html = cache.get(key)
+    if html is None:
+        with primary_reads():
+            html = render_to_string(template_name, context(), request)
+        cache.set(key, html, timeout)
+    return mark_safe(html)
@@ -0,0 +1,86 @@
+"""Deleting places and slots with set-based bookkeeping.
+
+Deleting a place or slot cascades to its bookings and payments, and the
+per-row delete handlers would then adjust the dashboard counters and
+rollups once per booking and payment: thousands of UPDATEs for one busy
+lot. These functions work out the same changes with a few aggregate
+queries and then delete with those per-row handlers muted. The place's
+own handler (area counts, search index, place counter) still runs.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from customer.models import ACTIVE_BOOKING_STATUSES, Booking, CustomerStats
+from payment.models import Payment
+from . import analytics, caching, pricing
+from .models import OwnerStats, ParkingSlot
+
+_muted = ContextVar('owner_bulk_delete', default=False)
+
+
+def handlers_muted() -> bool:
+    """True inside delete_slots()/delete_place(), whose cascades are
+    accounted for up front."""
+    return _muted.get()
+
+
+@contextmanager
+def _muting():
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+def _release_bookings(owner_id: int, slots) -> None:
+    """Take the bookings and payments of ``slots`` out of the counters."""
+    bookings = Booking.objects.filter(slot__in=slots)
+    paid = Payment.objects.filter(booking__slot__in=slots, status='success')
+    active = Q(status__in=ACTIVE_BOOKING_STATUSES)
+    totals = bookings.aggregate(n=Count('id'), active=Count('id', filter=active))
+    if not totals['n']:
+        return
+    customers = defaultdict(dict)
+    for row in bookings.values('customer_id').annotate(n=Count('id'), active=Count('id', filter=active)).order_by():
+        customers[row['customer_id']].update(bookings=-row['n'], active_bookings=-row['active'])
+    revenue = Decimal(0)
+    for row in paid.values('booking__customer_id').annotate(total=Sum('amount')).order_by():
+        customers[row['booking__customer_id']]['total_spent'] = -row['total']
+        revenue += row['total']
+    CustomerStats.bump_many('customer', customers)
+    caching.bookings_changed(*customers)
+    OwnerStats.bump(
+        OwnerStats.objects.filter(owner_id=owner_id),
+        bookings=-totals['n'], active_bookings=-totals['active'], revenue=-revenue,
+    )
+
+
+def delete_slots(place, slots) -> int:
+    """Delete the ``slots`` queryset (slots of ``place``) and everything that
+    cascades from it; returns the number of slots deleted."""
+    slots = slots.filter(place=place)
+    with transaction.atomic():
+        _release_bookings(place.owner_id, slots)
+        analytics.remove_slots(place.pk, slots)
+        with _muting():
+            _, per_model = slots.delete()
+        deleted = per_model.get(ParkingSlot._meta.label, 0)
+        OwnerStats.bump(OwnerStats.objects.filter(owner_id=place.owner_id), slots=-deleted)
+    pricing.invalidate(place.pk)
+    caching.grids_changed(place.pk)
+    return deleted
+
+
+def delete_place(place) -> None:
+    """Delete ``place`` with its slots, bookings, payments and rollups."""
+    with transaction.atomic():
+        _release_bookings(place.owner_id, place.slots.all())
+        with _muting():
+            _, per_model = place.delete()
+        OwnerStats.bump(OwnerStats.objects.filter(owner_id=place.owner_id), slots=-per_model.get(ParkingSlot._meta.label, 0))
@@ -0,0 +1,128 @@
+"""Streaming CSV/JSONL exports of an owner's bookings and payments.
+
+Rows are read with ``values_list(...).iterator(chunk_size=CHUNK_SIZE)``, so
+neither the database driver nor Django holds more than one chunk, and are
+written out as they arrive. Memory use does not depend on the number of
+rows, and the first bytes reach the client as soon as the first chunk is
+read, so long exports never sit silent long enough for a proxy or worker
+timeout.
+"""
+import csv
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from django.utils import timezone
+
+from customer.models import Booking
+from payment.models import Payment
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+CHUNK_SIZE = 2000
+
+
+@dataclass(frozen=True)
+class Export:
+    name: str
+    model: type
+    owner_field: str
+    # (column heading, field path) pairs.
+    columns: tuple
+
+    def rows(self, owner, start=None, end=None):
+        """Value tuples of ``owner``'s rows created in [start, end), oldest first."""
+        queryset = self.model.objects.filter(**{self.owner_field: owner})
+        if start is not None:
+            queryset = queryset.filter(created_at__gte=start)
+        if end is not None:
+            queryset = queryset.filter(created_at__lt=end)
+        # Pick the database now: the replica routing of the request is
+        # gone by the time the response is streamed.
+        queryset = queryset.using(router.db_for_read(self.model)).order_by('created_at', 'id')
+        return queryset.values_list(*(path for _, path in self.columns)).iterator(chunk_size=CHUNK_SIZE)
+
+
+BOOKINGS = Export('bookings', Booking, 'slot__place__owner', (
+    ('booking_id', 'id'),
+    ('created_at', 'created_at'),
+    ('place_id', 'slot__place_id'),
+    ('place', 'slot__place__name'),
+    ('slot', 'slot__code'),
+    ('customer', 'customer__username'),
+    ('start_time', 'start_time'),
+    ('end_time', 'end_time'),
+    ('status', 'status'),
+    ('vehicle_type', 'vehicle_type'),
+))
+
+PAYMENTS = Export('payments', Payment, 'booking__slot__place__owner', (
+    ('payment_id', 'id'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+    ('booking_id', 'booking_id'),
+    ('place_id', 'booking__slot__place_id'),
+    ('place', 'booking__slot__place__name'),
+    ('slot', 'booking__slot__code'),
+    ('customer', 'booking__customer__username'),
+    ('amount', 'amount'),
+    ('status', 'status'),
+    ('reference', 'reference'),
+    ('failure_reason', 'failure_reason'),
+))
+
+
+def parse_bound(value: str | None, end: bool = False) -> datetime | None:
+    """An aware datetime from an ISO date or datetime, or None when blank.
+
+    A bare date as the ``end`` bound includes that whole day. Raises
+    ValueError when the value is malformed.
+    """
+    if not value:
+        return None
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+    else:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class _Lines:
+    """File-like target collecting what csv.writer writes."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def take(self) -> bytes:
+        data, self.parts = ''.join(self.parts).encode(), []
+        return data
+
+
+def stream(export: Export, rows, fmt: str):
+    """Encoded chunks of ``rows`` in ``fmt``, about one per database chunk."""
+    headings = [heading for heading, _ in export.columns]
+    if fmt == 'csv':
+        lines = _Lines()
+        writer = csv.writer(lines)
+        writer.writerow(headings)
+        for n, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if n % CHUNK_SIZE == 0:
+                yield lines.take()
+        if lines.parts:
+            yield lines.take()
+        return
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    parts = []
+    for n, row in enumerate(rows, start=1):
+        parts.append(encoder.encode(dict(zip(headings, row))))
+        if n % CHUNK_SIZE == 0:
+            yield ('\n'.join(parts) + '\n').encode()
+            parts = []
+    if parts:
+        yield ('\n'.join(parts) + '\n').encode()
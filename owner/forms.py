@@ -1,5 +1,6 @@
 from django import forms
-from .models import ParkingPlace, ParkingSlot
+from .models import ParkingPlace, ParkingSlot, VEHICLE_TYPE_CHOICES
+from .slots import MAX_BULK_SLOTS, SlotPatternError, expand_codes, parse_prices
 
 CITY_CHOICES = (
     ('Pune', 'Pune'),
@@ -9,14 +10,8 @@ CITY_CHOICES = (
 
 
 class ParkingPlaceForm(forms.ModelForm):
-    number_of_slots = forms.IntegerField(min_value=0, initial=0, help_text='Create this many slots initially')
-    VEHICLE_CHOICES = (
-        ('2_wheeler', '2 Wheeler'),
-        ('3_wheeler', '3 Wheeler'),
-        ('4_wheeler', '4 Wheeler'),
-        ('single_axle', 'Single Axle'),
-        ('double_axle', 'Double Axle'),
-    )
+    number_of_slots = forms.IntegerField(min_value=0, max_value=MAX_BULK_SLOTS, initial=0, help_text='Create this many slots initially')
+    VEHICLE_CHOICES = VEHICLE_TYPE_CHOICES
     allowed_vehicle_types_field = forms.MultipleChoiceField(
         required=False,
         choices=VEHICLE_CHOICES,
@@ -26,7 +21,7 @@ class ParkingPlaceForm(forms.ModelForm):
 
     class Meta:
         model = ParkingPlace
-        fields = ['name', 'address', 'area', 'city', 'price_per_hour', 'description']
+        fields = ['name', 'address', 'area', 'city', 'price_per_hour', 'description', 'latitude', 'longitude']
         widgets = {
             'city': forms.Select(choices=CITY_CHOICES),
             'area': forms.TextInput(attrs={'placeholder': 'Area (required for Pune)'}),
@@ -38,8 +33,7 @@ class ParkingPlaceForm(forms.ModelForm):
         # Initialize allowed_vehicle_types_field from model's CSV
         instance: ParkingPlace | None = kwargs.get('instance')
         if instance and instance.allowed_vehicle_types:
-            current = [v.strip() for v in instance.allowed_vehicle_types.split(',') if v.strip()]
-            self.fields['allowed_vehicle_types_field'].initial = current
+            self.fields['allowed_vehicle_types_field'].initial = instance.vehicle_type_list
 
     def clean(self):
         cleaned = super().clean()
@@ -47,6 +41,13 @@ class ParkingPlaceForm(forms.ModelForm):
         area = cleaned.get('area')
         if city == 'Pune' and not area:
             self.add_error('area', 'Area is required for Pune')
+        lat, lng = cleaned.get('latitude'), cleaned.get('longitude')
+        if (lat is None) != (lng is None):
+            self.add_error('longitude' if lng is None else 'latitude', 'Provide both latitude and longitude.')
+        if lat is not None and not -90 <= lat <= 90:
+            self.add_error('latitude', 'Latitude must be between -90 and 90.')
+        if lng is not None and not -180 <= lng <= 180:
+            self.add_error('longitude', 'Longitude must be between -180 and 180.')
         return cleaned
 
     def save(self, commit=True):
@@ -62,3 +63,69 @@ class ParkingSlotForm(forms.ModelForm):
     class Meta:
         model = ParkingSlot
         fields = ['code', 'is_available', 'price_per_hour']
+
+
+class BulkSlotCreateForm(forms.Form):
+    codes = forms.CharField(
+        widget=forms.Textarea(attrs={'rows': 2, 'placeholder': 'A001-A500, B01-B20, VIP1'}),
+        help_text='Slot codes and ranges separated by commas or spaces.',
+    )
+    prefixes = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'placeholder': 'L1-, L2-'}),
+        help_text='Optional per-level prefixes added to every code.',
+    )
+    price_per_hour = forms.DecimalField(max_digits=8, decimal_places=2, min_value=0, required=False)
+    is_available = forms.BooleanField(required=False, initial=True)
+
+    def clean(self):
+        cleaned = super().clean()
+        prefixes = [p.strip() for p in (cleaned.get('prefixes') or '').split(',') if p.strip()]
+        try:
+            cleaned['code_list'] = expand_codes(cleaned.get('codes') or '', prefixes)
+        except SlotPatternError as exc:
+            self.add_error('codes', str(exc))
+        return cleaned
+
+
+class BulkSlotUpdateForm(forms.Form):
+    ACTION_CHOICES = (
+        ('enable', 'Mark available'),
+        ('disable', 'Mark unavailable'),
+        ('prices', 'Set prices'),
+        ('delete', 'Delete'),
+    )
+    action = forms.ChoiceField(choices=ACTION_CHOICES)
+    codes = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'placeholder': 'A001-A100 (blank = all slots)'}),
+        help_text='Slots to change; leave blank for every slot (not for deleting). Not used for prices.',
+    )
+    prices = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'rows': 3, 'placeholder': 'A001-A100 = 60\nB01-B20 = 80'}),
+        help_text='One "PATTERN = PRICE" per line; an empty price falls back to the place price.',
+    )
+
+    def clean(self):
+        cleaned = super().clean()
+        try:
+            if cleaned.get('action') == 'prices':
+                cleaned['price_map'] = parse_prices(cleaned.get('prices') or '')
+                if not cleaned['price_map']:
+                    self.add_error('prices', 'Enter at least one "PATTERN = PRICE" line.')
+            else:
+                codes = cleaned.get('codes') or ''
+                cleaned['code_list'] = expand_codes(codes) if codes.strip() else None
+                # Deleting cascades to the slots' bookings and payments, so
+                # it never defaults to the whole place.
+                if cleaned.get('action') == 'delete' and not cleaned['code_list']:
+                    self.add_error('codes', 'Enter the codes of the slots to delete.')
+        except SlotPatternError as exc:
+            self.add_error('prices' if cleaned.get('action') == 'prices' else 'codes', str(exc))
+        return cleaned
+
+
+class PlaceImportForm(forms.Form):
+    file = forms.FileField(help_text='A .csv or .jsonl file with one place per row.')
+    dry_run = forms.BooleanField(required=False, initial=True, label='Dry run (check the file without importing)')
@@ -0,0 +1,316 @@
+"""Ranked full-text search over parking places.
+
+On SQLite the index is an FTS5 virtual table (created by migration 0007)
+ranked with bm25(). Other databases fall back to an in-process inverted
+index with the same interface and BM25 scoring, built lazily from the
+places table. Both are kept in sync by the ParkingPlace signal handlers.
+
+The inverted index only sees the changes of its own process, so with
+several processes (``settings.WORKER_PROCESSES``) and no FTS5, search
+matches substrings in the places table instead, without BM25 ranking.
+"""
+import bisect
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, connections, router
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from .models import ParkingPlace
+
+FTS_TABLE = 'owner_parkingplace_fts'
+# Indexed columns and their bm25 weights; a hit in the name counts most.
+COLUMNS = (('name', 10.0), ('address', 2.0), ('area', 3.0), ('city', 1.0), ('description', 1.0))
+MAX_QUERY_TERMS = 8
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t.casefold() for t in _TOKEN_RE.findall(text or '')]
+
+
+def document(place) -> dict:
+    return {name: getattr(place, name) or '' for name, _ in COLUMNS}
+
+
+class FTS5Index:
+    """SQLite FTS5 table keyed by place id (the FTS rowid)."""
+
+    def update(self, place) -> None:
+        cols = [name for name, _ in COLUMNS]
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [place.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(cols)}) VALUES (%s{", %s" * len(cols)})',
+                [place.pk, *document(place).values()],
+            )
+
+    def update_many(self, places) -> None:
+        """``update`` for each of ``places``, as two executemany batches."""
+        cols = [name for name, _ in COLUMNS]
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [[place.pk] for place in places])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(cols)}) VALUES (%s{", %s" * len(cols)})',
+                [[place.pk, *document(place).values()] for place in places],
+            )
+
+    def remove(self, place_id: int) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [place_id])
+
+    def _match(self, query: str) -> str:
+        # Quote every term so user input is never parsed as FTS syntax; the
+        # last term is a prefix match to support search-as-you-type.
+        terms = tokenize(query)[:MAX_QUERY_TERMS]
+        if not terms:
+            return ''
+        return ' '.join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+
+    def _where(self, query: str, restrict_to):
+        sql, params = f'{FTS_TABLE} MATCH %s', [self._match(query)]
+        if restrict_to is not None:
+            sub_sql, sub_params = restrict_to.values('id').query.sql_with_params()
+            sql += f' AND rowid IN ({sub_sql})'
+            params.extend(sub_params)
+        return sql, params
+
+    def count(self, query: str, restrict_to=None) -> int:
+        if not self._match(query):
+            return 0
+        where, params = self._where(query, restrict_to)
+        with connections[router.db_for_read(ParkingPlace)].cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {where}', params)
+            return cursor.fetchone()[0]
+
+    def search(self, query: str, limit: int, offset: int = 0, restrict_to=None) -> list[int]:
+        if not self._match(query):
+            return []
+        where, params = self._where(query, restrict_to)
+        weights = ', '.join(str(w) for _, w in COLUMNS)
+        with connections[router.db_for_read(ParkingPlace)].cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {where} '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}), rowid LIMIT %s OFFSET %s',
+                [*params, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def rebuild(self) -> None:
+        cols = ', '.join(name for name, _ in COLUMNS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {cols}) '
+                f'SELECT id, {cols} FROM {ParkingPlace._meta.db_table}'
+            )
+
+
+class InvertedIndex:
+    """In-process stand-in for FTS5: term -> {place_id: field-weighted tf}."""
+
+    k1, b = 1.2, 0.75
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._postings = defaultdict(dict)
+        self._doc_terms = {}
+        self._doc_len = {}
+        self._sorted_terms = None
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.rebuild()
+
+    def _index(self, place_id, doc):
+        weights = dict(COLUMNS)
+        tf = Counter()
+        for name, text in doc.items():
+            for term in tokenize(text):
+                tf[term] += weights[name]
+        self._doc_terms[place_id] = set(tf)
+        self._doc_len[place_id] = sum(tf.values())
+        for term, freq in tf.items():
+            self._postings[term][place_id] = freq
+        self._sorted_terms = None
+
+    def _unindex(self, place_id):
+        for term in self._doc_terms.pop(place_id, ()):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(place_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._doc_len.pop(place_id, None)
+        self._sorted_terms = None
+
+    def update(self, place) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            self._unindex(place.pk)
+            self._index(place.pk, document(place))
+
+    def update_many(self, places) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            for place in places:
+                self._unindex(place.pk)
+                self._index(place.pk, document(place))
+
+    def remove(self, place_id: int) -> None:
+        with self._lock:
+            self._unindex(place_id)
+
+    def _postings_for(self, term, is_prefix):
+        if not is_prefix:
+            return [self._postings.get(term, {})]
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self._postings)
+        start = bisect.bisect_left(self._sorted_terms, term)
+        end = bisect.bisect_left(self._sorted_terms, term + '\U0010ffff')
+        return [self._postings[t] for t in self._sorted_terms[start:end]]
+
+    def _ranked(self, query, restrict_to):
+        terms = tokenize(query)[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        allowed = set(restrict_to.values_list('id', flat=True)) if restrict_to is not None else None
+        with self._lock:
+            self._ensure_loaded()
+            n_docs = max(len(self._doc_len), 1)
+            avg_len = sum(self._doc_len.values()) / n_docs or 1.0
+            scores, matched = defaultdict(float), None
+            for i, term in enumerate(terms):
+                hits = {}
+                for postings in self._postings_for(term, is_prefix=i == len(terms) - 1):
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, tf in postings.items():
+                        norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                        hits[doc_id] = hits.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+                matched = set(hits) if matched is None else matched & set(hits)
+                for doc_id, score in hits.items():
+                    scores[doc_id] += score
+        if allowed is not None:
+            matched &= allowed
+        return sorted(matched, key=lambda d: (-scores[d], d))
+
+    def count(self, query: str, restrict_to=None) -> int:
+        return len(self._ranked(query, restrict_to))
+
+    def search(self, query: str, limit: int, offset: int = 0, restrict_to=None) -> list[int]:
+        return self._ranked(query, restrict_to)[offset:offset + limit]
+
+    def rebuild(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_terms.clear()
+            self._doc_len.clear()
+            self._sorted_terms = None
+            for place in ParkingPlace.objects.only('id', *(n for n, _ in COLUMNS)).iterator(chunk_size=2000):
+                self._index(place.pk, document(place))
+            self._loaded = True
+
+
+class DatabaseIndex:
+    """Substring matches in the places table: every term must occur in one
+    of the indexed columns; places with more terms in the name come first.
+    Nothing to maintain, so it is the same in every process."""
+
+    def update(self, place) -> None:
+        pass
+
+    def update_many(self, places) -> None:
+        pass
+
+    def remove(self, place_id: int) -> None:
+        pass
+
+    def rebuild(self) -> None:
+        pass
+
+    def _matches(self, query: str, restrict_to):
+        terms = tokenize(query)[:MAX_QUERY_TERMS]
+        if not terms:
+            return None, terms
+        places = ParkingPlace.objects.all() if restrict_to is None else restrict_to.order_by()
+        for term in terms:
+            any_column = Q()
+            for name, _ in COLUMNS:
+                any_column |= Q(**{f'{name}__icontains': term})
+            places = places.filter(any_column)
+        return places, terms
+
+    def count(self, query: str, restrict_to=None) -> int:
+        places, _ = self._matches(query, restrict_to)
+        return 0 if places is None else places.count()
+
+    def search(self, query: str, limit: int, offset: int = 0, restrict_to=None) -> list[int]:
+        places, terms = self._matches(query, restrict_to)
+        if places is None:
+            return []
+        name_hits = sum(
+            (Case(When(name__icontains=term, then=Value(1)), default=Value(0), output_field=IntegerField()) for term in terms),
+            Value(0),
+        )
+        return list(
+            places.annotate(name_hits=name_hits).order_by('-name_hits', 'id')
+            .values_list('id', flat=True)[offset:offset + limit]
+        )
+
+
+_fts5 = FTS5Index()
+_inverted = InvertedIndex()
+_database = DatabaseIndex()
+
+
+@lru_cache(maxsize=None)
+def fts5_available() -> bool:
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE probe USING fts5(a)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def get_index():
+    """The index for the current database connection."""
+    if connection.vendor == 'sqlite' and fts5_available():
+        return _fts5
+    if getattr(settings, 'WORKER_PROCESSES', 1) <= 1:
+        return _inverted
+    return _database
+
+
+class RankedPlaces:
+    """Lazily evaluated, sliceable search result usable with Paginator."""
+
+    def __init__(self, query: str, restrict_to=None):
+        self.query = query
+        self.restrict_to = restrict_to
+        self.index = get_index()
+        self._count = None
+
+    def count(self) -> int:
+        if self._count is None:
+            self._count = self.index.count(self.query, self.restrict_to)
+        return self._count
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop if key.stop is not None else self.count()
+        ids = self.index.search(self.query, limit=max(stop - start, 0), offset=start, restrict_to=self.restrict_to)
+        places = ParkingPlace.objects.in_bulk(ids)
+        return [places[i] for i in ids if i in places]
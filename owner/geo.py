@@ -0,0 +1,146 @@
+"""Geohash cells and distance helpers for radius search without PostGIS.
+
+Places store the geohash of their coordinates in an indexed column. A radius
+query picks the finest precision whose cell is at least as large as the
+radius, so the circle is always covered by the centre cell and its eight
+neighbours; each cell becomes an index range scan on the geohash prefix.
+Candidates are read as (id, latitude, longitude) only; full rows are loaded
+for the at most ``MAX_RESULTS`` nearest.
+"""
+import heapq
+import math
+
+from django.db.models import Q
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+# Most places a radius search returns, however many are inside the circle.
+MAX_RESULTS = 50
+
+
+def encode(lat: float, lng: float, precision: int = MAX_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = (ch << 1) | 1, mid
+            else:
+                ch, lng_hi = ch << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = (ch << 1) | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[ch])
+            bits, ch = 0, 0
+    return ''.join(chars)
+
+
+def cell_size_deg(precision: int):
+    """(height, width) in degrees of a geohash cell."""
+    total_bits = 5 * precision
+    lat_bits = total_bits // 2
+    lng_bits = total_bits - lat_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def precision_for_radius(radius_km: float, lat: float) -> int:
+    """Finest precision whose cells are at least ``radius_km`` on each side."""
+    cos_lat = max(math.cos(math.radians(lat)), 0.01)
+    for precision in range(MAX_PRECISION, 0, -1):
+        height, width = cell_size_deg(precision)
+        if height * KM_PER_DEGREE_LAT >= radius_km and width * KM_PER_DEGREE_LAT * cos_lat >= radius_km:
+            return precision
+    return 1
+
+
+def covering_cells(lat: float, lng: float, radius_km: float) -> set:
+    """Geohash prefixes (centre + neighbours) that cover the search circle."""
+    precision = precision_for_radius(radius_km, lat)
+    height, width = cell_size_deg(precision)
+    cells = set()
+    for dlat in (-height, 0.0, height):
+        for dlng in (-width, 0.0, width):
+            nlat = lat + dlat
+            if nlat > 90.0 or nlat < -90.0:
+                continue
+            nlng = (lng + dlng + 180.0) % 360.0 - 180.0
+            cells.add(encode(nlat, nlng, precision))
+    return cells
+
+
+def bounding_box(lat: float, lng: float, radius_km: float):
+    """(min_lat, max_lat, min_lng, max_lng) enclosing the circle."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlng = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return lat - dlat, lat + dlat, lng - dlng, lng + dlng
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _nearest_ids(places, lat: float, lng: float, radius_km: float, limit: int) -> list[tuple]:
+    """``(distance_km, id)`` of the ``limit`` nearest places within
+    ``radius_km``, nearest first."""
+    cells = Q()
+    for cell in covering_cells(lat, lng, radius_km):
+        cells |= Q(geohash__gte=cell, geohash__lt=cell + '{')
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    candidates = places.filter(cells, latitude__gte=min_lat, latitude__lte=max_lat)
+    if min_lng >= -180.0 and max_lng <= 180.0:
+        candidates = candidates.filter(longitude__gte=min_lng, longitude__lte=max_lng)
+    inside = []
+    for pk, place_lat, place_lng in candidates.order_by().values_list('pk', 'latitude', 'longitude').iterator():
+        distance = haversine_km(lat, lng, place_lat, place_lng)
+        if distance <= radius_km:
+            inside.append((distance, pk))
+    return heapq.nsmallest(limit, inside)
+
+
+def _load(places, found: list[tuple]) -> list:
+    rows = places.in_bulk([pk for _, pk in found])
+    results = []
+    for distance, pk in found:
+        place = rows[pk]
+        place.distance_km = distance
+        results.append(place)
+    return results
+
+
+def nearby(places, lat: float, lng: float, radius_km: float, limit: int = MAX_RESULTS):
+    """Places from ``places`` within ``radius_km``, nearest first, at most
+    ``limit`` (no more than MAX_RESULTS) of them.
+
+    Only rows in the covering geohash cells (and the bounding box) are
+    read; exact distances are computed for those candidates alone. Each
+    returned place carries a ``distance_km`` attribute.
+    """
+    return _load(places, _nearest_ids(places, lat, lng, radius_km, min(limit, MAX_RESULTS)))
+
+
+def nearest(places, lat: float, lng: float, k: int, max_radius_km: float = 50.0):
+    """The ``k`` (at most MAX_RESULTS) places nearest to (lat, lng), searching
+    outwards up to ``max_radius_km``. Everything within the final radius is
+    a candidate, so once ``k`` are found inside it they are the true k
+    nearest."""
+    k = min(k, MAX_RESULTS)
+    radius = min(1.0, max_radius_km)
+    while True:
+        found = _nearest_ids(places, lat, lng, radius, k)
+        if len(found) >= k or radius >= max_radius_km:
+            return _load(places, found)
+        radius = min(radius * 2, max_radius_km)
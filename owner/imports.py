@@ -0,0 +1,206 @@
+"""Bulk import of parking places and their slots from CSV or JSONL.
+
+One row per place, with the ``ParkingPlaceForm`` fields (``name``,
+``address``, ``area``, ``city``, ``price_per_hour``, ``description``,
+``latitude``, ``longitude``) plus:
+
+``vehicle_types``
+    Accepted vehicle type codes, separated by commas, semicolons or spaces
+    (a list in JSONL).
+``slots``
+    A slot pattern such as ``A001-A100, VIP1`` (see owner/slots.py) or,
+    in JSONL, a list of codes.
+``number_of_slots``
+    Used when ``slots`` is empty: creates S001, S002, ... like the add
+    place page.
+
+Rows are read one at a time and validated by ``ParkingPlaceForm``, so the
+same rules apply as on the add place page (area required for Pune,
+coordinates in range, known vehicle types). Invalid rows are reported
+through ``on_error`` and skipped. Valid rows are written in chunks of
+``chunk_size`` places (or ``CHUNK_SLOTS`` slots), each one transaction of
+bulk INSERTs. Memory use depends on the chunk size, not the file size.
+A failure part way keeps the chunks already written, so check big
+files with ``dry_run`` first: it validates every row and writes nothing.
+
+``bulk_create`` bypasses the model signals, so the side effects of saving
+a place (area counts, the owner's counters, the full-text index, the
+search cache stamp) are applied here once per chunk.
+"""
+import csv
+import json
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass
+
+from django.db import transaction
+
+from . import caching, fulltext
+from . import slots as slot_ops
+from .forms import ParkingPlaceForm
+from .models import OwnerStats, ParkingPlace, ParkingSlot, PlaceArea, PlaceVehicleType
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 200
+CHUNK_SLOTS = 10_000
+PLACE_FIELDS = ('name', 'address', 'area', 'city', 'price_per_hour', 'description', 'latitude', 'longitude')
+_LIST_SEPARATOR_RE = re.compile(r'[\s,;|]+')
+# Report names for form fields whose names differ from the file's columns.
+_FIELD_NAMES = {'allowed_vehicle_types_field': 'vehicle_types', '__all__': ''}
+
+
+class ImportFormatError(ValueError):
+    """The file is not in a supported format."""
+
+
+@dataclass(frozen=True)
+class RowError:
+    line: int
+    field: str
+    message: str
+
+
+@dataclass
+class ImportResult:
+    rows: int = 0
+    places: int = 0
+    slots: int = 0
+    rejected: int = 0
+    chunks: int = 0
+    dry_run: bool = False
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def format_for(filename: str) -> str:
+    """The import format named by a file's extension."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension == 'csv':
+        return 'csv'
+    raise ImportFormatError(f'Cannot tell the format of {filename!r}; use a .csv or .jsonl file.')
+
+
+def read_rows(stream, fmt: str):
+    """``(line number, row dict or RowError)`` for each record of a text
+    stream (opened with ``newline=''`` for CSV)."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {key.strip(): value for key, value in row.items() if key}
+    elif fmt == 'jsonl':
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as exc:
+                yield line, RowError(line, '', f'Invalid JSON: {exc}')
+                continue
+            if not isinstance(row, dict):
+                yield line, RowError(line, '', 'Expected a JSON object.')
+                continue
+            yield line, row
+    else:
+        raise ImportFormatError(f'Unknown format {fmt!r}; expected one of {", ".join(FORMATS)}.')
+
+
+def _as_list(value) -> list[str]:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item for item in _LIST_SEPARATOR_RE.split(str(value).strip()) if item]
+
+
+def _text(value) -> str:
+    return '' if value is None else str(value).strip()
+
+
+def _slot_codes(row: dict, number_of_slots: int) -> list[str]:
+    slots = row.get('slots')
+    if isinstance(slots, (list, tuple)):
+        return slot_ops.expand_codes(' '.join(_as_list(slots)))
+    if _text(slots):
+        return slot_ops.expand_codes(_text(slots))
+    return [f'S{i:03}' for i in range(1, number_of_slots + 1)]
+
+
+def validate_row(line: int, row: dict):
+    """``(place, slot codes)`` for a valid row, else the list of its RowErrors."""
+    data = {name: _text(row.get(name)) for name in PLACE_FIELDS}
+    data['allowed_vehicle_types_field'] = _as_list(row.get('vehicle_types'))
+    data['number_of_slots'] = _text(row.get('number_of_slots')) or '0'
+    form = ParkingPlaceForm(data)
+    errors = [] if form.is_valid() else [
+        RowError(line, _FIELD_NAMES.get(field, field), message)
+        for field, messages in form.errors.items() for message in messages
+    ]
+    try:
+        codes = _slot_codes(row, form.cleaned_data.get('number_of_slots') or 0)
+    except slot_ops.SlotPatternError as exc:
+        errors.append(RowError(line, 'slots', str(exc)))
+    if errors:
+        return errors
+    return form.save(commit=False), codes
+
+
+def _write_chunk(owner, chunk: list) -> int:
+    """Insert the ``(place, codes)`` pairs of ``chunk``; returns the slot count."""
+    places = []
+    for place, _ in chunk:
+        place.owner = owner
+        place.fill_derived_fields()
+        places.append(place)
+    with transaction.atomic():
+        ParkingPlace.objects.bulk_create(places)
+        PlaceVehicleType.objects.bulk_create(
+            PlaceVehicleType(place=place, vehicle_type=v) for place in places for v in place.vehicle_type_list
+        )
+        slots = [ParkingSlot(place=place, code=code) for place, codes in chunk for code in codes]
+        ParkingSlot.objects.bulk_create(slots, batch_size=slot_ops.BATCH_SIZE)
+        for (city, area), count in Counter((place.city, place.area) for place in places).items():
+            PlaceArea.adjust(city, area, count)
+        OwnerStats.bump_or_create({'owner_id': owner.pk}, places=len(places), slots=len(slots))
+        fulltext.get_index().update_many(places)
+        caching.places_changed()
+    return len(slots)
+
+
+def import_places(owner, rows, *, dry_run: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  on_error=None) -> ImportResult:
+    """Import ``(line, row)`` pairs from ``read_rows`` as places of ``owner``.
+
+    ``on_error(RowError)`` is called for every problem found; the row is
+    skipped.
+    """
+    result = ImportResult(dry_run=dry_run)
+    chunk, chunk_slots = [], 0
+
+    def flush():
+        nonlocal chunk, chunk_slots
+        if chunk and not dry_run:
+            result.slots += _write_chunk(owner, chunk)
+            result.chunks += 1
+        elif chunk:
+            result.slots += chunk_slots
+        chunk, chunk_slots = [], 0
+
+    for line, row in rows:
+        result.rows += 1
+        outcome = [row] if isinstance(row, RowError) else validate_row(line, row)
+        if isinstance(outcome, list):
+            result.rejected += 1
+            for error in outcome:
+                if on_error is not None:
+                    on_error(error)
+            continue
+        chunk.append(outcome)
+        chunk_slots += len(outcome[1])
+        result.places += 1
+        if len(chunk) >= chunk_size or chunk_slots >= CHUNK_SLOTS:
+            flush()
+    flush()
+    return result
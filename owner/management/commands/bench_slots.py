@@ -0,0 +1,57 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from owner import slots as slot_ops
+from owner.models import ParkingPlace, ParkingSlot
+from parkeasy.bench import bench_users
+
+
+class Command(BaseCommand):
+    help = 'Compare onboarding a large lot one INSERT per slot against the bulk slot path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--slots', type=int, default=2000)
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **opts):
+        count = opts['slots']
+        codes = slot_ops.expand_codes(f'A1-{count}') if count else []
+        report = {'slots': count}
+        with bench_users() as (owner, _customer):
+            report['per_row_create_ms'] = self._timed(owner, lambda place: [
+                ParkingSlot.objects.create(place=place, code=code, is_available=True) for code in codes
+            ])
+            report['bulk_create_ms'] = self._timed(owner, lambda place: slot_ops.create_slots(place, codes))
+
+            place = ParkingPlace.objects.create(owner=owner, name='Bench lot', address='-', area='Bench', city='Pune')
+            slot_ops.create_slots(place, codes)
+            prices = {code: 50 + i % 7 for i, code in enumerate(codes)}
+            report['per_row_price_ms'] = self._time(lambda: self._save_each(place, prices))
+            report['bulk_price_ms'] = self._time(lambda: slot_ops.set_prices(place, prices))
+            report['bulk_toggle_ms'] = self._time(lambda: slot_ops.set_availability(place, None, False))
+
+        if opts['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        for key, value in report.items():
+            self.stdout.write(f'{key:>18}: {value}')
+
+    def _time(self, fn) -> float:
+        started = time.perf_counter()
+        with transaction.atomic():
+            fn()
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def _timed(self, owner, fn) -> float:
+        place = ParkingPlace.objects.create(owner=owner, name='Bench lot', address='-', area='Bench', city='Pune')
+        elapsed = self._time(lambda: fn(place))
+        place.delete()
+        return elapsed
+
+    def _save_each(self, place, prices):
+        for slot in place.slots.all():
+            slot.price_per_hour = prices[slot.code]
+            slot.save(update_fields=['price_per_hour'])
@@ -0,0 +1,63 @@
+import csv
+import json
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from owner.imports import DEFAULT_CHUNK_SIZE, FORMATS, ImportFormatError, format_for, import_places, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        'Import parking places and their slots from a CSV or JSONL file (see owner/imports.py '
+        'for the columns). Invalid rows are skipped and reported.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import; - reads standard input (needs --format)')
+        parser.add_argument('--owner', required=True, help='Username of the place owner')
+        parser.add_argument('--format', choices=FORMATS, help='Default: from the file extension')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing anything')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Places per transaction')
+        parser.add_argument('--errors', help='Write the row errors to this CSV file instead of stderr')
+        parser.add_argument('--json', action='store_true', help='Print the summary as JSON')
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        try:
+            owner = User.objects.get(username=opts['owner'], role=User.ROLE_OWNER)
+        except User.DoesNotExist:
+            raise CommandError(f'No place owner named {opts["owner"]!r}.')
+        path = opts['path']
+        try:
+            fmt = opts['format'] or format_for(path)
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+        source = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        report = open(opts['errors'], 'w', newline='') if opts['errors'] else None
+        errors = csv.writer(report or self.stderr)
+        errors.writerow(['line', 'field', 'message'])
+        started = time.perf_counter()
+        try:
+            result = import_places(
+                owner, read_rows(source, fmt), dry_run=opts['dry_run'], chunk_size=opts['chunk_size'],
+                on_error=lambda error: errors.writerow([error.line, error.field, error.message]),
+            )
+        except ImportFormatError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if report:
+                report.close()
+        summary = {**result.as_dict(), 'duration_ms': round((time.perf_counter() - started) * 1000, 2)}
+        if opts['json']:
+            self.stdout.write(json.dumps(summary))
+            return
+        verb = 'Would import' if result.dry_run else 'Imported'
+        self.stdout.write(
+            f'{verb} {result.places} places with {result.slots} slots from {result.rows} rows; '
+            f'{result.rejected} rejected ({summary["duration_ms"]}ms).'
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from owner import fulltext
+from owner.models import PlaceArea
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the place full-text index and the area autocomplete counts from the places table.'
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            fulltext.get_index().rebuild()
+            PlaceArea.rebuild()
+        self.stdout.write(self.style.SUCCESS('Search indexes rebuilt.'))
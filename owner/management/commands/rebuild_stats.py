@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from customer.models import Booking, CustomerStats
+from customer.stats import rebuild
+from owner.models import OwnerStats, ParkingPlace, ParkingSlot
+from payment.models import Payment
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialized owner and customer dashboard counters.'
+
+    def handle(self, *args, **opts):
+        with transaction.atomic():
+            owners, customers = rebuild(OwnerStats, CustomerStats, ParkingPlace, ParkingSlot, Booking, Payment)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {owners} owners and {customers} customers.'))
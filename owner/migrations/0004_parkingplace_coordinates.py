@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('owner', '0003_parkingplace_allowed_vehicle_types'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='parkingplace',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=9),
+        ),
+        migrations.AddField(
+            model_name='parkingplace',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='parkingplace',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
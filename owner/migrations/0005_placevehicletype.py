@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_csv_vehicle_types(apps, schema_editor):
+    ParkingPlace = apps.get_model('owner', 'ParkingPlace')
+    PlaceVehicleType = apps.get_model('owner', 'PlaceVehicleType')
+    links = []
+    places = ParkingPlace.objects.exclude(allowed_vehicle_types='').values_list('id', 'allowed_vehicle_types')
+    for place_id, csv in places.iterator(chunk_size=2000):
+        codes = {v.strip() for v in csv.split(',') if v.strip()}
+        links.extend(PlaceVehicleType(place_id=place_id, vehicle_type=code) for code in sorted(codes))
+        if len(links) >= 2000:
+            PlaceVehicleType.objects.bulk_create(links)
+            links = []
+    PlaceVehicleType.objects.bulk_create(links)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('owner', '0004_parkingplace_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceVehicleType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vehicle_type', models.CharField(choices=[('2_wheeler', '2 Wheeler'), ('3_wheeler', '3 Wheeler'), ('4_wheeler', '4 Wheeler'), ('single_axle', 'Single Axle'), ('double_axle', 'Double Axle')], max_length=20)),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vehicle_type_links', to='owner.parkingplace')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vehicle_type', 'place'], name='place_vehicle_type_idx')],
+                'unique_together': {('place', 'vehicle_type')},
+            },
+        ),
+        migrations.RunPython(copy_csv_vehicle_types, migrations.RunPython.noop),
+    ]
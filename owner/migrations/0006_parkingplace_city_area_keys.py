@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalize_key(value):
+    return ' '.join((value or '').split()).casefold()
+
+
+def fill_city_area_keys(apps, schema_editor):
+    ParkingPlace = apps.get_model('owner', 'ParkingPlace')
+    PlaceArea = apps.get_model('owner', 'PlaceArea')
+    batch = []
+    for place in ParkingPlace.objects.only('id', 'city', 'area').iterator(chunk_size=2000):
+        place.city_key = normalize_key(place.city)
+        place.area_key = normalize_key(place.area)
+        batch.append(place)
+        if len(batch) >= 2000:
+            ParkingPlace.objects.bulk_update(batch, ['city_key', 'area_key'])
+            batch = []
+    ParkingPlace.objects.bulk_update(batch, ['city_key', 'area_key'])
+    rows = (
+        ParkingPlace.objects.values('city_key', 'area_key')
+        .annotate(city=models.Min('city'), area=models.Min('area'), places=models.Count('id'))
+    )
+    PlaceArea.objects.bulk_create((PlaceArea(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('owner', '0005_placevehicletype'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceArea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city_key', models.CharField(max_length=80)),
+                ('area_key', models.CharField(max_length=80)),
+                ('city', models.CharField(max_length=80)),
+                ('area', models.CharField(max_length=80)),
+                ('places', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='parkingplace',
+            name='area_key',
+            field=models.CharField(blank=True, editable=False, max_length=80),
+        ),
+        migrations.AddField(
+            model_name='parkingplace',
+            name='city_key',
+            field=models.CharField(blank=True, editable=False, max_length=80),
+        ),
+        migrations.AddIndex(
+            model_name='parkingplace',
+            index=models.Index(fields=['city_key', 'area_key'], name='place_city_area_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='placearea',
+            unique_together={('city_key', 'area_key')},
+        ),
+        migrations.RunPython(fill_city_area_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'owner_parkingplace_fts'
+COLUMNS = ('name', 'address', 'area', 'city', 'description')
+
+
+def create_fts_table(apps, schema_editor):
+    # FTS5 is SQLite-only; other backends use the in-process index in
+    # owner.fulltext, and SQLite builds without FTS5 do the same.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"{', '.join(COLUMNS)}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    except OperationalError:
+        return
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(COLUMNS)}) "
+        f"SELECT id, {', '.join(COLUMNS)} FROM owner_parkingplace"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('owner', '0006_parkingplace_city_area_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
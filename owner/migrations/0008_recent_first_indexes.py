@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('owner', '0007_parkingplace_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='parkingplace',
+            index=models.Index(fields=['-created_at', '-id'], name='place_recent_idx'),
+        ),
+    ]
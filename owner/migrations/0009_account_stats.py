@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_userprofile_address_userprofile_phone'),
+        ('owner', '0008_recent_first_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerStats',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='owner_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('places', models.IntegerField(default=0)),
+                ('slots', models.IntegerField(default=0)),
+                ('bookings', models.IntegerField(default=0)),
+                ('active_bookings', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('owner', '0009_account_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('occupied_seconds', models.BigIntegerField(default=0)),
+                ('bookings', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='owner.parkingplace')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('place', 'period', 'bucket'), name='place_usage_bucket_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SlotUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('occupied_seconds', models.BigIntegerField(default=0)),
+                ('bookings', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('place', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_usage', to='owner.parkingplace')),
+                ('slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='owner.parkingslot')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['place', 'period', 'bucket'], name='slot_usage_place_idx')],
+                'constraints': [models.UniqueConstraint(fields=('slot', 'period', 'bucket'), name='slot_usage_bucket_uniq')],
+            },
+        ),
+    ]
@@ -1,5 +1,19 @@
-from django.db import models
+from django.db import IntegrityError, connection, models, transaction
 from django.conf import settings
+from . import geo
+
+VEHICLE_TYPE_CHOICES = (
+    ('2_wheeler', '2 Wheeler'),
+    ('3_wheeler', '3 Wheeler'),
+    ('4_wheeler', '4 Wheeler'),
+    ('single_axle', 'Single Axle'),
+    ('double_axle', 'Double Axle'),
+)
+
+
+def normalize_key(value: str) -> str:
+    """Case-folded, whitespace-collapsed form used for indexed lookups."""
+    return ' '.join((value or '').split()).casefold()
 
 
 class ParkingPlace(models.Model):
@@ -11,11 +25,124 @@ class ParkingPlace(models.Model):
     price_per_hour = models.DecimalField(max_digits=8, decimal_places=2, default=0)
     description = models.TextField(blank=True)
     allowed_vehicle_types = models.TextField(blank=True, help_text='Comma-separated values of allowed vehicle types')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=geo.MAX_PRECISION, blank=True, db_index=True, editable=False)
+    city_key = models.CharField(max_length=80, blank=True, editable=False)
+    area_key = models.CharField(max_length=80, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['city_key', 'area_key'], name='place_city_area_idx'),
+            models.Index(fields=['-created_at', '-id'], name='place_recent_idx'),
+        ]
+
     def __str__(self) -> str:
         return f"{self.name} ({self.area}, {self.city})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored location so signal handlers can move counts.
+        instance._saved_location = (instance.__dict__.get('city'), instance.__dict__.get('area'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.fill_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {'latitude', 'longitude'} & update_fields:
+                update_fields.add('geohash')
+            if {'city', 'area'} & update_fields:
+                update_fields |= {'city_key', 'area_key'}
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+        if update_fields is None or 'allowed_vehicle_types' in update_fields:
+            self.sync_vehicle_types()
+
+    @property
+    def vehicle_type_list(self) -> list[str]:
+        return [v.strip() for v in self.allowed_vehicle_types.split(',') if v.strip()]
+
+    def sync_vehicle_types(self) -> None:
+        """Make the indexed PlaceVehicleType rows match the CSV column."""
+        wanted = set(self.vehicle_type_list)
+        current = set(self.vehicle_type_links.values_list('vehicle_type', flat=True))
+        if current - wanted:
+            self.vehicle_type_links.filter(vehicle_type__in=current - wanted).delete()
+        if wanted - current:
+            PlaceVehicleType.objects.bulk_create(
+                PlaceVehicleType(place=self, vehicle_type=v) for v in sorted(wanted - current)
+            )
+
+    def fill_derived_fields(self) -> None:
+        """Recompute the indexed columns derived from user-entered fields.
+        Call this before bulk_create, which bypasses save()."""
+        self.geohash = self.compute_geohash()
+        self.city_key = normalize_key(self.city)
+        self.area_key = normalize_key(self.area)
+
+    def compute_geohash(self) -> str:
+        if self.latitude is None or self.longitude is None:
+            return ''
+        return geo.encode(self.latitude, self.longitude)
+
+
+class PlaceArea(models.Model):
+    """Number of places per (city, area); the source for autocomplete.
+
+    Kept current by the ParkingPlace save/delete signal handlers, so a
+    suggestion query scans the distinct areas of one city instead of every
+    place in it.
+    """
+    city_key = models.CharField(max_length=80)
+    area_key = models.CharField(max_length=80)
+    city = models.CharField(max_length=80)
+    area = models.CharField(max_length=80)
+    places = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('city_key', 'area_key')
+
+    def __str__(self) -> str:
+        return f"{self.area}, {self.city} ({self.places})"
+
+    @classmethod
+    def adjust(cls, city: str, area: str, delta: int) -> None:
+        keys = {'city_key': normalize_key(city), 'area_key': normalize_key(area)}
+        if cls.objects.filter(**keys).update(places=models.F('places') + delta):
+            return
+        if delta > 0:
+            row, _ = cls.objects.get_or_create(**keys, defaults={'city': city, 'area': area})
+            cls.objects.filter(id=row.id).update(places=models.F('places') + delta)
+
+    @classmethod
+    def rebuild(cls) -> None:
+        rows = (
+            ParkingPlace.objects.values('city_key', 'area_key')
+            .annotate(city=models.Min('city'), area=models.Min('area'), places=models.Count('id'))
+        )
+        cls.objects.all().delete()
+        cls.objects.bulk_create((cls(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class PlaceVehicleType(models.Model):
+    """One row per vehicle type a place accepts; the searchable form of
+    ParkingPlace.allowed_vehicle_types."""
+    place = models.ForeignKey(ParkingPlace, on_delete=models.CASCADE, related_name='vehicle_type_links')
+    vehicle_type = models.CharField(max_length=20, choices=VEHICLE_TYPE_CHOICES)
+
+    class Meta:
+        unique_together = ('place', 'vehicle_type')
+        indexes = [
+            models.Index(fields=['vehicle_type', 'place'], name='place_vehicle_type_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.place_id} - {self.vehicle_type}"
+
 
 class ParkingSlot(models.Model):
     place = models.ForeignKey(ParkingPlace, on_delete=models.CASCADE, related_name='slots')
@@ -30,3 +157,126 @@ class ParkingSlot(models.Model):
         return f"{self.place.name} - {self.code}"
 
 
+class StatsCounters(models.Model):
+    """Base for materialized per-account counters.
+
+    Rows are adjusted in place with F() expressions by signal handlers, so
+    a dashboard reads one row instead of aggregating the account's history.
+    ``manage.py rebuild_stats`` recomputes them from scratch.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def bump(cls, rows, **deltas) -> int:
+        """Add ``deltas`` to the counters of the ``rows`` queryset."""
+        changes = {name: models.F(name) + delta for name, delta in deltas.items() if delta}
+        return rows.update(**changes) if changes else 0
+
+    @classmethod
+    def bump_many(cls, key_field: str, deltas_by_key: dict) -> None:
+        """bump() for many rows, ``{key_field value: {counter: delta}}``, as
+        one prepared UPDATE executed per row."""
+        names = sorted({name for deltas in deltas_by_key.values() for name in deltas})
+        if not names:
+            return
+        qn = connection.ops.quote_name
+        sql = (
+            f'UPDATE {qn(cls._meta.db_table)} SET '
+            + ', '.join(f'{qn(name)} = {qn(name)} + %s' for name in names)
+            + f' WHERE {qn(cls._meta.get_field(key_field).column)} = %s'
+        )
+        params = [[deltas.get(name, 0) for name in names] + [key] for key, deltas in deltas_by_key.items()]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+    @classmethod
+    def bump_or_create(cls, key: dict, **deltas) -> None:
+        """Like bump() for the row identified by ``key``, creating it when
+        the account has no counters yet."""
+        rows = cls.objects.filter(**key)
+        if cls.bump(rows, **deltas) or not any(deltas.values()):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**key, **deltas)
+        except IntegrityError:
+            cls.bump(rows, **deltas)
+
+
+class OwnerStats(StatsCounters):
+    owner = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='owner_stats')
+    places = models.IntegerField(default=0)
+    slots = models.IntegerField(default=0)
+    bookings = models.IntegerField(default=0)
+    active_bookings = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self) -> str:
+        return f"Stats for owner {self.owner_id}"
+
+    @classmethod
+    def for_owner(cls, owner) -> 'OwnerStats':
+        return cls.objects.filter(owner=owner).first() or cls(owner=owner)
+
+    @classmethod
+    def of_place(cls, place_id):
+        return cls.objects.filter(owner__parking_places=place_id)
+
+    @classmethod
+    def of_slot(cls, slot_id):
+        return cls.objects.filter(owner__parking_places__slots=slot_id)
+
+
+ROLLUP_PERIODS = (
+    ('hour', 'Hourly'),
+    ('day', 'Daily'),
+)
+
+
+class UsageRollup(StatsCounters):
+    """Occupancy and revenue of one time bucket (UTC-aligned hour or day).
+
+    ``occupied_seconds`` is booked slot-time inside the bucket, ``bookings``
+    counts bookings starting in it and ``revenue`` successful payments made
+    in it. Maintained incrementally by the booking and payment signal
+    handlers; ``manage.py backfill_rollups`` recomputes a date range.
+    """
+    period = models.CharField(max_length=4, choices=ROLLUP_PERIODS)
+    bucket = models.DateTimeField()
+    occupied_seconds = models.BigIntegerField(default=0)
+    bookings = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class PlaceUsage(UsageRollup):
+    place = models.ForeignKey(ParkingPlace, on_delete=models.CASCADE, related_name='usage')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['place', 'period', 'bucket'], name='place_usage_bucket_uniq'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.place_id} {self.period} {self.bucket:%Y-%m-%d %H:%M}"
+
+
+class SlotUsage(UsageRollup):
+    slot = models.ForeignKey(ParkingSlot, on_delete=models.CASCADE, related_name='usage')
+    # Denormalized so a place's per-slot breakdown is one index range.
+    place = models.ForeignKey(ParkingPlace, on_delete=models.CASCADE, related_name='slot_usage')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['slot', 'period', 'bucket'], name='slot_usage_bucket_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['place', 'period', 'bucket'], name='slot_usage_place_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.slot_id} {self.period} {self.bucket:%Y-%m-%d %H:%M}"
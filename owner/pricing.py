@@ -0,0 +1,136 @@
+"""Booking prices.
+
+A slot is charged its own ``price_per_hour`` or, when that is unset, its
+place's. The booked interval is rounded up to ``ROUNDING_MINUTES`` (at
+least ``MINIMUM_MINUTES``) and charged at that hourly price times the
+``RATE_TABLE`` multiplier of each local hour it covers; the vehicle type's
+percentage surcharge is added on top. Configuration is ``settings.PRICING``.
+
+Each hourly price a place uses is compiled into a prefix sum over the 168
+hours of a week, so pricing an interval of any length is two lookups. The
+compiled tables are cached per place and dropped by ``invalidate`` whenever
+the place or one of its slots changes price; a price missing from a stale
+table is compiled on the spot, so staleness never changes an amount.
+"""
+import math
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ParkingPlace, ParkingSlot
+
+DEFAULTS = {
+    'ROUNDING_MINUTES': 15,
+    'MINIMUM_MINUTES': 30,
+    'RATE_TABLE': (),
+    'VEHICLE_SURCHARGES': {},
+}
+HOURS_PER_WEEK = 7 * 24
+CENTS = Decimal('0.01')
+CACHE_TIMEOUT = 24 * 3600
+# Any Monday; weeks are counted from it to place instants on the prefix sum.
+_EPOCH_MONDAY = date(2024, 1, 1)
+
+
+def config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'PRICING', {})}
+
+
+def cache_key(place_id: int) -> str:
+    return f'pricing:place:{place_id}'
+
+
+def invalidate(place_id: int) -> None:
+    cache.delete(cache_key(place_id))
+
+
+def week_multipliers(rate_table) -> list[Decimal]:
+    multipliers = [Decimal(1)] * HOURS_PER_WEEK
+    for days, first_hour, end_hour, multiplier in rate_table:
+        for day in days:
+            for hour in range(first_hour, end_hour):
+                multipliers[day * 24 + hour] = Decimal(str(multiplier))
+    return multipliers
+
+
+def compile_rates(hourly_price: Decimal, multipliers) -> list[Decimal]:
+    """Cumulative cost at the start of every hour of the week (169 entries)."""
+    prefix = [Decimal(0)]
+    for multiplier in multipliers:
+        prefix.append(prefix[-1] + hourly_price * multiplier)
+    return prefix
+
+
+class PlaceRates:
+    """Compiled rate tables for the hourly prices used at one place."""
+
+    def __init__(self, prices=(), rate_table=()):
+        self.multipliers = week_multipliers(rate_table)
+        self.tables = {price: compile_rates(price, self.multipliers) for price in set(prices)}
+
+    def _table(self, price):
+        if price not in self.tables:
+            self.tables[price] = compile_rates(price, self.multipliers)
+        return self.tables[price]
+
+    def _cumulative(self, table, moment: datetime) -> Decimal:
+        local = timezone.localtime(moment) if timezone.is_aware(moment) else moment
+        weeks, day = divmod((local.date() - _EPOCH_MONDAY).days, 7)
+        hour = day * 24 + local.hour
+        into_hour = Decimal(local.minute * 60 + local.second) / 3600
+        hourly = table[hour + 1] - table[hour]
+        return weeks * table[HOURS_PER_WEEK] + table[hour] + hourly * into_hour
+
+    def cost(self, price, start: datetime, end: datetime) -> Decimal:
+        """Undiscounted cost of [start, end) at ``price`` per hour."""
+        table = self._table(price)
+        return self._cumulative(table, end) - self._cumulative(table, start)
+
+
+def load_rates(place: ParkingPlace) -> PlaceRates:
+    rates = cache.get(cache_key(place.pk))
+    if rates is None:
+        slot_prices = (
+            ParkingSlot.objects.filter(place_id=place.pk, price_per_hour__isnull=False)
+            .values_list('price_per_hour', flat=True).distinct()
+        )
+        rates = PlaceRates([place.price_per_hour, *slot_prices], config()['RATE_TABLE'])
+        cache.set(cache_key(place.pk), rates, CACHE_TIMEOUT)
+    return rates
+
+
+def billed_end(start: datetime, end: datetime) -> datetime:
+    """``end`` pushed out so the duration is a whole number of rounding
+    steps and at least the minimum."""
+    conf = config()
+    minutes = max((end - start).total_seconds() / 60, conf['MINIMUM_MINUTES'])
+    step = conf['ROUNDING_MINUTES'] or 1
+    return start + timedelta(minutes=math.ceil(minutes / step) * step)
+
+
+def surcharge_factor(vehicle_type: str) -> Decimal:
+    percent = Decimal(str(config()['VEHICLE_SURCHARGES'].get(vehicle_type, 0)))
+    return 1 + percent / 100
+
+
+def quote_slots(place: ParkingPlace, slots, start: datetime, end: datetime, vehicle_type: str = '') -> dict:
+    """``{slot id: amount}`` for booking each of ``slots`` (all at ``place``)
+    over [start, end). Each distinct hourly price is priced once."""
+    rates = load_rates(place)
+    billed = billed_end(start, end)
+    factor = surcharge_factor(vehicle_type)
+    by_price, quotes = {}, {}
+    for slot in slots:
+        price = slot.price_per_hour if slot.price_per_hour is not None else place.price_per_hour
+        if price not in by_price:
+            by_price[price] = (rates.cost(price, start, billed) * factor).quantize(CENTS, rounding=ROUND_HALF_UP)
+        quotes[slot.pk] = by_price[price]
+    return quotes
+
+
+def quote(slot: ParkingSlot, start: datetime, end: datetime, vehicle_type: str = '') -> Decimal:
+    """Amount for booking ``slot`` over [start, end)."""
+    return quote_slots(slot.place, [slot], start, end, vehicle_type)[slot.pk]
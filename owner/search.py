@@ -0,0 +1,66 @@
+"""Index-backed filters for place search."""
+from django.db.models import Min, Sum
+
+from .models import PlaceArea, PlaceVehicleType, normalize_key
+
+# Upper bound for prefix range scans: sorts after every UTF-8 string.
+_PREFIX_END = '\U0010ffff'
+
+
+def _prefix(field: str, value: str) -> dict:
+    return {f'{field}__gte': value, f'{field}__lt': value + _PREFIX_END}
+
+
+def filter_city_area(places, city: str = '', area: str = ''):
+    """Case-insensitive prefix match on city and area.
+
+    Matches the normalized ``city_key``/``area_key`` columns with range
+    predicates, which the (city_key, area_key) index serves directly.
+    """
+    city, area = normalize_key(city), normalize_key(area)
+    if city:
+        places = places.filter(**_prefix('city_key', city))
+    if area:
+        places = places.filter(**_prefix('area_key', area))
+    return places
+
+
+def suggest_areas(city: str, prefix: str = '', limit: int = 10) -> list[dict]:
+    """Top areas in ``city`` starting with ``prefix``, busiest first."""
+    rows = (
+        PlaceArea.objects
+        .filter(city_key=normalize_key(city), places__gt=0, **_prefix('area_key', normalize_key(prefix)))
+        .order_by('-places', 'area_key')
+        .values('area', 'places')[:limit]
+    )
+    return list(rows)
+
+
+def suggest_cities(prefix: str = '', limit: int = 10) -> list[dict]:
+    """Top cities starting with ``prefix``, busiest first."""
+    rows = (
+        PlaceArea.objects
+        .filter(places__gt=0, **_prefix('city_key', normalize_key(prefix)))
+        .values('city_key')
+        .annotate(label=Min('city'), total=Sum('places'))
+        .order_by('-total', 'city_key')[:limit]
+    )
+    return [{'city': row['label'], 'places': row['total']} for row in rows]
+
+
+def filter_vehicle_types(places, codes, match_all: bool = False):
+    """Restrict ``places`` to those accepting any (or, with ``match_all``,
+    every) vehicle type in ``codes``.
+
+    Each code is resolved through the (vehicle_type, place) index on
+    PlaceVehicleType, so this is an index lookup rather than a LIKE scan
+    over the CSV column, and '2_wheeler' never matches a longer code.
+    """
+    codes = sorted(set(codes))
+    if not codes:
+        return places
+    if match_all:
+        for code in codes:
+            places = places.filter(id__in=PlaceVehicleType.objects.filter(vehicle_type=code).values('place_id'))
+        return places
+    return places.filter(id__in=PlaceVehicleType.objects.filter(vehicle_type__in=codes).values('place_id'))
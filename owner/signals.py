@@ -0,0 +1,56 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, fulltext, pricing
+from .deletion import handlers_muted
+from .models import OwnerStats, ParkingPlace, ParkingSlot, PlaceArea
+
+
+@receiver(post_save, sender=ParkingPlace)
+def place_saved(sender, instance: ParkingPlace, created, raw=False, **kwargs):
+    if raw:
+        return
+    location = (instance.city, instance.area)
+    previous = getattr(instance, '_saved_location', None)
+    if created:
+        PlaceArea.adjust(*location, 1)
+        OwnerStats.bump_or_create({'owner_id': instance.owner_id}, places=1)
+    elif previous and None not in previous and previous != location:
+        PlaceArea.adjust(*previous, -1)
+        PlaceArea.adjust(*location, 1)
+    instance._saved_location = location
+    fulltext.get_index().update(instance)
+    pricing.invalidate(instance.pk)
+    caching.places_changed()
+    caching.grids_changed(instance.pk)
+
+
+@receiver(post_delete, sender=ParkingPlace)
+def place_deleted(sender, instance: ParkingPlace, **kwargs):
+    PlaceArea.adjust(instance.city, instance.area, -1)
+    fulltext.get_index().remove(instance.pk)
+    OwnerStats.bump(OwnerStats.objects.filter(owner_id=instance.owner_id), places=-1)
+    pricing.invalidate(instance.pk)
+    caching.places_changed()
+    caching.grids_changed(instance.pk)
+
+
+@receiver(post_save, sender=ParkingSlot)
+def slot_saved(sender, instance: ParkingSlot, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        OwnerStats.bump(OwnerStats.of_place(instance.place_id), slots=1)
+    pricing.invalidate(instance.place_id)
+    caching.grids_changed(instance.place_id)
+
+
+@receiver(post_delete, sender=ParkingSlot)
+def slot_deleted(sender, instance: ParkingSlot, **kwargs):
+    if handlers_muted():
+        return
+    # Cascades delete slots before their place, so the place row still
+    # links the slot to its owner here.
+    OwnerStats.bump(OwnerStats.of_place(instance.place_id), slots=-1)
+    pricing.invalidate(instance.place_id)
+    caching.grids_changed(instance.place_id)
@@ -0,0 +1,153 @@
+"""Slot code patterns and bulk slot operations.
+
+A pattern is a list of codes and numeric ranges separated by commas or
+whitespace, e.g. ``A001-A500, B01-B20, VIP1``. A range keeps the zero
+padding of its start (``A001-A500`` yields ``A001`` … ``A500``) and the
+prefix may be repeated or omitted on the end (``A001-500``). A hyphen
+followed by a zero-padded number is part of the code, as in the codes
+the per-level prefixes make (``L1-001``), so a range ending in one must
+repeat the prefix (``L1-001-L1-050``, ``B01-B09``). Optional per-level
+prefixes are prepended to every code (``L1-``, ``L2-``).
+
+All writes are set-based: bulk INSERTs and UPDATEs per batch inside a single
+transaction instead of a round trip per slot. ``bulk_create`` and
+``update`` bypass model signals, so the owner's slot counter and the
+place's compiled prices are updated here directly.
+"""
+import re
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from . import caching, deletion, pricing
+from .models import OwnerStats, ParkingSlot
+
+MAX_BULK_SLOTS = 5000
+BATCH_SIZE = 500
+CODE_MAX_LENGTH = ParkingSlot._meta.get_field('code').max_length
+
+# The end repeats the whole prefix, or is bare digits without zero padding.
+_RANGE_RE = re.compile(r'^(?P<prefix>.*?)(?P<start>\d+)-(?:(?P=prefix)(?P<end>\d+)|(?P<bare_end>[1-9]\d*))$')
+_SEPARATOR_RE = re.compile(r'[\s,]+')
+
+
+class SlotPatternError(ValueError):
+    """A slot pattern or price list could not be parsed."""
+
+
+def _expand_item(item: str) -> list[str]:
+    match = _RANGE_RE.match(item)
+    if not match:
+        return [item]
+    prefix, start, end = match['prefix'], match['start'], match['end'] or match['bare_end']
+    first, last = int(start), int(end)
+    if last < first:
+        raise SlotPatternError(f'Range {item!r} ends before it starts.')
+    if last - first + 1 > MAX_BULK_SLOTS:
+        raise SlotPatternError(f'Range {item!r} is larger than {MAX_BULK_SLOTS} slots.')
+    width = len(start)
+    return [f'{prefix}{n:0{width}d}' for n in range(first, last + 1)]
+
+
+def expand_codes(pattern: str, prefixes=()) -> list[str]:
+    """Slot codes described by ``pattern``, in order and without repeats."""
+    codes = []
+    for item in _SEPARATOR_RE.split(pattern.strip()):
+        if item:
+            codes.extend(_expand_item(item))
+    if prefixes:
+        codes = [f'{prefix}{code}' for prefix in prefixes for code in codes]
+    codes = list(dict.fromkeys(codes))
+    if len(codes) > MAX_BULK_SLOTS:
+        raise SlotPatternError(f'At most {MAX_BULK_SLOTS} slots can be changed at once.')
+    too_long = [c for c in codes if len(c) > CODE_MAX_LENGTH]
+    if too_long:
+        raise SlotPatternError(f'Slot codes are limited to {CODE_MAX_LENGTH} characters: {too_long[0]!r}.')
+    return codes
+
+
+def parse_prices(text: str) -> dict:
+    """``{code: price or None}`` from lines of ``PATTERN = PRICE``.
+
+    A blank price clears the slot's own price so it falls back to the
+    place's price again.
+    """
+    prices = {}
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        pattern, sep, raw_price = line.partition('=')
+        if not sep:
+            raise SlotPatternError(f'Line {lineno}: expected "PATTERN = PRICE".')
+        price = None
+        if raw_price.strip():
+            try:
+                price = Decimal(raw_price.strip())
+            except InvalidOperation:
+                raise SlotPatternError(f'Line {lineno}: {raw_price.strip()!r} is not a price.')
+            if price < 0:
+                raise SlotPatternError(f'Line {lineno}: price cannot be negative.')
+        for code in expand_codes(pattern):
+            prices[code] = price
+    if len(prices) > MAX_BULK_SLOTS:
+        raise SlotPatternError(f'At most {MAX_BULK_SLOTS} slots can be changed at once.')
+    return prices
+
+
+def select_slots(place, codes=None):
+    """Slots of ``place`` with the given codes (all slots when ``codes`` is None)."""
+    slots = place.slots.all()
+    return slots if codes is None else slots.filter(code__in=codes)
+
+
+def create_slots(place, codes, is_available: bool = True, price_per_hour=None) -> tuple[int, list[str]]:
+    """Create the slots of ``codes`` that ``place`` does not have yet.
+
+    Returns ``(created, skipped)`` where ``skipped`` lists codes that
+    already existed.
+    """
+    with transaction.atomic():
+        existing = set(place.slots.filter(code__in=codes).values_list('code', flat=True)) if place.pk else set()
+        new = [
+            ParkingSlot(place=place, code=code, is_available=is_available, price_per_hour=price_per_hour)
+            for code in codes if code not in existing
+        ]
+        ParkingSlot.objects.bulk_create(new, batch_size=BATCH_SIZE)
+        OwnerStats.bump(OwnerStats.of_place(place.pk), slots=len(new))
+    if new and price_per_hour is not None:
+        pricing.invalidate(place.pk)
+    if new:
+        caching.grids_changed(place.pk)
+    return len(new), [code for code in codes if code in existing]
+
+
+def set_availability(place, codes, is_available: bool) -> int:
+    changed = select_slots(place, codes).update(is_available=is_available)
+    caching.grids_changed(place.pk)
+    return changed
+
+
+def set_prices(place, prices: dict) -> int:
+    """Give each slot in ``prices`` its own price.
+
+    Slots are grouped by price and each group is one UPDATE ... WHERE code
+    IN (...). Price lists have few distinct values, and this beats
+    bulk_update(), whose per-row CASE WHEN is several times slower than
+    saving rows one by one on SQLite.
+    """
+    by_price = defaultdict(list)
+    for code, price in prices.items():
+        by_price[price].append(code)
+    changed = 0
+    with transaction.atomic():
+        for price, codes in by_price.items():
+            for i in range(0, len(codes), BATCH_SIZE):
+                changed += select_slots(place, codes[i:i + BATCH_SIZE]).update(price_per_hour=price)
+    pricing.invalidate(place.pk)
+    caching.grids_changed(place.pk)
+    return changed
+
+
+def delete_slots(place, codes) -> int:
+    return deletion.delete_slots(place, select_slots(place, codes))
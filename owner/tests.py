@@ -0,0 +1,287 @@
+import io
+import json
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from parkeasy.testing import Budget, QueryBudgetMixin, shared_seed
+from . import fulltext, geo, imports
+from .slots import MAX_BULK_SLOTS, SlotPatternError, expand_codes, parse_prices
+from .models import OwnerStats, ParkingPlace, PlaceArea
+
+PLACES_CSV = '''name,address,area,city,price_per_hour,description,latitude,longitude,vehicle_types,slots,number_of_slots
+Harbour Lot,1 Dock Road,Colaba,Mumbai,60,Covered,18.91,72.82,2_wheeler;4_wheeler,"A001-A020, VIP1",
+No Area Lot,2 Main Road,,Pune,40,,,,4_wheeler,,5
+Station Lot,3 Station Road,Baner,Pune,45,,18.55,,4_wheeler,,
+Hill Lot,4 Hill Road,Kothrud,Pune,50,,,,2_wheeler,,3
+'''
+
+
+class OwnerViewBudgetTests(QueryBudgetMixin, TestCase):
+    urls_module = 'owner.urls'
+    budgets = {
+        'owner_dashboard': Budget(queries=3),
+        'owner_add_place': Budget(queries=20),
+        'owner_import_places': Budget(queries=16),
+        'owner_edit_place': Budget(queries=9),
+        'owner_delete_place': Budget(queries=32),
+        'owner_slots': Budget(queries=9),
+        'owner_slot_edit': Budget(queries=4),
+        'owner_slot_delete': Budget(queries=19),
+        'owner_profile_edit': Budget(queries=1),
+        'owner_bookings': Budget(queries=2),
+        'owner_bookings_export': Budget(queries=2),
+        'owner_payments': Budget(queries=2),
+        'owner_payments_export': Budget(queries=2),
+        'owner_analytics_data': Budget(queries=4),
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.owner = self.seed.owner
+        self.place = self.seed.place
+
+    def test_dashboard(self):
+        self.assertWithinBudget('owner_dashboard', user=self.owner)
+
+    def test_add_place(self):
+        self.assertWithinBudget('owner_add_place', user=self.owner)
+
+    def test_add_place_with_slots(self):
+        self.assertWithinBudget('owner_add_place', user=self.owner, method='post', status=302, data={
+            'name': 'New lot', 'address': '1 Road', 'city': 'Mumbai', 'area': 'Powai',
+            'price_per_hour': '50', 'number_of_slots': '200', 'allowed_vehicle_types_field': ['4_wheeler'],
+        })
+
+    def test_import_places(self):
+        self.assertWithinBudget('owner_import_places', user=self.owner)
+
+    def test_import_places_post(self):
+        upload = SimpleUploadedFile('places.csv', PLACES_CSV.encode())
+        response = self.assertWithinBudget('owner_import_places', user=self.owner, method='post', data={'file': upload})
+        self.assertEqual(response.context['result'].places, 2)
+        self.assertEqual(response.context['result'].rejected, 2)
+
+    def test_edit_place(self):
+        self.assertWithinBudget('owner_edit_place', args=[self.place.id], user=self.owner)
+
+    def test_edit_place_post(self):
+        self.assertWithinBudget('owner_edit_place', args=[self.place.id], user=self.owner, method='post', status=302, data={
+            'name': 'Renamed lot', 'address': self.place.address, 'city': 'Pune', 'area': 'Baner',
+            'price_per_hour': '55', 'number_of_slots': '0', 'allowed_vehicle_types_field': ['2_wheeler'],
+        })
+
+    def test_delete_place(self):
+        self.assertWithinBudget('owner_delete_place', args=[self.place.id], user=self.owner)
+
+    def test_delete_place_post(self):
+        self.assertWithinBudget('owner_delete_place', args=[self.place.id], user=self.owner, method='post', status=302)
+
+    def test_slots(self):
+        self.assertWithinBudget('owner_slots', args=[self.place.id], user=self.owner)
+
+    def test_slots_bulk_create(self):
+        self.assertWithinBudget('owner_slots', args=[self.place.id], user=self.owner, method='post', status=302, data={
+            'bulk': 'create', 'codes': 'N001-N500', 'price_per_hour': '70', 'is_available': 'on',
+        })
+
+    def test_slots_bulk_prices(self):
+        self.assertWithinBudget('owner_slots', args=[self.place.id], user=self.owner, method='post', status=302, data={
+            'bulk': 'update', 'action': 'prices', 'prices': 'S001-S010 = 60\nS011-S020 = 80',
+        })
+
+    def test_slots_bulk_disable(self):
+        self.assertWithinBudget('owner_slots', args=[self.place.id], user=self.owner, method='post', status=302, data={
+            'bulk': 'update', 'action': 'disable', 'codes': '',
+        })
+
+    def test_slots_bulk_delete_needs_codes(self):
+        count = self.place.slots.count()
+        response = self.assertWithinBudget('owner_slots', args=[self.place.id], user=self.owner, method='post', data={
+            'bulk': 'update', 'action': 'delete', 'codes': ' ',
+        })
+        self.assertIn('codes', response.context['update_form'].errors)
+        self.assertEqual(self.place.slots.count(), count)
+
+    def test_slot_edit(self):
+        self.assertWithinBudget('owner_slot_edit', args=[self.seed.slot.id], user=self.owner)
+
+    def test_slot_edit_post(self):
+        slot = self.seed.slot
+        self.assertWithinBudget('owner_slot_edit', args=[slot.id], user=self.owner, method='post', status=302, data={
+            'code': slot.code, 'is_available': 'on', 'price_per_hour': '65',
+        })
+
+    def test_slot_delete(self):
+        self.assertWithinBudget('owner_slot_delete', args=[self.seed.slot.id], user=self.owner, status=302)
+
+    def test_profile_edit(self):
+        self.assertWithinBudget('owner_profile_edit', user=self.owner)
+
+    def test_bookings(self):
+        response = self.assertWithinBudget('owner_bookings', user=self.owner)
+        self.assertWithinBudget('owner_bookings', user=self.owner, query=f'cursor={response.context["page"].next_cursor}')
+
+    def test_payments(self):
+        response = self.assertWithinBudget('owner_payments', user=self.owner)
+        self.assertWithinBudget('owner_payments', user=self.owner, query=f'cursor={response.context["page"].next_cursor}')
+
+    def test_bookings_export(self):
+        response = self.assertWithinBudget('owner_bookings_export', user=self.owner)
+        # The rows are read while streaming, in one query.
+        with self.assertNumQueries(1):
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['booking_id', 'created_at', 'place_id'])
+        self.assertGreater(len(lines), 1)
+
+    def test_payments_export(self):
+        response = self.assertWithinBudget('owner_payments_export', user=self.owner, query='format=jsonl')
+        with self.assertNumQueries(1):
+            rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertTrue(rows)
+        self.assertEqual(rows[0]['payment_id'], min(row['payment_id'] for row in rows))
+
+    def test_export_filters(self):
+        response = self.assertWithinBudget('owner_bookings_export', user=self.owner, query='start=2000-01-01&end=2000-01-01')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 1)
+        self.assertWithinBudget('owner_bookings_export', user=self.owner, query='format=xml', status=400)
+        self.assertWithinBudget('owner_payments_export', user=self.owner, query='start=yesterday', status=400)
+        self.assertWithinBudget('owner_payments_export', user=self.owner, query='start=2000-01-02&end=2000-01-01', status=400)
+
+    def test_analytics_data(self):
+        self.assertWithinBudget('owner_analytics_data', user=self.owner)
+        self.assertWithinBudget('owner_analytics_data', user=self.owner, query=f'period=hour&place={self.place.id}')
+        self.assertWithinBudget('owner_analytics_data', user=self.owner, query=f'period=hour&slot={self.seed.slot.id}')
+        for query in ('place=1.5', 'slot=x'):
+            response = self.assertWithinBudget('owner_analytics_data', user=self.owner, query=query, status=400)
+            self.assertEqual(response.json(), {'error': 'slot and place must be ids.'})
+
+    def test_customers_are_forbidden(self):
+        self.assertWithinBudget('owner_slots', args=[self.place.id], user=self.seed.customer, status=403)
+
+
+class PlaceImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = shared_seed().owner
+
+    def run_import(self, text, fmt='csv', **kwargs):
+        errors = []
+        result = imports.import_places(self.owner, imports.read_rows(io.StringIO(text), fmt), on_error=errors.append, **kwargs)
+        return result, errors
+
+    def test_csv_import_applies_form_rules(self):
+        stats = OwnerStats.for_owner(self.owner)
+        result, errors = self.run_import(PLACES_CSV, chunk_size=1)
+        self.assertEqual((result.rows, result.places, result.slots, result.rejected, result.chunks), (4, 2, 24, 2, 2))
+        self.assertEqual({(e.line, e.field) for e in errors}, {(3, 'area'), (4, 'longitude')})
+        harbour = ParkingPlace.objects.get(owner=self.owner, name='Harbour Lot')
+        self.assertEqual(harbour.vehicle_type_list, ['2_wheeler', '4_wheeler'])
+        self.assertEqual(set(harbour.vehicle_type_links.values_list('vehicle_type', flat=True)), {'2_wheeler', '4_wheeler'})
+        self.assertTrue(harbour.geohash)
+        self.assertEqual(harbour.slots.count(), 21)
+        self.assertEqual(ParkingPlace.objects.get(owner=self.owner, name='Hill Lot').slots.count(), 3)
+        self.assertEqual(PlaceArea.objects.get(city_key='mumbai', area_key='colaba').places, 1)
+        self.assertIn(harbour.pk, fulltext.get_index().search('harbour', 10))
+        updated = OwnerStats.for_owner(self.owner)
+        self.assertEqual((updated.places - stats.places, updated.slots - stats.slots), (2, 24))
+
+    def test_jsonl_dry_run_writes_nothing(self):
+        rows = [
+            {'name': 'Dry Lot', 'address': '5 Road', 'city': 'Mumbai', 'area': 'Powai', 'price_per_hour': 30,
+             'vehicle_types': ['4_wheeler'], 'slots': ['P1', 'P2']},
+            {'name': 'Bad Lot', 'city': 'Mumbai', 'price_per_hour': 30, 'vehicle_types': ['hovercraft']},
+        ]
+        text = '\n'.join(json.dumps(row) for row in rows) + '\n{not json\n'
+        places = ParkingPlace.objects.count()
+        result, errors = self.run_import(text, 'jsonl', dry_run=True)
+        self.assertEqual((result.places, result.slots, result.rejected, result.chunks), (1, 2, 2, 0))
+        self.assertEqual({e.field for e in errors if e.line == 2}, {'address', 'area', 'vehicle_types'})
+        self.assertTrue(errors[-1].message.startswith('Invalid JSON'))
+        self.assertEqual(ParkingPlace.objects.count(), places)
+
+
+@mock.patch.object(fulltext, 'fts5_available', return_value=False)
+class FallbackSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = shared_seed().owner
+        cls.dock = ParkingPlace.objects.create(
+            owner=owner, name='Zephyr Dock Parking', address='1 Quay', area='Colaba', city='Mumbai', price_per_hour=30,
+        )
+        cls.quay = ParkingPlace.objects.create(
+            owner=owner, name='Quay Lot', address='2 Zephyr Road', area='Colaba', city='Mumbai', price_per_hour=30,
+        )
+
+    def test_single_process_uses_inverted_index(self, _):
+        self.assertIsInstance(fulltext.get_index(), fulltext.InvertedIndex)
+
+    @override_settings(WORKER_PROCESSES=4)
+    def test_several_processes_search_the_table(self, _):
+        index = fulltext.get_index()
+        self.assertIsInstance(index, fulltext.DatabaseIndex)
+        self.assertEqual(index.search('zephyr', 10), [self.dock.pk, self.quay.pk])
+        self.assertEqual(index.search('quay', 10), [self.quay.pk, self.dock.pk])
+        self.assertEqual(index.count('zephyr dock'), 1)
+        restricted = ParkingPlace.objects.filter(pk=self.quay.pk)
+        self.assertEqual(index.search('zephyr', 10, restrict_to=restricted), [self.quay.pk])
+        self.assertEqual((index.search('!!', 10), index.count('')), ([], 0))
+
+
+class NearbyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        owner = shared_seed().owner
+        cls.places = [
+            ParkingPlace.objects.create(
+                owner=owner, name=f'Reef Lot {i}', address='-', area='Colaba', city='Mumbai', price_per_hour=30,
+                latitude=10.0 + i * 0.001, longitude=10.0,
+            )
+            for i in range(4)
+        ]
+
+    def test_radius_search_is_capped(self):
+        with mock.patch.object(geo, 'MAX_RESULTS', 3):
+            found = geo.nearby(ParkingPlace.objects.all(), 10.0, 10.0, 5)
+            nearest = geo.nearest(ParkingPlace.objects.all(), 10.0, 10.0, 10)
+        self.assertEqual([p.pk for p in found], [p.pk for p in self.places[:3]])
+        self.assertEqual([p.pk for p in nearest], [p.pk for p in self.places[:3]])
+        self.assertAlmostEqual(found[1].distance_km, 0.111, places=2)
+        self.assertEqual(len(geo.nearby(ParkingPlace.objects.all(), 10.0, 10.0, 5, limit=2)), 2)
+
+
+class SlotPatternTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(expand_codes('A001-A003, B8-10 VIP1'), ['A001', 'A002', 'A003', 'B8', 'B9', 'B10', 'VIP1'])
+        self.assertEqual(expand_codes('A098-100'), ['A098', 'A099', 'A100'])
+        self.assertEqual(expand_codes('001-003'), ['001', '002', '003'])
+        self.assertEqual(expand_codes('A1-A2 A2-A3'), ['A1', 'A2', 'A3'])
+
+    def test_hyphenated_codes(self):
+        self.assertEqual(expand_codes('L1-001'), ['L1-001'])
+        self.assertEqual(expand_codes('L1-002 L1-003'), ['L1-002', 'L1-003'])
+        self.assertEqual(expand_codes('B01-09'), ['B01-09'])
+        self.assertEqual(expand_codes('L1-001-L1-003'), ['L1-001', 'L1-002', 'L1-003'])
+        self.assertEqual(expand_codes('L1-008-10'), ['L1-008', 'L1-009', 'L1-010'])
+
+    def test_prefixed_codes_parse_back(self):
+        codes = expand_codes('001-003', prefixes=['L1-', 'L2-'])
+        self.assertEqual(codes, ['L1-001', 'L1-002', 'L1-003', 'L2-001', 'L2-002', 'L2-003'])
+        self.assertEqual(expand_codes(', '.join(codes)), codes)
+
+    def test_bad_ranges(self):
+        for pattern in ('A5-A1', f'A1-{MAX_BULK_SLOTS + 1}', f'A1-{MAX_BULK_SLOTS} B1', 'X' * 100):
+            with self.subTest(pattern=pattern), self.assertRaises(SlotPatternError):
+                expand_codes(pattern)
+
+    def test_prices(self):
+        prices = parse_prices('A1-A2 = 60\n\nL1-001 = 75.50\nA2 =\n')
+        self.assertEqual(prices, {'A1': Decimal('60'), 'A2': None, 'L1-001': Decimal('75.50')})
+
+    def test_bad_prices(self):
+        for text in ('A1 60', 'A1 = sixty', 'A1 = -5', 'A5-A1 = 60'):
+            with self.subTest(text=text), self.assertRaises(SlotPatternError):
+                parse_prices(text)
@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('', views.dashboard, name='owner_dashboard'),
     path('places/add/', views.add_place, name='owner_add_place'),
+    path('places/import/', views.import_places, name='owner_import_places'),
     path('places/<int:place_id>/edit/', views.edit_place, name='owner_edit_place'),
     path('places/<int:place_id>/delete/', views.delete_place, name='owner_delete_place'),
     path('places/<int:place_id>/slots/', views.slots, name='owner_slots'),
@@ -11,5 +12,8 @@ urlpatterns = [
     path('slots/<int:slot_id>/delete/', views.slot_delete, name='owner_slot_delete'),
     path('profile/edit/', views.profile_edit, name='owner_profile_edit'),
     path('bookings/', views.bookings, name='owner_bookings'),
+    path('bookings/export/', views.bookings_export, name='owner_bookings_export'),
     path('payments/', views.payments, name='owner_payments'),
+    path('payments/export/', views.payments_export, name='owner_payments_export'),
+    path('analytics/data/', views.analytics_data, name='owner_analytics_data'),
 ]
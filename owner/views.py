@@ -1,12 +1,21 @@
+import io
+from datetime import timedelta
 from django.shortcuts import render, redirect, get_object_or_404
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from accounts.utils import role_required
-from .models import ParkingPlace, ParkingSlot
-from .forms import ParkingPlaceForm, ParkingSlotForm
+from .models import OwnerStats, ParkingPlace, ParkingSlot, PlaceUsage, SlotUsage
+from . import analytics, deletion, exports, imports
+from .forms import BulkSlotCreateForm, BulkSlotUpdateForm, ParkingPlaceForm, ParkingSlotForm, PlaceImportForm
+from . import slots as slot_ops
+from customer.availability import parse_window
 from customer.models import Booking
 from payment.models import Payment
 from accounts.forms import UserProfileForm
+from parkeasy.pagination import paginate_request
 from django import forms
 
 
@@ -14,13 +23,13 @@ from django import forms
 @role_required('place_owner')
 def dashboard(request):
     places = ParkingPlace.objects.filter(owner=request.user).order_by('-created_at')
-    total_places = places.count()
-    total_slots = ParkingSlot.objects.filter(place__owner=request.user).count()
+    stats = OwnerStats.for_owner(request.user)
     profile = request.user
     return render(request, 'owner/panel.html', {
         'places': places,
-        'total_places': total_places,
-        'total_slots': total_slots,
+        'stats': stats,
+        'total_places': stats.places,
+        'total_slots': stats.slots,
         'profile': profile,
     })
 
@@ -38,11 +47,11 @@ def add_place(request):
             else:
                 place: ParkingPlace = form.save(commit=False)
                 place.owner = request.user
-                place.save()
-                # auto create slots
                 count = form.cleaned_data.get('number_of_slots', 0)
-                for i in range(1, count + 1):
-                    ParkingSlot.objects.create(place=place, code=f"S{i:03}", is_available=True)
+                with transaction.atomic():
+                    place.save()
+                    # auto create slots
+                    slot_ops.create_slots(place, [f"S{i:03}" for i in range(1, count + 1)])
                 messages.success(request, 'Parking place created successfully!')
                 return redirect('owner_dashboard')
     else:
@@ -50,6 +59,44 @@ def add_place(request):
     return render(request, 'owner/add_place.html', {'form': form})
 
 
+# Row errors shown on the import page; the rest are only counted.
+MAX_IMPORT_ERRORS = 100
+
+
+@login_required
+@role_required('place_owner')
+def import_places(request):
+    """Import places and slots from an uploaded CSV/JSONL file (see owner/imports.py)."""
+    form = PlaceImportForm(request.POST or None, request.FILES or None)
+    result, errors = None, []
+    if request.method == 'POST' and form.is_valid():
+        upload = form.cleaned_data['file']
+        try:
+            fmt = imports.format_for(upload.name)
+        except imports.ImportFormatError as exc:
+            form.add_error('file', str(exc))
+        else:
+            def report(error):
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append(error)
+
+            # Large uploads are spooled to disk and read back row by row.
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            try:
+                result = imports.import_places(
+                    request.user, imports.read_rows(stream, fmt), dry_run=form.cleaned_data['dry_run'], on_error=report,
+                )
+            except UnicodeDecodeError:
+                form.add_error('file', 'The file must be UTF-8 encoded text.')
+            finally:
+                stream.detach()
+            if result and not result.dry_run and result.places:
+                messages.success(request, f'Imported {result.places} places with {result.slots} slots.')
+    return render(request, 'owner/import_places.html', {
+        'form': form, 'result': result, 'errors': errors, 'max_errors': MAX_IMPORT_ERRORS,
+    })
+
+
 @login_required
 @role_required('place_owner')
 def edit_place(request, place_id: int):
@@ -77,7 +124,7 @@ def edit_place(request, place_id: int):
 def delete_place(request, place_id: int):
     place = get_object_or_404(ParkingPlace, id=place_id, owner=request.user)
     if request.method == 'POST':
-        place.delete()
+        deletion.delete_place(place)
         messages.success(request, 'Parking place deleted.')
         return redirect('owner_dashboard')
     return render(request, 'owner/delete_place_confirm.html', {'place': place})
@@ -102,14 +149,38 @@ def profile_edit(request):
 @role_required('place_owner')
 def slots(request, place_id: int):
     place = get_object_or_404(ParkingPlace, id=place_id, owner=request.user)
-    if request.method == 'POST':
-        # simple add slot
-        code = request.POST.get('code')
-        if code:
-            ParkingSlot.objects.create(place=place, code=code, is_available=True)
-            messages.success(request, 'Slot added.')
+    create_form, update_form = BulkSlotCreateForm(initial={'is_available': True}), BulkSlotUpdateForm()
+    if request.method == 'POST' and request.POST.get('bulk') == 'update':
+        update_form = BulkSlotUpdateForm(request.POST)
+        if update_form.is_valid():
+            action, codes = update_form.cleaned_data['action'], update_form.cleaned_data.get('code_list')
+            if action == 'prices':
+                changed = slot_ops.set_prices(place, update_form.cleaned_data['price_map'])
+            elif action == 'delete':
+                changed = slot_ops.delete_slots(place, codes)
+            else:
+                changed = slot_ops.set_availability(place, codes, action == 'enable')
+            messages.success(request, f'{changed} slot(s) updated.' if action != 'delete' else f'{changed} slot(s) deleted.')
+            return redirect('owner_slots', place_id=place.id)
+    elif request.method == 'POST':
+        create_form = BulkSlotCreateForm(request.POST)
+        if create_form.is_valid():
+            created, skipped = slot_ops.create_slots(
+                place,
+                create_form.cleaned_data['code_list'],
+                is_available=create_form.cleaned_data['is_available'],
+                price_per_hour=create_form.cleaned_data['price_per_hour'],
+            )
+            messages.success(request, f'{created} slot(s) added.')
+            if skipped:
+                messages.warning(request, f'{len(skipped)} code(s) already existed and were skipped, e.g. {skipped[0]}.')
             return redirect('owner_slots', place_id=place.id)
-    return render(request, 'owner/slots.html', {'place': place, 'slots': place.slots.all().order_by('code')})
+    return render(request, 'owner/slots.html', {
+        'place': place,
+        'slots': place.slots.all().order_by('code'),
+        'create_form': create_form,
+        'update_form': update_form,
+    })
 
 
 @login_required
@@ -130,22 +201,113 @@ def slot_edit(request, slot_id: int):
 @login_required
 @role_required('place_owner')
 def slot_delete(request, slot_id: int):
-    slot = get_object_or_404(ParkingSlot, id=slot_id, place__owner=request.user)
-    place_id = slot.place.id
-    slot.delete()
+    slot = get_object_or_404(ParkingSlot.objects.select_related('place'), id=slot_id, place__owner=request.user)
+    deletion.delete_slots(slot.place, ParkingSlot.objects.filter(pk=slot.pk))
     messages.success(request, 'Slot deleted.')
-    return redirect('owner_slots', place_id=place_id)
+    return redirect('owner_slots', place_id=slot.place_id)
 
 
 @login_required
 @role_required('place_owner')
 def bookings(request):
-    bookings_qs = Booking.objects.filter(slot__place__owner=request.user).select_related('customer', 'slot', 'slot__place').order_by('-created_at')
-    return render(request, 'owner/bookings.html', {'bookings': bookings_qs})
+    bookings_qs = Booking.objects.filter(slot__place__owner=request.user).select_related('customer', 'slot', 'slot__place').only(
+        'id', 'created_at', 'start_time', 'end_time', 'status', 'customer__username', 'slot__code', 'slot__place__name',
+    )
+    page = paginate_request(request, bookings_qs)
+    return render(request, 'owner/bookings.html', {'bookings': page, 'page': page})
 
 
 @login_required
 @role_required('place_owner')
 def payments(request):
-    payments_qs = Payment.objects.filter(booking__slot__place__owner=request.user).select_related('booking', 'booking__slot', 'booking__slot__place').order_by('-created_at')
-    return render(request, 'owner/payments.html', {'payments': payments_qs})
+    payments_qs = Payment.objects.filter(booking__slot__place__owner=request.user).select_related('booking', 'booking__slot', 'booking__slot__place').only(
+        'id', 'created_at', 'amount', 'status', 'booking__id', 'booking__slot__code', 'booking__slot__place__name',
+    )
+    page = paginate_request(request, payments_qs)
+    return render(request, 'owner/payments.html', {'payments': page, 'page': page})
+
+
+def _export(request, export):
+    """Stream ``export`` of the owner's rows as CSV (default) or JSONL.
+
+    ``start``/``end`` are optional ISO dates or datetimes bounding
+    ``created_at``; a bare ``end`` date includes that day.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return JsonResponse({'error': 'format must be one of: ' + ', '.join(exports.FORMATS)}, status=400)
+    try:
+        start = exports.parse_bound(request.GET.get('start'))
+        end = exports.parse_bound(request.GET.get('end'), end=True)
+    except ValueError:
+        return JsonResponse({'error': 'start and end must be ISO dates or datetimes.'}, status=400)
+    if start is not None and end is not None and start >= end:
+        return JsonResponse({'error': 'end must be after start.'}, status=400)
+    rows = export.rows(request.user, start, end)
+    filename = f'{export.name}-{timezone.localdate():%Y%m%d}.{fmt}'
+    return StreamingHttpResponse(exports.stream(export, rows, fmt), content_type=exports.FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+    })
+
+
+@login_required
+@role_required('place_owner')
+def bookings_export(request):
+    return _export(request, exports.BOOKINGS)
+
+
+@login_required
+@role_required('place_owner')
+def payments_export(request):
+    return _export(request, exports.PAYMENTS)
+
+
+MAX_ANALYTICS_POINTS = 5000
+DEFAULT_ANALYTICS_DAYS = 30
+
+
+@login_required
+@role_required('place_owner')
+def analytics_data(request):
+    """Occupancy and revenue series for charts, read from the rollups.
+
+    ``period`` is ``hour`` or ``day``; ``start``/``end`` are ISO dates or
+    datetimes (default: the last 30 days). ``place`` or ``slot`` narrow the
+    series to one of the owner's places or slots, otherwise all places are
+    summed.
+    """
+    period = request.GET.get('period', 'day')
+    if period not in analytics.PERIODS:
+        return JsonResponse({'error': 'period must be one of: ' + ', '.join(analytics.PERIODS)}, status=400)
+    if request.GET.get('start') or request.GET.get('end'):
+        try:
+            start, end = parse_window(request.GET.get('start'), request.GET.get('end'))
+        except ValueError:
+            return JsonResponse({'error': 'start and end must be ISO dates with start before end.'}, status=400)
+    else:
+        end = analytics.bucket_start(timezone.now(), 'day') + timedelta(days=1)
+        start = end - timedelta(days=DEFAULT_ANALYTICS_DAYS)
+    start = analytics.bucket_start(start, period)
+    if (end - start).total_seconds() / analytics.PERIODS[period] > MAX_ANALYTICS_POINTS:
+        return JsonResponse({'error': f'Range too long; at most {MAX_ANALYTICS_POINTS} {period} buckets.'}, status=400)
+
+    try:
+        slot_id, place_id = (int(request.GET[name]) if request.GET.get(name) else None for name in ('slot', 'place'))
+    except ValueError:
+        return JsonResponse({'error': 'slot and place must be ids.'}, status=400)
+
+    scope = {'period': period, 'start': start.isoformat(), 'end': end.isoformat()}
+    if slot_id is not None:
+        slot = get_object_or_404(ParkingSlot, id=slot_id, place__owner=request.user)
+        rollups, capacity = SlotUsage.objects.filter(slot=slot), 1
+        scope.update(slot=slot.id, place=slot.place_id)
+    elif place_id is not None:
+        place = get_object_or_404(ParkingPlace, id=place_id, owner=request.user)
+        rollups, capacity = PlaceUsage.objects.filter(place=place), place.slots.count()
+        scope['place'] = place.id
+    else:
+        rollups, capacity = PlaceUsage.objects.filter(place__owner=request.user), OwnerStats.for_owner(request.user).slots
+    scope['capacity'] = capacity
+    scope['series'] = analytics.series(rollups, period, start, end, capacity)
+    return JsonResponse(scope)
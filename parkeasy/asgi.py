@@ -0,0 +1,15 @@
+"""ASGI config for parkeasy project.
+
+Serve it with an ASGI server (e.g. ``uvicorn parkeasy.asgi:application``)
+for the live slot updates: their streams then wait on the event loop
+instead of holding a worker thread each (see customer/live.py).
+"""
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'parkeasy.settings')
+django_application = get_asgi_application()
+
+from customer.live import LiveStreams  # noqa: E402  (needs the apps loaded)
+
+application = LiveStreams(django_application)
@@ -0,0 +1,41 @@
+"""Shared helpers for the ``bench_*`` management commands."""
+import uuid
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed: float) -> dict:
+    """Latency percentiles (ms) and throughput for a list of seconds."""
+    values = sorted(latencies)
+    return {
+        'count': len(values),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(values) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 2),
+        'p95_ms': round(percentile(values, 95) * 1000, 2),
+        'p99_ms': round(percentile(values, 99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+@contextmanager
+def bench_users(keep: bool = False):
+    """Yield a throwaway (owner, customer) pair; everything they own is
+    cascaded away on exit unless ``keep`` is set."""
+    User = get_user_model()
+    tag = uuid.uuid4().hex[:8]
+    owner = User.objects.create_user(f'bench-owner-{tag}', password='bench-pass', role=User.ROLE_OWNER)
+    customer = User.objects.create_user(f'bench-customer-{tag}', password='bench-pass', role=User.ROLE_CUSTOMER)
+    try:
+        yield owner, customer
+    finally:
+        if not keep:
+            User.objects.filter(id__in=[owner.id, customer.id]).delete()
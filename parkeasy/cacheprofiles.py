@@ -0,0 +1,64 @@
+"""Cache settings picked by environment variables.
+
+``PARKEASY_CACHE`` selects one of:
+
+``locmem`` (default)
+    Per-process memory. Fine for one process, such as runserver or one
+    threaded worker; invalidations do not reach other processes. When
+    ``WEB_CONCURRENCY`` (the worker count gunicorn and uvicorn read) asks
+    for more than one, sessions and signed-in users are not cached, as a
+    worker would keep accepting a session another one logged out.
+``file``
+    Files under ``PARKEASY_CACHE_LOCATION`` (default ``.cache`` in the
+    project), shared by the processes of one host.
+``redis``
+    A Redis server at ``PARKEASY_CACHE_LOCATION`` (default
+    ``redis://127.0.0.1:6379/1``) or anything speaking its protocol. Needs
+    the ``redis`` package.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+# Room for the search and slot-grid entries of a busy site; the default of
+# 300 would keep evicting them.
+MAX_ENTRIES = 20_000
+
+
+def caches(base_dir, env=None) -> dict:
+    """The CACHES setting for the backend named in ``env`` (default: os.environ)."""
+    env = os.environ if env is None else env
+    name = env.get('PARKEASY_CACHE', 'locmem')
+    if name not in BACKENDS:
+        raise ImproperlyConfigured(f'PARKEASY_CACHE must be one of {", ".join(BACKENDS)}, not {name!r}.')
+    default = {'BACKEND': BACKENDS[name], 'KEY_PREFIX': 'parkeasy'}
+    if name == 'file':
+        default['LOCATION'] = env.get('PARKEASY_CACHE_LOCATION') or str(base_dir / '.cache')
+    elif name == 'redis':
+        default['LOCATION'] = env.get('PARKEASY_CACHE_LOCATION') or 'redis://127.0.0.1:6379/1'
+    if name != 'redis':
+        default['OPTIONS'] = {'MAX_ENTRIES': MAX_ENTRIES}
+    return {'default': default}
+
+
+def worker_processes(env=None) -> int:
+    """The serving processes ``WEB_CONCURRENCY`` asks for (default 1)."""
+    env = os.environ if env is None else env
+    workers = env.get('WEB_CONCURRENCY', '1')
+    try:
+        return int(workers)
+    except ValueError:
+        raise ImproperlyConfigured(f'WEB_CONCURRENCY must be a number of processes, not {workers!r}.') from None
+
+
+def shared(env=None) -> bool:
+    """Whether every serving process sees the cache's invalidations."""
+    env = os.environ if env is None else env
+    if env.get('PARKEASY_CACHE', 'locmem') != 'locmem':
+        return True
+    return worker_processes(env) <= 1
@@ -0,0 +1,20 @@
+"""Response compression for the production profile."""
+from django.middleware.gzip import GZipMiddleware as DjangoGZipMiddleware
+
+# Django's gzip stream holds small writes back until it has a block's worth,
+# which would stall Server-Sent Events for minutes.
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+
+
+class GZipMiddleware(DjangoGZipMiddleware):
+    """Django's GZipMiddleware, leaving out event streams.
+
+    It adds up to 100 random bytes to each response (Django's mitigation of
+    BREACH-style attacks on compressed pages carrying secrets such as the
+    CSRF token).
+    """
+
+    def process_response(self, request, response):
+        if response.get('Content-Type', '').startswith(UNCOMPRESSED_TYPES):
+            return response
+        return super().process_response(request, response)
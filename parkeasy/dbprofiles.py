@@ -0,0 +1,101 @@
+"""Database settings picked by environment variables.
+
+``PARKEASY_DB_PROFILE`` selects one of:
+
+``sqlite`` (default)
+    The SQLite file ``PARKEASY_SQLITE_PATH`` (default ``db.sqlite3``, which
+    is not tracked; ``manage.py migrate`` creates it) in WAL mode, so
+    readers neither block the booking writer nor wait for it. Each
+    connection sets busy_timeout (``PARKEASY_SQLITE_BUSY_TIMEOUT`` ms),
+    synchronous=NORMAL (under WAL a power cut can lose the last commits but
+    cannot corrupt the file) and mmap_size (``PARKEASY_SQLITE_MMAP_SIZE``
+    bytes).
+``sqlite-rollback``
+    The same file with SQLite's default rollback journal and full syncs:
+    for filesystems without shared memory, such as network mounts, and as
+    the baseline of ``manage.py bench_db_profiles``.
+``server``
+    A database server: ``PARKEASY_DB_ENGINE`` (a Django backend name,
+    ``postgresql`` by default) with ``PARKEASY_DB_NAME``, ``PARKEASY_DB_USER``,
+    ``PARKEASY_DB_PASSWORD``, ``PARKEASY_DB_HOST`` and ``PARKEASY_DB_PORT``.
+    Connections persist for ``PARKEASY_DB_CONN_MAX_AGE`` seconds (default
+    60) and are health-checked before each request reuses them.
+
+``PARKEASY_DB_REPLICAS`` adds read replicas ``replica_1``, ``replica_2``, ...
+(see parkeasy/replicas.py) with the primary's settings: a comma-separated
+list of SQLite files, which ``manage.py sync_replica`` copies the primary
+into, or of server hosts. Tests read them through the primary.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILES = ('sqlite', 'sqlite-rollback', 'server')
+DEFAULT_BUSY_TIMEOUT_MS = 20_000
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_CONN_MAX_AGE = 60
+
+
+def _int(env, name: str, default: int) -> int:
+    try:
+        return int(env.get(name, default))
+    except ValueError:
+        raise ImproperlyConfigured(f'{name} must be an integer.') from None
+
+
+def _sqlite(env, base_dir, wal: bool) -> dict:
+    busy_timeout = _int(env, 'PARKEASY_SQLITE_BUSY_TIMEOUT', DEFAULT_BUSY_TIMEOUT_MS)
+    if wal:
+        pragmas = [
+            'journal_mode=WAL',
+            'synchronous=NORMAL',
+            f'mmap_size={_int(env, "PARKEASY_SQLITE_MMAP_SIZE", DEFAULT_MMAP_SIZE)}',
+        ]
+    else:
+        # WAL mode sticks to the file, so switch it back explicitly.
+        pragmas = ['journal_mode=DELETE', 'synchronous=FULL']
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': env.get('PARKEASY_SQLITE_PATH') or base_dir / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock at BEGIN so check-then-insert booking
+            # transactions serialize instead of failing on lock upgrade.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': busy_timeout / 1000,
+            'init_command': ';'.join(f'PRAGMA {pragma}' for pragma in [f'busy_timeout={busy_timeout}', *pragmas]),
+        },
+    }
+
+
+def _server(env) -> dict:
+    return {
+        'ENGINE': f'django.db.backends.{env.get("PARKEASY_DB_ENGINE", "postgresql")}',
+        'NAME': env.get('PARKEASY_DB_NAME', 'parkeasy'),
+        'USER': env.get('PARKEASY_DB_USER', ''),
+        'PASSWORD': env.get('PARKEASY_DB_PASSWORD', ''),
+        'HOST': env.get('PARKEASY_DB_HOST', ''),
+        'PORT': env.get('PARKEASY_DB_PORT', ''),
+        'CONN_MAX_AGE': _int(env, 'PARKEASY_DB_CONN_MAX_AGE', DEFAULT_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': True,
+    }
+
+
+def _replicas(primary: dict, env, field: str) -> dict:
+    locations = [value.strip() for value in env.get('PARKEASY_DB_REPLICAS', '').split(',') if value.strip()]
+    return {
+        f'replica_{n}': {**primary, field: location, 'TEST': {'MIRROR': 'default'}}
+        for n, location in enumerate(locations, 1)
+    }
+
+
+def databases(base_dir, env=None) -> dict:
+    """The DATABASES setting for the profile named in ``env`` (default: os.environ)."""
+    env = os.environ if env is None else env
+    profile = env.get('PARKEASY_DB_PROFILE', 'sqlite')
+    if profile == 'server':
+        primary, field = _server(env), 'HOST'
+    elif profile in ('sqlite', 'sqlite-rollback'):
+        primary, field = _sqlite(env, base_dir, wal=profile == 'sqlite'), 'NAME'
+    else:
+        raise ImproperlyConfigured(f'PARKEASY_DB_PROFILE must be one of {", ".join(PROFILES)}, not {profile!r}.')
+    return {'default': primary, **_replicas(primary, env, field)}
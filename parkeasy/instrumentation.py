@@ -0,0 +1,121 @@
+"""Per-request query, DB time, template time and latency accounting.
+
+``RequestMetricsMiddleware`` opens a ``RequestStats`` for each request in a
+context variable, so it follows the request across sync and async code
+without locking. An ``execute_wrapper`` on every database connection counts
+and times the SQL, and ``InstrumentedTemplates`` (the template backend in
+settings) times each top-level render. When the request is done the totals
+go to the histograms in parkeasy/metrics.py, and a request that ran more
+than ``METRICS['LOG_QUERY_THRESHOLD']`` queries has its SQL logged so N+1
+patterns can be traced to the statement.
+
+Work done while a streaming response is iterated happens after the
+middleware returns and is not counted.
+"""
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cap on the statements kept for the over-threshold log of one request.
+MAX_LOGGED_QUERIES = 500
+
+_current: ContextVar['RequestStats | None'] = ContextVar('request_stats', default=None)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+    template_seconds: float = 0.0
+    keep_sql: bool = False
+    sql: list = field(default_factory=list)
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_seconds += elapsed
+            if self.keep_sql and len(self.sql) < MAX_LOGGED_QUERIES:
+                self.sql.append((elapsed, context['connection'].alias, sql))
+
+
+def current_stats() -> RequestStats | None:
+    """The stats of the request being served, if any."""
+    return _current.get()
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """The Django template backend, timing every render into the current
+    request's stats. ``{% include %}``/``{% extends %}`` are part of the
+    outer render and not counted twice."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
+
+
+def view_label(request) -> str:
+    """URL name of the matched view; unmatched paths share one label so the
+    number of series stays bounded."""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else '<unmatched>'
+
+
+class RequestMetricsMiddleware:
+    """Outermost middleware: records every request into parkeasy.metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = metrics.config()['LOG_QUERY_THRESHOLD']
+
+    def __call__(self, request):
+        stats = RequestStats(keep_sql=self.threshold is not None)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(stats.execute_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+        view = view_label(request)
+        metrics.observe_request(view, request.method, response.status_code, elapsed, stats)
+        if self.threshold is not None and stats.queries > self.threshold:
+            self._log_queries(request, view, stats, elapsed)
+        return response
+
+    def _log_queries(self, request, view, stats, elapsed):
+        statements = '\n'.join(f'  [{alias}] {seconds * 1000:.2f}ms {sql}' for seconds, alias, sql in stats.sql)
+        logger.warning(
+            '%s %s (%s) ran %d queries (%.1fms SQL, %.1fms total):\n%s',
+            request.method, request.path, view, stats.queries,
+            stats.db_seconds * 1000, elapsed * 1000, statements,
+        )
@@ -0,0 +1,335 @@
+"""In-process load generation against ``parkeasy.wsgi.application``.
+
+A traffic stream is JSON lines, one request per line::
+
+    {"role": "customer", "method": "GET", "path": "/customer/search/?city=Pune"}
+    {"role": "customer", "method": "POST", "path": "/customer/book/{slot}/", "data": {"start_time": "..."}}
+
+``role`` is ``customer`` or ``place_owner`` (omitted: anonymous), ``method``
+defaults to GET and ``data`` is form-encoded. ``{place}``, ``{slot}`` and
+``{booking}`` in the path and data values are replaced with the ids of the
+benchmark's place, slot and booking, so a stream replays against any
+database. ``name`` overrides the endpoint a request is reported under
+(default: the method and URL name).
+
+Requests go through the whole handler and middleware stack, CSRF checks
+included, so each worker logs in with a real POST to the login view.
+"""
+import json
+import multiprocessing
+import queue
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import lru_cache
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import unquote, urlencode, urlsplit
+
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
+from django.urls import Resolver404, resolve, reverse
+from django.utils import timezone
+
+from .bench import summarize
+
+ROLES = ('customer', 'place_owner')
+UNSAFE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+# (weight, role, method, path); paths use the {place}/{slot} placeholders.
+SYNTHETIC_MIX = (
+    (4, None, 'GET', '/'),
+    (10, 'customer', 'GET', '/customer/'),
+    (14, 'customer', 'GET', '/customer/search/?city=Pune'),
+    (8, 'customer', 'GET', '/customer/search/?q=parking&vehicle_type=4_wheeler'),
+    (6, 'customer', 'GET', '/customer/search/?lat=18.52&lng=73.85&radius_km=5'),
+    (8, 'customer', 'GET', '/customer/search/autocomplete/?q=p'),
+    (10, 'customer', 'GET', '/customer/place/{place}/'),
+    (5, 'customer', 'GET', '/customer/place/{place}/quote/'),
+    (4, 'customer', 'GET', '/customer/book/{slot}/'),
+    (5, 'customer', 'POST', '/customer/book/{slot}/'),
+    (6, 'customer', 'GET', '/customer/my-bookings/'),
+    (6, 'place_owner', 'GET', '/owner/'),
+    (4, 'place_owner', 'GET', '/owner/bookings/'),
+    (3, 'place_owner', 'GET', '/owner/payments/'),
+    (4, 'place_owner', 'GET', '/owner/analytics/data/?period=day'),
+    (3, 'place_owner', 'GET', '/owner/places/{place}/slots/'),
+)
+
+
+class LoadTestError(Exception):
+    """The benchmark could not log in or read its traffic."""
+
+
+class WSGIClient:
+    """Calls a WSGI callable directly, keeping cookies between requests
+    like a browser and sending the CSRF cookie back on unsafe methods.
+    ``headers`` are extra environ entries sent with every request, such as
+    ``{'HTTP_ACCEPT_ENCODING': 'gzip'}``."""
+
+    def __init__(self, app, host: str = 'testserver', headers=None):
+        self.app = app
+        self.host = host
+        self.headers = dict(headers or {})
+        self.cookies = SimpleCookie()
+
+    def request(self, method: str, path: str, data=None) -> tuple[int, dict, int]:
+        """Returns (status, headers, body size)."""
+        parts = urlsplit(path)
+        query, body = parts.query, b''
+        if data and method in UNSAFE_METHODS:
+            body = urlencode(data, doseq=True).encode()
+        elif data:
+            query = '&'.join(filter(None, [query, urlencode(data, doseq=True)]))
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': unquote(parts.path),
+            'QUERY_STRING': query,
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': self.host,
+            'REMOTE_ADDR': '127.0.0.1',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            **self.headers,
+        }
+        if body:
+            environ['CONTENT_TYPE'] = 'application/x-www-form-urlencoded'
+            environ['CONTENT_LENGTH'] = str(len(body))
+        if self.cookies:
+            environ['HTTP_COOKIE'] = '; '.join(f'{name}={morsel.value}' for name, morsel in self.cookies.items())
+        csrf = self.cookies.get(settings.CSRF_COOKIE_NAME)
+        if method in UNSAFE_METHODS and csrf is not None:
+            environ[settings.CSRF_HEADER_NAME] = csrf.value
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'], started['headers'] = int(status.split()[0]), headers
+
+        result = self.app(environ, start_response)
+        try:
+            size = sum(len(chunk) for chunk in result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        for name, value in started['headers']:
+            if name.lower() == 'set-cookie':
+                self._store_cookie(value)
+        return started['status'], dict(started['headers']), size
+
+    def _store_cookie(self, header: str) -> None:
+        cookie = SimpleCookie()
+        cookie.load(header)
+        for name, morsel in cookie.items():
+            if morsel['max-age'] == '0':
+                self.cookies.pop(name, None)
+            else:
+                self.cookies[name] = morsel
+
+    def login(self, username: str, password: str) -> None:
+        login_url = reverse('login')
+        self.request('GET', login_url)
+        status, headers, _ = self.request('POST', login_url, {'username': username, 'password': password})
+        if status != 302 or reverse('redirect_after_login') not in headers.get('Location', ''):
+            raise LoadTestError(f'Could not log in as {username!r} (HTTP {status}).')
+
+
+def read_traffic(lines) -> list[dict]:
+    entries = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError as exc:
+            raise LoadTestError(f'Line {number}: {exc}') from None
+        if not isinstance(entry, dict) or 'path' not in entry:
+            raise LoadTestError(f'Line {number}: expected an object with a "path".')
+        if entry.get('role') not in (None, *ROLES):
+            raise LoadTestError(f'Line {number}: unknown role {entry["role"]!r}.')
+        entry['method'] = entry.get('method', 'GET').upper()
+        entries.append(entry)
+    return entries
+
+
+def synthetic_traffic(count: int, seed: int = 0) -> list[dict]:
+    """``count`` requests drawn from SYNTHETIC_MIX; booking POSTs ask for
+    random future windows so most of them succeed."""
+    rng = random.Random(seed)
+    weights = [weight for weight, *_ in SYNTHETIC_MIX]
+    base = timezone.localtime().replace(minute=0, second=0, microsecond=0) + timedelta(days=7)
+    entries = []
+    for _, role, method, path in rng.choices(SYNTHETIC_MIX, weights, k=count):
+        entry = {'role': role, 'method': method, 'path': path}
+        if method == 'POST':
+            start = base + timedelta(hours=rng.randrange(24 * 60))
+            entry['data'] = {
+                'start_time': f'{start:%Y-%m-%dT%H:%M}',
+                'end_time': f'{start + timedelta(hours=rng.choice((1, 2))):%Y-%m-%dT%H:%M}',
+            }
+        entries.append(entry)
+    return entries
+
+
+@lru_cache(maxsize=1024)
+def _url_name(path: str) -> str:
+    try:
+        return resolve(path).url_name or path
+    except Resolver404:
+        return path
+
+
+def _fill(value, ids: dict):
+    if isinstance(value, str):
+        return value.format_map(ids) if '{' in value else value
+    if isinstance(value, list):
+        return [_fill(item, ids) for item in value]
+    return value
+
+
+def _prepare(entries: list[dict], ids: dict) -> list[tuple]:
+    ids = defaultdict(str, {key: value for key, value in ids.items() if value is not None})
+    requests = []
+    for entry in entries:
+        path = _fill(entry['path'], ids)
+        data = {key: _fill(value, ids) for key, value in (entry.get('data') or {}).items()}
+        name = entry.get('name') or f'{entry["method"]} {_url_name(urlsplit(path).path)}'
+        requests.append((entry.get('role'), entry['method'], path, data, name))
+    return requests
+
+
+def replay(entries: list[dict], credentials: dict, ids: dict, threads: int) -> tuple[list, float]:
+    """Replay ``entries`` from ``threads`` threads, each logged in as every
+    role in ``credentials`` ({role: (username, password)}). Returns
+    ([(endpoint, status, seconds)], elapsed seconds); logins are not timed."""
+    from .wsgi import application
+
+    missing = {entry.get('role') for entry in entries} - {None, *credentials}
+    if missing:
+        raise LoadTestError(f'No credentials for role(s): {", ".join(sorted(missing))}.')
+    work = queue.SimpleQueue()
+    for request in _prepare(entries, ids):
+        work.put(request)
+    results, failures = [], []
+    lock = threading.Lock()
+    ready = threading.Barrier(threads + 1)
+
+    def worker():
+        local = []
+        try:
+            try:
+                clients = {None: WSGIClient(application)}
+                for role, (username, password) in credentials.items():
+                    clients[role] = WSGIClient(application)
+                    clients[role].login(username, password)
+            except Exception as exc:
+                failures.append(exc)
+                ready.abort()
+                return
+            ready.wait()
+            while True:
+                try:
+                    role, method, path, data, name = work.get_nowait()
+                except queue.Empty:
+                    break
+                t0 = time.perf_counter()
+                status, _, _ = clients[role].request(method, path, data)
+                local.append((name, status, time.perf_counter() - t0))
+        except threading.BrokenBarrierError:
+            pass
+        finally:
+            connection.close()
+            with lock:
+                results.extend(local)
+
+    close_old_connections()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    try:
+        ready.wait()
+    except threading.BrokenBarrierError:
+        pass
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    if failures:
+        raise failures[0]
+    return results, elapsed
+
+
+def _replay_shard(entries, credentials, ids, threads, out):
+    connections.close_all()
+    try:
+        out.put(('ok', replay(entries, credentials, ids, threads)))
+    except Exception as exc:
+        out.put(('error', repr(exc)))
+
+
+def run(entries: list[dict], credentials: dict, ids: dict, threads: int = 8, processes: int = 1) -> tuple[list, float]:
+    """replay() in this process, or split round-robin over forked worker
+    processes. With processes the elapsed time is the slowest worker's,
+    each timed from when its own threads were logged in."""
+    if processes <= 1:
+        return replay(entries, credentials, ids, threads)
+    context = multiprocessing.get_context('fork')
+    out = context.Queue()
+    connections.close_all()
+    workers = [
+        context.Process(target=_replay_shard, args=(entries[i::processes], credentials, ids, threads, out))
+        for i in range(processes)
+    ]
+    for p in workers:
+        p.start()
+    shards = [out.get() for _ in workers]
+    for p in workers:
+        p.join()
+    errors = [detail for outcome, detail in shards if outcome == 'error']
+    if errors:
+        raise LoadTestError(f'Worker process failed: {errors[0]}')
+    results = [row for _, (rows, _) in shards for row in rows]
+    return results, max(elapsed for _, (_, elapsed) in shards)
+
+
+def report(results: list, elapsed: float) -> dict:
+    """Per-endpoint and overall summarize() output, with status counts."""
+    latencies, statuses = defaultdict(list), defaultdict(Counter)
+    for name, status, seconds in results:
+        latencies[name].append(seconds)
+        statuses[name][str(status)] += 1
+    endpoints = {
+        name: {**summarize(latencies[name], elapsed), 'statuses': dict(sorted(statuses[name].items()))}
+        for name in sorted(latencies)
+    }
+    return {
+        'total': summarize([seconds for _, _, seconds in results], elapsed),
+        'server_errors': sum(1 for _, status, _ in results if status >= 500),
+        'endpoints': endpoints,
+    }
+
+
+def compare(current: dict, baseline: dict) -> list[tuple]:
+    """(endpoint, metric, baseline, current, change %) for the latency
+    percentiles and throughput of endpoints present in both reports."""
+    rows = []
+    pairs = [('total', current['total'], baseline['total'])] + [
+        (name, stats, baseline['endpoints'][name])
+        for name, stats in current['endpoints'].items() if name in baseline.get('endpoints', {})
+    ]
+    for name, now, before in pairs:
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            old, new = before.get(metric, 0), now.get(metric, 0)
+            change = round((new - old) / old * 100, 1) if old else None
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -0,0 +1,133 @@
+"""In-process request metrics in the Prometheus text format.
+
+``RequestMetricsMiddleware`` (parkeasy/instrumentation.py) feeds one
+observation per request into the histograms below, labelled by URL name, and
+``metrics_view`` renders them for a Prometheus scraper. Values live in this
+process only: with several worker processes, scrape each one (or front them
+with a per-process port) and let Prometheus sum them.
+
+Configuration is ``settings.METRICS``.
+"""
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+DEFAULTS = {
+    # Log every query of a request that runs more than this many (None: off).
+    'LOG_QUERY_THRESHOLD': 50,
+    # Clients besides staff users that may read /metrics/.
+    'ALLOWED_IPS': ('127.0.0.1', '::1'),
+}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}_total{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0]
+            series[0][index] += 1
+            series[1] += value
+
+    def total(self) -> tuple[int, float]:
+        """(observations, sum of the values) over all label sets."""
+        with self._lock:
+            return sum(sum(counts) for counts, _ in self._series.values()), sum(s for _, s in self._series.values())
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        for labels, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(float(bound))
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", le)])} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+REQUESTS = Counter('parkeasy_requests', 'Requests served.', ('view', 'method', 'status'))
+LATENCY = Histogram('parkeasy_request_duration_seconds', 'Total request latency.', ('view', 'method'))
+QUERIES = Histogram('parkeasy_db_queries', 'SQL queries run per request.', ('view',), QUERY_BUCKETS)
+DB_TIME = Histogram('parkeasy_db_duration_seconds', 'Time spent in SQL per request.', ('view',))
+TEMPLATE_TIME = Histogram('parkeasy_template_render_seconds', 'Template render time per request.', ('view',))
+REGISTRY = (REQUESTS, LATENCY, QUERIES, DB_TIME, TEMPLATE_TIME)
+
+
+def observe_request(view: str, method: str, status: int, elapsed: float, stats) -> None:
+    REQUESTS.inc((view, method, str(status)))
+    LATENCY.observe((view, method), elapsed)
+    QUERIES.observe((view,), stats.queries)
+    DB_TIME.observe((view,), stats.db_seconds)
+    TEMPLATE_TIME.observe((view,), stats.template_seconds)
+
+
+def render(registry=REGISTRY) -> str:
+    lines = []
+    for metric in registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    user = getattr(request, 'user', None)
+    if not (user is not None and user.is_staff) and request.META.get('REMOTE_ADDR') not in config()['ALLOWED_IPS']:
+        raise PermissionDenied
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,103 @@
+"""Keyset (seek) pagination over (created_at, id), newest first.
+
+Each page is one indexed range query of ``page_size + 1`` rows no matter how
+deep the client has paged, unlike OFFSET which re-reads every skipped row.
+Cursors are opaque URL-safe tokens; a malformed one falls back to the first
+page.
+"""
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+
+@dataclass
+class KeysetPage:
+    items: list = field(default_factory=list)
+    next_cursor: str = ''
+    previous_cursor: str = ''
+    page_size: int = DEFAULT_PAGE_SIZE
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self) -> bool:
+        return bool(self.next_cursor)
+
+    @property
+    def has_previous(self) -> bool:
+        return bool(self.previous_cursor)
+
+
+def encode_cursor(created_at: datetime, pk: int, direction: str) -> str:
+    raw = json.dumps([created_at.isoformat(), pk, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """(created_at, pk, direction) or None if the cursor is not valid."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, pk, direction = json.loads(raw)
+        if direction not in ('next', 'prev'):
+            return None
+        return datetime.fromisoformat(created_at), int(pk), direction
+    except (ValueError, TypeError):
+        return None
+
+
+def page_size_from(params, default: int = DEFAULT_PAGE_SIZE) -> int:
+    try:
+        return min(max(int(params.get('per_page', default)), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return default
+
+
+def keyset_paginate(queryset, cursor: str = '', page_size: int = DEFAULT_PAGE_SIZE) -> KeysetPage:
+    decoded = decode_cursor(cursor) if cursor else None
+    if decoded is None:
+        rows = list(queryset.order_by('-created_at', '-id')[:page_size + 1])
+        more, rows, came_back = len(rows) > page_size, rows[:page_size], False
+    else:
+        created_at, pk, direction = decoded
+        if direction == 'next':
+            rows = list(queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+            ).order_by('-created_at', '-id')[:page_size + 1])
+            more, rows, came_back = len(rows) > page_size, rows[:page_size], False
+        else:
+            rows = list(queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk),
+            ).order_by('created_at', 'id')[:page_size + 1])
+            more, rows, came_back = len(rows) > page_size, rows[:page_size][::-1], True
+
+    page = KeysetPage(items=rows, page_size=page_size)
+    if not rows:
+        return page
+    first, last = rows[0], rows[-1]
+    # ``more`` only tells us about the direction we travelled in; the way we
+    # came from always has rows.
+    has_older = more or came_back
+    has_newer = more if came_back else decoded is not None
+    if has_older:
+        page.next_cursor = encode_cursor(last.created_at, last.pk, 'next')
+    if has_newer:
+        page.previous_cursor = encode_cursor(first.created_at, first.pk, 'prev')
+    return page
+
+
+def paginate_request(request, queryset, default_page_size: int = DEFAULT_PAGE_SIZE) -> KeysetPage:
+    return keyset_paginate(
+        queryset,
+        cursor=request.GET.get('cursor', ''),
+        page_size=page_size_from(request.GET, default_page_size),
+    )
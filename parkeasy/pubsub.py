@@ -0,0 +1,167 @@
+"""Publish/subscribe hub behind the live page updates.
+
+Publishers are ordinary threads: request handlers, payment workers. They call
+``get_hub().publish(channel, data)``, which numbers the event and hands it to
+every subscriber of the channel without blocking. A subscriber is a bounded
+queue, read from a thread (``Subscription.get``) or from the event loop that
+created it (``Subscription.aget``). An idle ASGI subscriber is one suspended
+coroutine: no thread, no polling.
+
+Each channel keeps its last events so a client reconnecting with the number
+of the last event it saw gets the ones it missed. When they are gone, or a
+subscriber falls a full queue behind, the reader is told to start over
+instead of being handed a stream with a hole in it.
+
+``LocalHub`` lives in one process, so its subscribers only get the events
+of that process: not those of other workers, nor of ``manage.py
+sweep_bookings`` run from cron. Hubs marked ``local`` therefore make the
+streams (customer/live.py) tell pages to re-fetch their free slots every
+``REFRESH_SECONDS``, which bounds how long such changes go unseen. A hub on
+a broker (such as Redis pub/sub) behind the same interface, set as
+``LIVE_UPDATES['BACKEND']``, delivers every process's events and needs no
+refreshes.
+"""
+import asyncio
+import queue
+import threading
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    'BACKEND': 'parkeasy.pubsub.LocalHub',
+    'OPTIONS': {},
+    'HEARTBEAT_SECONDS': 15,
+    'WSGI_STREAM_SECONDS': 25,
+    'REFRESH_SECONDS': 30,
+}
+
+
+def config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'LIVE_UPDATES', {})}
+
+
+class Event(NamedTuple):
+    seq: int
+    data: dict
+
+
+class Subscription:
+    """Events published to ``channel`` after subscribing, oldest first.
+
+    ``overflowed`` is set when an event was dropped because the queue was
+    full; the reader has missed it and must start over.
+    """
+
+    def __init__(self, hub, channel: str, size: int, loop=None):
+        self.hub = hub
+        self.channel = channel
+        self.loop = loop
+        self.overflowed = False
+        self._queue = asyncio.Queue(size) if loop is not None else queue.Queue(size)
+
+    def _deliver(self, event: Event) -> None:
+        if self.loop is None:
+            self._put(event)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The loop closed under a reader that never unsubscribed.
+            self.hub.unsubscribe(self)
+
+    def _put(self, event: Event) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except (asyncio.QueueFull, queue.Full):
+            self.overflowed = True
+
+    def get(self, timeout: float) -> Event | None:
+        """The next event, or None after ``timeout`` seconds without one."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def aget(self, timeout: float) -> Event | None:
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.hub.unsubscribe(self)
+
+
+class LocalHub:
+    """In-process hub. Event numbers increase across all channels."""
+
+    local = True
+
+    def __init__(self, buffer: int = 200, queue_size: int = 200):
+        self.buffer = buffer
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._last = 0
+        self._history = defaultdict(lambda: deque(maxlen=self.buffer))
+        self._forgotten = defaultdict(int)  # channel -> last event no longer buffered
+        self._subscribers = defaultdict(set)
+
+    def last_seq(self) -> int:
+        """Number of the latest event; subscribe from it to get later ones."""
+        return self._last
+
+    def publish(self, channel: str, data: dict) -> int:
+        with self._lock:
+            self._last += 1
+            event = Event(self._last, data)
+            history = self._history[channel]
+            if len(history) == history.maxlen:
+                self._forgotten[channel] = history[0].seq
+            history.append(event)
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription._deliver(event)
+        return event.seq
+
+    def subscribe(self, channel: str, since: int | None = None, loop=None) -> tuple[Subscription, list[Event] | None]:
+        """Subscribe to ``channel``; pass the running ``loop`` to read with ``aget``.
+
+        Returns the subscription and the buffered events numbered after
+        ``since``, or None for the backlog when some of them are gone (or
+        ``since`` comes from another hub, such as before a restart).
+        """
+        subscription = Subscription(self, channel, self.queue_size, loop)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+            if since is None:
+                backlog = []
+            elif since > self._last or since < self._forgotten.get(channel, 0):
+                backlog = None
+            else:
+                backlog = [event for event in self._history.get(channel, ()) if event.seq > since]
+        return subscription, backlog
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        return len(self._subscribers.get(channel, ()))
+
+
+@lru_cache(maxsize=None)
+def _load(backend: str, options: tuple):
+    return import_string(backend)(**dict(options))
+
+
+def get_hub():
+    conf = config()
+    return _load(conf['BACKEND'], tuple(sorted(conf['OPTIONS'].items())))
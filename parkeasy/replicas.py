@@ -0,0 +1,111 @@
+"""Read replicas with a sticky-primary window.
+
+Replicas are the DATABASES aliases other than ``default`` (see
+PARKEASY_DB_REPLICAS in parkeasy/dbprofiles.py). ``ReplicaMiddleware``
+picks one for each GET/HEAD/OPTIONS request and ``PrimaryReplicaRouter``
+sends that request's reads to it. Everything else reads the primary:
+
+- unsafe methods (POST etc.) and code outside requests (commands, payment
+  workers), whose reads feed writes;
+- reads inside a transaction and reads after the request wrote anything;
+- clients that wrote within the last ``STICKY_SECONDS``. A cookie marks
+  them, so the GET after a redirect, such as the checkout page after
+  booking a slot, sees the write before the replica has caught up.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULTS = {
+    'STICKY_SECONDS': 10,
+    'COOKIE_NAME': 'use_primary',
+}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def config() -> dict:
+    return {**DEFAULTS, **getattr(settings, 'READ_REPLICAS', {})}
+
+
+def replica_aliases() -> list[str]:
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+class _Routing:
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_current = ContextVar('replica_routing', default=None)
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, e.g. to fill a cache entry
+    that would otherwise keep replication lag around after it caught up."""
+    routing = _current.get()
+    if routing is None:
+        yield
+        return
+    replica, routing.replica = routing.replica, None
+    try:
+        yield
+    finally:
+        routing.replica = replica
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Explicitly the primary, not None: Django would fall back to the
+        # database an instance hint was loaded from, possibly a replica.
+        routing = _current.get()
+        if routing is None or routing.replica is None or routing.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _current.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    """Chooses the request's replica and sets the sticky-primary cookie
+    on responses to requests that wrote. Goes before SessionMiddleware so
+    session saves count as writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.replicas = replica_aliases()
+        self.config = config()
+
+    def __call__(self, request):
+        cookie = self.config['COOKIE_NAME']
+        replica = None
+        if self.replicas and request.method in SAFE_METHODS and cookie not in request.COOKIES:
+            replica = random.choice(self.replicas)
+        routing = _Routing(replica)
+        token = _current.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if self.replicas and (routing.wrote or request.method not in SAFE_METHODS):
+            response.set_cookie(cookie, '1', max_age=self.config['STICKY_SECONDS'], httponly=True, samesite='Lax')
+        return response
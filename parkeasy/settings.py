@@ -6,11 +6,18 @@ Generated by 'django-admin startproject' using Django 5.2.5.
 
 from pathlib import Path
 
+from . import cacheprofiles, dbprofiles, siteprofiles
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = 'dev-insecure-placeholder-key'
-DEBUG = True
-ALLOWED_HOSTS: list[str] = []
+# Picked with PARKEASY_PROFILE: development by default, or production with
+# hashed, precompressed static files, cached templates and compressed
+# responses (see parkeasy/siteprofiles.py).
+SITE_PROFILE = siteprofiles.profile(BASE_DIR)
+
+SECRET_KEY = SITE_PROFILE.secret_key
+DEBUG = SITE_PROFILE.debug
+ALLOWED_HOSTS: list[str] = SITE_PROFILE.allowed_hosts
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -23,9 +30,13 @@ INSTALLED_APPS = [
     'customer',
     'owner',
     'payment',
+    'api',
 ]
 
 MIDDLEWARE = [
+    'parkeasy.instrumentation.RequestMetricsMiddleware',
+    *SITE_PROFILE.middleware,
+    'parkeasy.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -39,26 +50,46 @@ ROOT_URLCONF = 'parkeasy.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'parkeasy.instrumentation.InstrumentedTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
+        # Explicit loaders replace the ones APP_DIRS adds.
+        'APP_DIRS': 'loaders' not in SITE_PROFILE.template_options,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            **SITE_PROFILE.template_options,
         },
     },
 ]
 
 WSGI_APPLICATION = 'parkeasy.wsgi.application'
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+ASGI_APPLICATION = 'parkeasy.asgi.application'
+
+# Picked with PARKEASY_DB_PROFILE: WAL-tuned SQLite by default, the plain
+# rollback-journal SQLite, or a database server (see parkeasy/dbprofiles.py).
+DATABASES = dbprofiles.databases(BASE_DIR)
+
+# Picked with PARKEASY_CACHE: local memory by default, files or Redis (see
+# parkeasy/cacheprofiles.py). Search results and slot grids are cached
+# under versioned keys (see owner/caching.py), unless CACHE_SHARED is off:
+# a per-process cache under several processes, where a stamp bumped by one
+# worker would leave the others serving stale availability.
+CACHES = cacheprofiles.caches(BASE_DIR)
+CACHE_SHARED = cacheprofiles.shared()
+# Serving processes, from WEB_CONCURRENCY. State kept in one process's memory,
+# such as the fallback search index (owner/fulltext.py), needs just one.
+WORKER_PROCESSES = cacheprofiles.worker_processes()
+
+# Reads of GET requests go to a replica when there are any (see
+# parkeasy/replicas.py); a client that wrote is kept on the primary for
+# STICKY_SECONDS so it reads its own writes.
+DATABASE_ROUTERS = ['parkeasy.replicas.PrimaryReplicaRouter']
+READ_REPLICAS = {
+    'STICKY_SECONDS': 10,
+    'COOKIE_NAME': 'use_primary',
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -75,14 +106,102 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = SITE_PROFILE.static_root
+if SITE_PROFILE.storages:
+    STORAGES = SITE_PROFILE.storages
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.UserProfile'
 
+# Loads the query-budget seed once per test run (see parkeasy/testing.py).
+TEST_RUNNER = 'parkeasy.testing.SeededTestRunner'
+
+# Sessions are read from the cache and written through to the database, so
+# logging out still revokes them; `manage.py clear_expired_sessions` deletes
+# the expired rows. The signed-in user is cached too (see
+# accounts/backends.py). Neither is cached when the cache is per-process and
+# there are several processes (see parkeasy/cacheprofiles.py).
+if cacheprofiles.shared():
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    AUTHENTICATION_BACKENDS = ['django.contrib.auth.backends.ModelBackend']
+
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/accounts/redirect-after-login/'
 LOGOUT_REDIRECT_URL = '/'
 
+# Unpaid bookings hold their slot this long before `manage.py sweep_bookings`
+# expires them.
+BOOKING_HOLD_MINUTES = 15
+
+# Longest booking accepted. Each booked hour writes an occupancy rollup row
+# inside the booking transaction (see owner/analytics.py).
+BOOKING_MAX_HOURS = 7 * 24
+
+# Booking prices (see owner/pricing.py). Durations are rounded up to
+# ROUNDING_MINUTES with a MINIMUM_MINUTES floor. RATE_TABLE rows are
+# (weekdays with 0 = Monday, first hour, end hour, multiplier) in local time;
+# later rows win. VEHICLE_SURCHARGES are percentages added per vehicle type.
+PRICING = {
+    'ROUNDING_MINUTES': 15,
+    'MINIMUM_MINUTES': 30,
+    'RATE_TABLE': [
+        ((0, 1, 2, 3, 4, 5, 6), 0, 6, '0.75'),
+        ((0, 1, 2, 3, 4, 5, 6), 22, 24, '0.75'),
+        ((0, 1, 2, 3, 4), 8, 11, '1.5'),
+        ((0, 1, 2, 3, 4), 17, 20, '1.5'),
+    ],
+    'VEHICLE_SURCHARGES': {
+        'single_axle': '25',
+        'double_axle': '50',
+    },
+}
+
+# Payment gateway (see payment/gateways.py and payment/pipeline.py). Charges
+# run on a pool of WORKERS threads after checkout commits unless ASYNC is
+# off; results come back through the same path as gateway webhooks, which
+# must be signed with PAYMENT_WEBHOOK_SECRET (PARKEASY_PAYMENT_WEBHOOK_SECRET,
+# see parkeasy/siteprofiles.py). Charges queued in memory are
+# lost if the process stops, so `manage.py sweep_bookings` charges payments
+# still pending after RETRY_AFTER_MINUTES again (the idempotency key makes
+# that safe) and fails those the gateway has not answered for
+# GIVE_UP_AFTER_MINUTES.
+PAYMENT_GATEWAY = {
+    'BACKEND': 'payment.gateways.FakeGateway',
+    'OPTIONS': {'latency': 0.3, 'failure_rate': 0.0},
+    'ASYNC': True,
+    'WORKERS': 16,
+    'RETRY_AFTER_MINUTES': 5,
+    'GIVE_UP_AFTER_MINUTES': 60,
+}
+PAYMENT_WEBHOOK_SECRET = SITE_PROFILE.webhook_secret
+
+# Request metrics served at /metrics/ (see parkeasy/metrics.py). Requests
+# running more than LOG_QUERY_THRESHOLD queries get their SQL logged to the
+# parkeasy.instrumentation logger; None turns that off.
+METRICS = {
+    'LOG_QUERY_THRESHOLD': 50,
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+# Slot-state deltas streamed to place pages (see customer/live.py and
+# parkeasy/pubsub.py). The in-process hub keeps the last `buffer` events
+# per place for reconnecting clients; a viewer more than `queue_size`
+# events behind is told to reload. Streams send a comment every
+# HEARTBEAT_SECONDS and, served over WSGI, end after WSGI_STREAM_SECONDS. The
+# in-process hub misses other processes' changes (the sweeper's expiries,
+# other workers' bookings), so its viewers re-fetch the free slots every
+# REFRESH_SECONDS.
+LIVE_UPDATES = {
+    'BACKEND': 'parkeasy.pubsub.LocalHub',
+    'OPTIONS': {'buffer': 200, 'queue_size': 200},
+    'HEARTBEAT_SECONDS': 15,
+    'WSGI_STREAM_SECONDS': 25,
+    'REFRESH_SECONDS': 30,
+}
+
 # EMIAL_HOST = 'samtp@gmail.com'
 # EMAIL_PORT = '587'
 # EMAIL_HOST_USER = 'vjwings9@gmail.com'
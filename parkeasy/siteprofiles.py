@@ -0,0 +1,87 @@
+"""Serving settings picked by environment variables.
+
+``PARKEASY_PROFILE`` selects one of:
+
+``development`` (default)
+    DEBUG on. runserver serves ``static/`` as it is, under its own names.
+    Placeholder secrets unless ``PARKEASY_PAYMENT_WEBHOOK_SECRET`` is set.
+``production``
+    DEBUG off, with the secret key from ``PARKEASY_SECRET_KEY``, the
+    payment webhook signing secret from ``PARKEASY_PAYMENT_WEBHOOK_SECRET``
+    (both required) and the comma-separated ``PARKEASY_ALLOWED_HOSTS``.
+    ``manage.py collectstatic`` copies the static files to
+    ``PARKEASY_STATIC_ROOT`` (default ``staticfiles`` in the project) under
+    content-hashed names, next to gzip copies (and brotli ones when the
+    ``brotli`` package is installed) of the compressible ones; the app
+    serves them with a year of caching (parkeasy/staticfiles.py). A file
+    whose content changes gets a new name, so clients never keep a stale
+    one. Templates are compiled once per process and text responses are
+    gzipped (parkeasy/compression.py).
+"""
+import os
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILES = ('development', 'production')
+DEVELOPMENT_SECRET_KEY = 'dev-insecure-placeholder-key'
+DEVELOPMENT_WEBHOOK_SECRET = 'dev-insecure-webhook-secret'
+# Run right after the metrics middleware: static files skip sessions and
+# auth, and compression sees the finished response of everything else.
+PRODUCTION_MIDDLEWARE = [
+    'parkeasy.staticfiles.StaticFilesMiddleware',
+    'parkeasy.compression.GZipMiddleware',
+]
+TEMPLATE_LOADERS = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+
+@dataclass(frozen=True)
+class SiteProfile:
+    name: str
+    debug: bool
+    secret_key: str
+    webhook_secret: str = DEVELOPMENT_WEBHOOK_SECRET
+    allowed_hosts: list = field(default_factory=list)
+    static_root: str | None = None
+    storages: dict = field(default_factory=dict)
+    middleware: list = field(default_factory=list)
+    # Extra OPTIONS for the template engine.
+    template_options: dict = field(default_factory=dict)
+
+
+def profile(base_dir, env=None) -> SiteProfile:
+    """The profile named in ``env`` (default: os.environ)."""
+    env = os.environ if env is None else env
+    name = env.get('PARKEASY_PROFILE', 'development')
+    if name not in PROFILES:
+        raise ImproperlyConfigured(f'PARKEASY_PROFILE must be one of {", ".join(PROFILES)}, not {name!r}.')
+    if name == 'development':
+        return SiteProfile(
+            name, debug=True, secret_key=DEVELOPMENT_SECRET_KEY,
+            webhook_secret=env.get('PARKEASY_PAYMENT_WEBHOOK_SECRET') or DEVELOPMENT_WEBHOOK_SECRET,
+        )
+    secret_key = env.get('PARKEASY_SECRET_KEY', '')
+    if not secret_key:
+        raise ImproperlyConfigured('The production profile needs PARKEASY_SECRET_KEY.')
+    webhook_secret = env.get('PARKEASY_PAYMENT_WEBHOOK_SECRET', '')
+    if not webhook_secret:
+        raise ImproperlyConfigured('The production profile needs PARKEASY_PAYMENT_WEBHOOK_SECRET.')
+    return SiteProfile(
+        name,
+        debug=False,
+        secret_key=secret_key,
+        webhook_secret=webhook_secret,
+        allowed_hosts=[host.strip() for host in env.get('PARKEASY_ALLOWED_HOSTS', '').split(',') if host.strip()],
+        static_root=env.get('PARKEASY_STATIC_ROOT') or str(base_dir / 'staticfiles'),
+        storages={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'parkeasy.staticfiles.CompressedManifestStorage'},
+        },
+        middleware=PRODUCTION_MIDDLEWARE,
+        template_options={'loaders': TEMPLATE_LOADERS},
+    )
@@ -0,0 +1,131 @@
+"""Static files for the production profile (see parkeasy/siteprofiles.py).
+
+``CompressedManifestStorage`` is Django's manifest storage, which copies
+each file under a name carrying a hash of its content and rewrites the
+references in CSS, plus gzip (``.gz``) and, when the ``brotli`` package is
+installed, brotli (``.br``) copies of the compressible files, made once by
+``collectstatic`` at the highest levels rather than per request.
+
+``StaticFilesMiddleware`` serves STATIC_ROOT from the app, before sessions
+and auth run, picking the precompressed copy the client accepts. Hashed
+names never change content, so they are cached for a year without
+revalidation; the original names, which templates should not link to, for
+an hour.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.txt', '.json', '.xml', '.html', '.ico')
+# Keep a compressed copy only when it saves at least this fraction.
+MIN_SAVING = 0.05
+IMMUTABLE = 'public, max-age=31536000, immutable'
+SHORT_LIVED = 'public, max-age=3600'
+
+
+def _compressors():
+    compressors = [('.gz', 'gzip', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.insert(0, ('.br', 'br', lambda data: brotli.compress(data, quality=11)))
+    return compressors
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    """Hashed names plus precompressed copies of the compressible files."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in paths:
+            for copy in {name, self.hashed_files.get(self.hash_key(self.clean_name(name)), name)}:
+                if copy.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+                    self._compress(copy)
+
+    def _compress(self, name: str):
+        with self.open(name) as original:
+            data = original.read()
+        for suffix, _, compress in _compressors():
+            compressed = compress(data)
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            if len(compressed) <= len(data) * (1 - MIN_SAVING):
+                self._save(name + suffix, ContentFile(compressed))
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip().removeprefix('q=')
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """Serve GET and HEAD requests under STATIC_URL from STATIC_ROOT."""
+
+    def __init__(self, get_response):
+        # Not used when the files are served from another host.
+        if not settings.STATIC_ROOT or '://' in settings.STATIC_URL:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = str(settings.STATIC_ROOT)
+        self.hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return self.get_response(request)
+        return self.serve(request, request.path[len(self.prefix):])
+
+    def serve(self, request, name: str):
+        name = posixpath.normpath(name).lstrip('/')
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            raise Http404 from None
+        if not os.path.isfile(path):
+            raise Http404
+        mtime = os.stat(path).st_mtime
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), mtime):
+            return HttpResponseNotModified()
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        served, encoding, variants = path, None, False
+        for suffix, coding, _ in _compressors():
+            if os.path.isfile(path + suffix):
+                variants = True
+                if encoding is None and coding in accepted:
+                    served, encoding = path + suffix, coding
+        response = FileResponse(open(served, 'rb'), content_type=content_type)
+        response.headers.pop('Content-Disposition', None)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if variants:
+            patch_vary_headers(response, ['Accept-Encoding'])
+        response.headers['Last-Modified'] = http_date(mtime)
+        response.headers['Cache-Control'] = IMMUTABLE if name in self.hashed_names else SHORT_LIVED
+        return response
@@ -0,0 +1,316 @@
+"""Seed data and assertions for the per-view query-budget tests.
+
+``seed()`` bulk-loads a marketplace whose size is ``PARKEASY_TEST_SCALE``
+times the production-sized 1k places / 50k slots / 500k bookings; the
+default 0.01 keeps a plain ``manage.py test`` quick, ``PARKEASY_TEST_SCALE=1``
+runs the budgets against full volumes. ``bulk_create`` skips the signal
+handlers, so the vehicle type rows, search index, area counts, dashboard
+counters and rollups they would maintain are rebuilt in bulk afterwards.
+
+``SeededTestRunner`` (the project's TEST_RUNNER) loads the seed once per
+run, before the first test, and flushes it after the last.
+``QueryBudgetMixin`` requests a URL as one of the seeded users and fails
+when the response runs more SQL queries than the URL's budget. Wall-clock
+time depends on the machine, so latency budgets are only checked when
+``PARKEASY_LATENCY_FACTOR`` is set: each response must then take at most
+its budget times that factor (``1`` on the reference machine, more on
+slower ones). Every URL of the app's urls module must have a budget.
+"""
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from customer.models import Booking, CustomerStats
+from customer.stats import rebuild as rebuild_stats
+from owner import analytics, fulltext
+from owner.models import OwnerStats, ParkingPlace, ParkingSlot, PlaceArea, PlaceVehicleType
+from payment.models import Payment
+
+FULL_VOLUMES = {'places': 1000, 'slots': 50_000, 'bookings': 500_000}
+DEFAULT_SCALE = 0.01
+PLACES_PER_OWNER = 50
+BOOKINGS_PER_CUSTOMER = 2500
+BATCH_SIZE = 5000
+PASSWORD = 'budget-pass-123'
+BOOKING_LENGTH = timedelta(hours=2)
+BOOKING_SPACING = timedelta(hours=3)
+
+CITIES = (
+    ('Pune', ('Kothrud', 'Baner', 'Hinjewadi', 'Viman Nagar', 'Hadapsar')),
+    ('Mumbai', ('Andheri', 'Bandra', 'Dadar', 'Powai', 'Colaba')),
+    ('Jalna', ('Old Jalna', 'New Jalna', 'Ambad Road')),
+)
+VEHICLE_SETS = ('2_wheeler,4_wheeler', '4_wheeler', '2_wheeler,3_wheeler,4_wheeler', '4_wheeler,single_axle,double_axle', '')
+
+
+def scale_from_env() -> float:
+    return float(os.environ.get('PARKEASY_TEST_SCALE', DEFAULT_SCALE))
+
+
+def latency_factor() -> float | None:
+    """The factor latency budgets are scaled by, or None to skip them."""
+    factor = os.environ.get('PARKEASY_LATENCY_FACTOR')
+    return float(factor) if factor else None
+
+
+def volumes(scale: float | None = None) -> dict:
+    scale = scale_from_env() if scale is None else scale
+    counts = {name: max(1, round(full * scale)) for name, full in FULL_VOLUMES.items()}
+    counts['owners'] = max(1, counts['places'] // PLACES_PER_OWNER)
+    counts['customers'] = max(1, counts['bookings'] // BOOKINGS_PER_CUSTOMER)
+    return counts
+
+
+@dataclass
+class Seed:
+    """The seeded rows the tests log in as and point URLs at: the first
+    owner with their first place, slot and booking, and the first customer
+    with their first paid booking."""
+    owner: object
+    customer: object
+    place: ParkingPlace
+    slot: ParkingSlot
+    booking: Booking
+    payment: Payment
+    counts: dict = field(default_factory=dict)
+
+
+def _users(role: str, prefix: str, count: int) -> list:
+    User = get_user_model()
+    password = make_password(PASSWORD)
+    return User.objects.bulk_create([
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com', password=password, role=role)
+        for i in range(count)
+    ], batch_size=BATCH_SIZE)
+
+
+def _places(owners: list, count: int) -> list:
+    places = []
+    for i in range(count):
+        city, areas = CITIES[i % len(CITIES)]
+        place = ParkingPlace(
+            owner=owners[i % len(owners)],
+            name=f'Lot {i} Parking',
+            address=f'{i} Station Road',
+            city=city,
+            area=areas[i // len(CITIES) % len(areas)],
+            price_per_hour=Decimal(40 + 10 * (i % 5)),
+            description='Covered parking with CCTV' if i % 2 else 'Open lot near the market',
+            allowed_vehicle_types=VEHICLE_SETS[i % len(VEHICLE_SETS)],
+            latitude=18.45 + (i % 100) * 0.002,
+            longitude=73.80 + (i // 100) * 0.002,
+        )
+        place.fill_derived_fields()
+        places.append(place)
+    ParkingPlace.objects.bulk_create(places, batch_size=BATCH_SIZE)
+    PlaceVehicleType.objects.bulk_create(
+        (PlaceVehicleType(place=place, vehicle_type=v) for place in places for v in place.vehicle_type_list),
+        batch_size=BATCH_SIZE,
+    )
+    return places
+
+
+def _slots(places: list, count: int) -> list:
+    per_place = max(1, count // len(places))
+    slots = [
+        ParkingSlot(
+            place=place, code=f'S{n:03}', is_available=n % 20 != 19,
+            price_per_hour=place.price_per_hour + 10 if n % 10 == 0 else None,
+        )
+        for place in places for n in range(1, per_place + 1)
+    ]
+    return ParkingSlot.objects.bulk_create(slots, batch_size=BATCH_SIZE)
+
+
+def _status(end, now, rng) -> str:
+    if end <= now:
+        return 'cancelled' if rng.random() < 0.15 else 'completed'
+    return 'pending' if rng.random() < 0.2 else 'confirmed'
+
+
+def _bookings(slots: list, customers: list, count: int, now) -> tuple[int, timedelta]:
+    """Per slot, back-to-back bookings from some hours ago into the future.
+    Created and paid in chunks so memory stays flat at full scale."""
+    per_slot = max(1, count // len(slots))
+    base = now.replace(minute=0, second=0, microsecond=0) - BOOKING_SPACING * (per_slot // 2)
+    prices = {place.pk: place.price_per_hour for place in ParkingPlace.objects.only('id', 'price_per_hour')}
+    created, chunk = 0, []
+    rng = random.Random(0)
+
+    def flush():
+        Booking.objects.bulk_create(chunk, batch_size=BATCH_SIZE)
+        Payment.objects.bulk_create([
+            Payment(booking=b, amount=b.amount, status='success')
+            for b in chunk if b.status in ('confirmed', 'completed')
+        ], batch_size=BATCH_SIZE)
+        chunk.clear()
+
+    for slot in slots:
+        price = slot.price_per_hour if slot.price_per_hour is not None else prices[slot.place_id]
+        for k in range(per_slot):
+            start = base + BOOKING_SPACING * k
+            booking = Booking(
+                customer=rng.choice(customers), slot=slot,
+                start_time=start, end_time=start + BOOKING_LENGTH, status=_status(start + BOOKING_LENGTH, now, rng),
+            )
+            booking.amount = price * 2
+            chunk.append(booking)
+            if len(chunk) >= BATCH_SIZE:
+                created += len(chunk)
+                flush()
+    if chunk:
+        created += len(chunk)
+        flush()
+    return created, BOOKING_SPACING * per_slot
+
+
+def seed(scale: float | None = None) -> Seed:
+    counts = volumes(scale)
+    now = timezone.now()
+    User = get_user_model()
+    with transaction.atomic():
+        owners = _users(User.ROLE_OWNER, 'budget-owner-', counts['owners'])
+        customers = _users(User.ROLE_CUSTOMER, 'budget-customer-', counts['customers'])
+        places = _places(owners, counts['places'])
+        slots = _slots(places, counts['slots'])
+        counts['bookings'], span = _bookings(slots, customers, counts['bookings'], now)
+        counts['slots'] = len(slots)
+
+        fulltext.get_index().rebuild()
+        PlaceArea.rebuild()
+        rebuild_stats(OwnerStats, CustomerStats, ParkingPlace, ParkingSlot, Booking, Payment)
+        # Only the first owner's charts are requested.
+        analytics.backfill(
+            analytics.bucket_start(now - span, 'day'),
+            analytics.bucket_start(now + span, 'day') + timedelta(days=2),
+            places=ParkingPlace.objects.filter(owner=owners[0]),
+        )
+    cache.clear()
+
+    owner, customer = owners[0], customers[0]
+    place = ParkingPlace.objects.filter(owner=owner).order_by('id').first()
+    return Seed(
+        owner=owner,
+        customer=customer,
+        place=place,
+        slot=place.slots.order_by('id').first(),
+        booking=Booking.objects.filter(customer=customer, status='pending').order_by('id').first(),
+        payment=Payment.objects.filter(booking__customer=customer).order_by('id').first(),
+        counts=counts,
+    )
+
+
+_shared = None
+
+
+def shared_seed() -> Seed:
+    """The seed, created on first use and reused while its rows exist.
+
+    Under SeededTestRunner this is called once before any test runs, so the
+    rows outlive every TestCase's transaction and each volume is loaded once
+    per run. Under other runners the seed is rolled back with the first
+    test class and loaded again for each class.
+    """
+    global _shared
+    if _shared is None or not Booking.objects.filter(pk=_shared.booking.pk).exists():
+        _shared = seed()
+    return _shared
+
+
+class SeededTestRunner(DiscoverRunner):
+    """Seeds the test database once after creating it.
+
+    The seed is committed, so TestCase rolls each test's changes to it
+    back, and is flushed at the end of the run rather than left in a
+    --keepdb database for the next one. Refuses --parallel: worker
+    databases are cloned before the seed is loaded.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.parallel > 1:
+            raise ValueError('SeededTestRunner cannot run tests in parallel; pass --parallel=1.')
+
+    def setup_databases(self, **kwargs):
+        databases = super().setup_databases(**kwargs)
+        shared_seed()
+        return databases
+
+    def teardown_databases(self, old_config, **kwargs):
+        global _shared
+        if self.keepdb:
+            call_command('flush', interactive=False, verbosity=0)
+        _shared = None
+        super().teardown_databases(old_config, **kwargs)
+
+
+@dataclass(frozen=True)
+class Budget:
+    queries: int
+    ms: float = 250.0
+
+
+class QueryBudgetMixin:
+    """For TestCase subclasses: ``urls_module`` names the app's urls and
+    ``budgets`` maps each of its URL names to a Budget."""
+    urls_module = ''
+    budgets: dict = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.seed = shared_seed()
+
+    def setUp(self):
+        super().setUp()
+        # Every request starts cold: a rolled-back test may have cached
+        # prices, and budgets should not depend on test order.
+        cache.clear()
+
+    def client_for(self, user=None) -> Client:
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        return client
+
+    def assertWithinBudget(self, name: str, *, args=(), method='get', data=None, user=None,
+                           status=200, query='', client=None, **extra):
+        """Request URL ``name`` and check its status and budget; returns the response."""
+        budget = self.budgets[name]
+        client = client or self.client_for(user)
+        url = reverse(name, args=args) + (f'?{query}' if query else '')
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data or {}, **extra)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.assertEqual(response.status_code, status, f'{method.upper()} {url}')
+        statements = '\n'.join(q['sql'] for q in queries.captured_queries)
+        self.assertLessEqual(
+            len(queries), budget.queries,
+            f'{method.upper()} {url} ran {len(queries)} queries (budget {budget.queries}):\n{statements}',
+        )
+        factor = latency_factor()
+        if factor is not None:
+            limit = budget.ms * factor
+            self.assertLessEqual(elapsed_ms, limit, f'{method.upper()} {url} took {elapsed_ms:.0f}ms (budget {limit:.0f}ms)')
+        return response
+
+    def test_every_url_has_a_budget(self):
+        patterns = import_module(self.urls_module).urlpatterns
+        names = {p.name for p in patterns if isinstance(p, URLPattern)}
+        self.assertEqual(names, set(self.budgets))
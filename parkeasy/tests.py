@@ -0,0 +1,276 @@
+import gzip
+import os
+import re
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.http import Http404, HttpResponse
+from django.templatetags.static import static
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from owner.models import ParkingPlace
+from . import cacheprofiles, dbprofiles, siteprofiles
+from .compression import GZipMiddleware
+from .pubsub import LocalHub
+from .replicas import PrimaryReplicaRouter, ReplicaMiddleware, config
+from .staticfiles import IMMUTABLE, SHORT_LIVED, StaticFilesMiddleware
+from .testing import SeededTestRunner, latency_factor
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    def test_sqlite_is_wal_tuned(self):
+        default = dbprofiles.databases(Path('/srv'), {})['default']
+        self.assertEqual(default['NAME'], Path('/srv/db.sqlite3'))
+        self.assertIn('PRAGMA journal_mode=WAL', default['OPTIONS']['init_command'])
+        self.assertIn('PRAGMA synchronous=NORMAL', default['OPTIONS']['init_command'])
+
+    def test_replicas_copy_the_primary(self):
+        databases = dbprofiles.databases(Path('/srv'), {'PARKEASY_DB_REPLICAS': '/srv/r1.sqlite3, /srv/r2.sqlite3'})
+        self.assertEqual(list(databases), ['default', 'replica_1', 'replica_2'])
+        self.assertEqual(databases['replica_2']['NAME'], '/srv/r2.sqlite3')
+        self.assertEqual(databases['replica_1']['OPTIONS'], databases['default']['OPTIONS'])
+        self.assertEqual(databases['replica_1']['TEST'], {'MIRROR': 'default'})
+
+    def test_server_replicas_differ_by_host(self):
+        databases = dbprofiles.databases(Path('/srv'), {
+            'PARKEASY_DB_PROFILE': 'server', 'PARKEASY_DB_HOST': 'db1', 'PARKEASY_DB_REPLICAS': 'db2',
+        })
+        self.assertTrue(databases['default']['CONN_HEALTH_CHECKS'])
+        self.assertEqual((databases['default']['HOST'], databases['replica_1']['HOST']), ('db1', 'db2'))
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ImproperlyConfigured):
+            dbprofiles.databases(Path('/srv'), {'PARKEASY_DB_PROFILE': 'oracle'})
+
+
+class CacheProfileTests(SimpleTestCase):
+    def test_locmem_is_shared_by_one_process(self):
+        self.assertTrue(cacheprofiles.shared({}))
+        self.assertTrue(cacheprofiles.shared({'WEB_CONCURRENCY': '1'}))
+        self.assertFalse(cacheprofiles.shared({'WEB_CONCURRENCY': '4'}))
+
+    def test_other_backends_are_shared(self):
+        self.assertTrue(cacheprofiles.shared({'PARKEASY_CACHE': 'file', 'WEB_CONCURRENCY': '4'}))
+        self.assertTrue(cacheprofiles.shared({'PARKEASY_CACHE': 'redis', 'WEB_CONCURRENCY': '4'}))
+
+    def test_bad_worker_count(self):
+        with self.assertRaises(ImproperlyConfigured):
+            cacheprofiles.shared({'WEB_CONCURRENCY': 'many'})
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.cookie = config()['COOKIE_NAME']
+
+    def respond(self, request, write=False):
+        """Run ``request`` through the middleware with one replica; returns
+        the response and the database reads were routed to."""
+        routed = {}
+
+        def view(request):
+            if write:
+                self.router.db_for_write(ParkingPlace)
+            routed['read'] = self.router.db_for_read(ParkingPlace)
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(view)
+        middleware.replicas = ['replica_1']
+        return middleware(request), routed['read']
+
+    def test_get_reads_replica(self):
+        response, read = self.respond(self.factory.get('/customer/search/'))
+        self.assertEqual(read, 'replica_1')
+        self.assertNotIn(self.cookie, response.cookies)
+
+    def test_write_pins_request_and_client(self):
+        response, read = self.respond(self.factory.get('/accounts/redirect-after-login/'), write=True)
+        self.assertEqual(read, 'default')
+        self.assertEqual(response.cookies[self.cookie]['max-age'], config()['STICKY_SECONDS'])
+
+    def test_post_reads_primary(self):
+        response, read = self.respond(self.factory.post('/customer/book/1/'))
+        self.assertEqual(read, 'default')
+        self.assertIn(self.cookie, response.cookies)
+
+    def test_sticky_cookie_reads_primary(self):
+        request = self.factory.get('/customer/my-bookings/')
+        request.COOKIES[self.cookie] = '1'
+        self.assertEqual(self.respond(request)[1], 'default')
+
+    def test_outside_requests_reads_primary(self):
+        self.assertEqual(self.router.db_for_read(ParkingPlace), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'owner'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'owner'))
+
+
+class ReplicaTransactionTests(TestCase):
+    def test_reads_in_a_transaction_use_primary(self):
+        # TestCase wraps each test in a transaction.
+        middleware = ReplicaMiddleware(lambda request: HttpResponse(PrimaryReplicaRouter().db_for_read(ParkingPlace)))
+        middleware.replicas = ['replica_1']
+        self.assertEqual(middleware(RequestFactory().get('/')).content, b'default')
+
+
+class LocalHubTests(SimpleTestCase):
+    def test_backlog_since_last_seen_event(self):
+        hub = LocalHub()
+        first = hub.publish('place:1', {'n': 1})
+        hub.publish('place:2', {'n': 2})
+        third = hub.publish('place:1', {'n': 3})
+        subscription, backlog = hub.subscribe('place:1', since=first)
+        self.assertEqual(backlog, [(third, {'n': 3})])
+        hub.publish('place:1', {'n': 4})
+        self.assertEqual(subscription.get(0).data, {'n': 4})
+        self.assertIsNone(subscription.get(0))
+        subscription.close()
+        self.assertEqual(hub.subscriber_count('place:1'), 0)
+
+    def test_missed_events_need_a_restart(self):
+        hub = LocalHub(buffer=2)
+        first = hub.publish('place:1', {})
+        second = hub.publish('place:1', {})
+        hub.publish('place:1', {})
+        hub.publish('place:1', {})
+        self.assertIsNone(hub.subscribe('place:1', since=first)[1])
+        self.assertEqual(len(hub.subscribe('place:1', since=second)[1]), 2)
+        self.assertIsNone(hub.subscribe('place:1', since=hub.last_seq() + 1)[1])
+
+    def test_slow_subscriber_overflows(self):
+        hub = LocalHub(queue_size=1)
+        subscription, _ = hub.subscribe('place:1')
+        hub.publish('place:1', {})
+        self.assertFalse(subscription.overflowed)
+        hub.publish('place:1', {})
+        self.assertTrue(subscription.overflowed)
+
+
+class SiteProfileTests(SimpleTestCase):
+    def test_development_is_the_default(self):
+        profile = siteprofiles.profile(Path('/srv'), {})
+        self.assertTrue(profile.debug)
+        self.assertEqual((profile.middleware, profile.storages, profile.template_options), ([], {}, {}))
+
+    def test_production(self):
+        profile = siteprofiles.profile(Path('/srv'), {
+            'PARKEASY_PROFILE': 'production', 'PARKEASY_SECRET_KEY': 's3cret',
+            'PARKEASY_PAYMENT_WEBHOOK_SECRET': 'wh-s3cret',
+            'PARKEASY_ALLOWED_HOSTS': 'parkeasy.example, www.parkeasy.example',
+        })
+        self.assertFalse(profile.debug)
+        self.assertEqual(profile.webhook_secret, 'wh-s3cret')
+        self.assertEqual(profile.allowed_hosts, ['parkeasy.example', 'www.parkeasy.example'])
+        self.assertEqual(profile.static_root, '/srv/staticfiles')
+        self.assertEqual(profile.storages['staticfiles']['BACKEND'], 'parkeasy.staticfiles.CompressedManifestStorage')
+        self.assertEqual(profile.template_options['loaders'][0][0], 'django.template.loaders.cached.Loader')
+
+    def test_production_needs_a_secret_key(self):
+        with self.assertRaises(ImproperlyConfigured):
+            siteprofiles.profile(Path('/srv'), {'PARKEASY_PROFILE': 'production'})
+        with self.assertRaisesMessage(ImproperlyConfigured, 'PARKEASY_PAYMENT_WEBHOOK_SECRET'):
+            siteprofiles.profile(Path('/srv'), {'PARKEASY_PROFILE': 'production', 'PARKEASY_SECRET_KEY': 's3cret'})
+        with self.assertRaises(ImproperlyConfigured):
+            siteprofiles.profile(Path('/srv'), {'PARKEASY_PROFILE': 'staging'})
+
+
+class CompressedStaticFilesTests(SimpleTestCase):
+    """collectstatic into a scratch STATIC_ROOT, served by the middleware."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(root.cleanup)
+        cls.root = Path(root.name)
+        overrides = override_settings(
+            STATIC_ROOT=root.name,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'parkeasy.staticfiles.CompressedManifestStorage'},
+            },
+        )
+        overrides.enable()
+        cls.addClassCleanup(overrides.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.middleware = StaticFilesMiddleware(lambda request: HttpResponse('app'))
+
+    def get(self, url, **headers):
+        return self.middleware(RequestFactory().get(url, headers=headers))
+
+    def test_collectstatic_hashes_and_precompresses(self):
+        css = static('css/style.css')
+        self.assertRegex(css, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+        hashed = self.root / css.removeprefix('/static/')
+        self.assertEqual(gzip.decompress((self.root / f'{hashed}.gz').read_bytes()), hashed.read_bytes())
+        # Rewritten to the image's hashed name.
+        self.assertIn(static('images/imgi_2.png').rsplit('/', 1)[1], hashed.read_text())
+        self.assertFalse(list(self.root.glob('images/*.gz')))
+
+    def test_serves_the_accepted_encoding(self):
+        css = static('css/style.css')
+        response = self.get(css, accept_encoding='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertFalse(response.has_header('Content-Disposition'))
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(body, (self.root / css.removeprefix('/static/')).read_bytes())
+        for accept_encoding in ('', 'gzip;q=0, identity'):
+            self.assertFalse(self.get(css, accept_encoding=accept_encoding).has_header('Content-Encoding'))
+
+    def test_plain_names_are_revalidated(self):
+        response = self.get('/static/css/style.css')
+        self.assertEqual(response['Cache-Control'], SHORT_LIVED)
+        response = self.get('/static/css/style.css', if_modified_since=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_other_paths_reach_the_app(self):
+        self.assertEqual(self.get('/customer/').content, b'app')
+        for url in ('/static/css/missing.css', '/static/../manage.py', '/static/css/'):
+            with self.assertRaises(Http404):
+                self.get(url)
+
+    def test_missing_files_fail(self):
+        with self.assertRaises(ValueError):
+            static('images/missing.jpg')
+
+    def test_templates_link_collected_files(self):
+        names = set()
+        base = Path(settings.BASE_DIR)
+        for template in [*base.glob('templates/**/*.html'), *base.glob('*/templates/**/*.html')]:
+            names.update(re.findall(r"{% static '([^']+)' %}", template.read_text()))
+        for name in names:
+            self.assertRegex(static(name), r'\.[0-9a-f]{12}\.')
+
+
+class GZipMiddlewareTests(SimpleTestCase):
+    def compress(self, response):
+        request = RequestFactory().get('/', headers={'accept-encoding': 'gzip'})
+        return GZipMiddleware(lambda request: response)(request)
+
+    def test_compresses_pages(self):
+        response = self.compress(HttpResponse('<p>ParkEasy</p>' * 100))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), b'<p>ParkEasy</p>' * 100)
+
+    def test_leaves_event_streams_alone(self):
+        response = self.compress(HttpResponse(': ping\n\n' * 100, content_type='text/event-stream'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class SeededTestRunnerTests(SimpleTestCase):
+    def test_refuses_parallel(self):
+        with self.assertRaisesMessage(ValueError, '--parallel=1'):
+            SeededTestRunner(parallel=2)
+
+    def test_latency_budgets_are_opt_in(self):
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertIsNone(latency_factor())
+        with mock.patch.dict(os.environ, {'PARKEASY_LATENCY_FACTOR': '2.5'}):
+            self.assertEqual(latency_factor(), 2.5)
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('django.contrib.auth.urls')),
@@ -8,5 +10,7 @@ urlpatterns = [
     path('owner/', include('owner.urls')),
     path('customer/', include('customer.urls')),
     path('payment/', include('payment.urls')),
+    path('api/v1/', include('api.urls')),
+    path('metrics/', metrics_view, name='metrics'),
     path('', include('accounts.urls')),  # default home/redirects
 ]
@@ -0,0 +1,75 @@
+"""Payment gateway interface and a local stand-in.
+
+A gateway charges an amount for a payment and reports the outcome. Calls
+carry the payment's idempotency key, so retrying a charge after a timeout
+never charges twice. The backend is chosen by ``settings.PAYMENT_GATEWAY``.
+"""
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@dataclass(frozen=True)
+class ChargeResult:
+    succeeded: bool
+    reference: str = ''
+    error: str = ''
+
+
+class Gateway:
+    """Interface for payment providers."""
+
+    def charge(self, amount: Decimal, idempotency_key: str, description: str = '') -> ChargeResult:
+        """Charge ``amount``; blocks for the provider round trip."""
+        raise NotImplementedError
+
+
+class FakeGateway(Gateway):
+    """In-process gateway with configurable latency and failure rate.
+
+    Results are remembered per idempotency key, like a real provider, so a
+    repeated charge returns the first outcome.
+    """
+
+    def __init__(self, latency: float = 0.3, failure_rate: float = 0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._results = {}
+
+    def charge(self, amount: Decimal, idempotency_key: str, description: str = '') -> ChargeResult:
+        with self._lock:
+            if idempotency_key in self._results:
+                return self._results[idempotency_key]
+        time.sleep(self.latency)
+        with self._lock:
+            if idempotency_key not in self._results:
+                if self._rng.random() < self.failure_rate:
+                    result = ChargeResult(False, error='Card declined (simulated).')
+                else:
+                    result = ChargeResult(True, reference=f'fake_{uuid.uuid4().hex[:16]}')
+                self._results[idempotency_key] = result
+            return self._results[idempotency_key]
+
+
+def gateway_settings() -> dict:
+    return {'BACKEND': 'payment.gateways.FakeGateway', 'OPTIONS': {}, 'ASYNC': True, 'WORKERS': 8,
+            'RETRY_AFTER_MINUTES': 5, 'GIVE_UP_AFTER_MINUTES': 60, **getattr(settings, 'PAYMENT_GATEWAY', {})}
+
+
+@lru_cache(maxsize=None)
+def _load(backend: str, options: tuple) -> Gateway:
+    return import_string(backend)(**dict(options))
+
+
+def get_gateway() -> Gateway:
+    conf = gateway_settings()
+    return _load(conf['BACKEND'], tuple(sorted(conf['OPTIONS'].items())))
@@ -0,0 +1,108 @@
+import json
+import queue
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from customer.services import create_booking
+from owner import slots as slot_ops
+from owner.models import ParkingPlace
+from parkeasy.bench import bench_users, summarize
+from payment.models import Payment
+from payment.pipeline import TERMINAL_STATUSES
+
+
+class Command(BaseCommand):
+    help = 'Drive checkout through the view layer against a slow fake gateway, with and without async confirmation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--latency', type=float, default=0.3, help='Fake gateway latency in seconds')
+        parser.add_argument('--failure-rate', type=float, default=0.0)
+        parser.add_argument('--mode', choices=('async', 'sync', 'both'), default='both')
+        parser.add_argument('--timeout', type=float, default=120.0, help='Seconds to wait for confirmations')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **opts):
+        modes = ('async', 'sync') if opts['mode'] == 'both' else (opts['mode'],)
+        report = {'bookings': opts['bookings'], 'threads': opts['threads'], 'gateway_latency_s': opts['latency']}
+        with bench_users() as (owner, customer):
+            place = ParkingPlace.objects.create(owner=owner, name='Bench lot', address='-', area='Bench', city='Pune', price_per_hour=40)
+            slot_ops.create_slots(place, slot_ops.expand_codes(f'C1-{opts["bookings"]}'))
+            slot_ids = list(place.slots.values_list('id', flat=True))
+            for offset, mode in enumerate(modes):
+                start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1 + offset)
+                booking_ids = [create_booking(customer, slot_id, start, start + timedelta(hours=1)).id for slot_id in slot_ids]
+                gateway = {
+                    **settings.PAYMENT_GATEWAY,
+                    'ASYNC': mode == 'async',
+                    'OPTIONS': {'latency': opts['latency'], 'failure_rate': opts['failure_rate']},
+                }
+                with override_settings(PAYMENT_GATEWAY=gateway, ALLOWED_HOSTS=['testserver']):
+                    report[mode] = self._run(customer, booking_ids, opts)
+
+        if opts['json']:
+            self.stdout.write(json.dumps(report))
+            return
+        for key, value in report.items():
+            self.stdout.write(f'{key:>18}: {value}')
+
+    def _run(self, customer, booking_ids, opts):
+        work = queue.Queue()
+        for booking_id in booking_ids:
+            work.put(booking_id)
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def worker():
+            client = Client()
+            client.force_login(customer)
+            local = []
+            try:
+                while True:
+                    try:
+                        booking_id = work.get_nowait()
+                    except queue.Empty:
+                        break
+                    t0 = time.perf_counter()
+                    response = client.post(f'/payment/checkout/?booking={booking_id}', {'idempotency_key': uuid.uuid4().hex})
+                    local.append(time.perf_counter() - t0)
+                    if response.status_code != 302:
+                        with lock:
+                            errors.append(response.status_code)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(local)
+
+        close_old_connections()
+        threads = [threading.Thread(target=worker) for _ in range(opts['threads'])]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        requests_done = time.perf_counter() - started
+
+        payments = Payment.objects.filter(booking_id__in=booking_ids)
+        deadline = time.monotonic() + opts['timeout']
+        while payments.exclude(status__in=TERMINAL_STATUSES).exists() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        confirmed_after = time.perf_counter() - started
+        return {
+            'checkout': summarize(latencies, requests_done),
+            'http_errors': len(errors),
+            'succeeded': payments.filter(status='success').count(),
+            'failed': payments.filter(status='failed').count(),
+            'still_pending': payments.filter(status='pending').count(),
+            'all_settled_s': round(confirmed_after, 3),
+        }
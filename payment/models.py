@@ -7,8 +7,24 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, default='pending')  # pending, success, failed
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Sent with every gateway call so a retried submit or charge is not repeated.
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    reference = models.CharField(max_length=64, blank=True)  # gateway charge id
+    failure_reason = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='payment_recent_idx'),
+            # Recovery of charges lost with a stopped process.
+            models.Index(fields=['status', 'updated_at'], name='payment_status_updated_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Payment #{self.id} - {self.status}"
 
-
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_status = instance.__dict__.get('status')
+        return instance
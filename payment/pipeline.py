@@ -0,0 +1,222 @@
+"""Checkout pipeline: idempotent payment creation, gateway dispatch and
+webhook-style confirmation.
+
+``start_payment`` runs in the request. It locks the booking, hands back the
+payment an earlier submit already created, and queues the charge for after
+commit, so the request never waits on the gateway. Charges run on a worker
+pool (inline when ``PAYMENT_GATEWAY['ASYNC']`` is off). Their outcomes are
+queued to a single writer thread that applies them in batches, one
+transaction per batch, so slow gateways do not turn into many concurrent
+write transactions. Applying an outcome is the same code the webhook
+endpoint runs: it moves ``Payment.status`` and ``Booking.status`` together.
+Terminal states are final, so duplicate or late deliveries are no-ops.
+
+Queued charges and outcomes live in memory and die with the process.
+``recover_stale`` (run by the booking sweeper) charges payments left
+pending again, under the same idempotency key so the gateway answers with
+the first outcome instead of charging twice, and fails the ones the
+gateway has not answered for ``GIVE_UP_AFTER_MINUTES``, which lets the
+sweeper expire their holds.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from customer.models import Booking
+from .gateways import gateway_settings, get_gateway
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('success', 'failed')
+MAX_APPLY_BATCH = 200
+GAVE_UP = 'The payment gateway did not answer; please try again.'
+
+_executor = None
+_executor_lock = threading.Lock()
+_outcomes = queue.Queue()
+_writer = None
+
+
+class PaymentError(Exception):
+    """The booking cannot be paid (any more) or the request is inconsistent."""
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor, _writer
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=gateway_settings()['WORKERS'], thread_name_prefix='payments')
+            _writer = threading.Thread(target=_write_outcomes, name='payments-writer', daemon=True)
+            _writer.start()
+        return _executor
+
+
+def _write_outcomes() -> None:
+    while True:
+        batch = [_outcomes.get()]
+        while len(batch) < MAX_APPLY_BATCH:
+            try:
+                batch.append(_outcomes.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            apply_results(batch)
+        except Exception:
+            logger.exception('Could not apply %d payment outcomes', len(batch))
+        finally:
+            connection.close()
+
+
+def start_payment(booking_id: int, customer, amount, idempotency_key: str) -> Payment:
+    """Create (or reuse) the payment for a booking and queue its charge.
+
+    A repeated submit with the same idempotency key, or any submit while a
+    payment is pending or paid, returns the existing payment instead of
+    charging again. A failed payment is retried under the new key.
+    """
+    with transaction.atomic():
+        booking = Booking.objects.select_for_update().get(pk=booking_id, customer=customer)
+        existing = Payment.objects.filter(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            if existing.booking_id != booking.pk:
+                raise PaymentError('This payment request belongs to another booking.')
+            return existing
+        payment = Payment.objects.filter(booking=booking).first()
+        if payment is not None and payment.status != 'failed':
+            return payment
+        if not booking.is_active:
+            raise PaymentError('This booking can no longer be paid.')
+        if booking.status == 'pending' and booking.hold_expires_at <= timezone.now():
+            raise PaymentError('Your hold on this slot has expired; please book it again.')
+        if payment is None:
+            payment = Payment.objects.create(booking=booking, amount=amount, idempotency_key=idempotency_key)
+        else:
+            payment.status = 'pending'
+            payment.amount = amount
+            payment.idempotency_key = idempotency_key
+            payment.reference = payment.failure_reason = ''
+            payment.save(update_fields=['status', 'amount', 'idempotency_key', 'reference', 'failure_reason', 'updated_at'])
+        payment_id = payment.pk
+        transaction.on_commit(lambda: dispatch(payment_id))
+    return payment
+
+
+def dispatch(payment_id: int) -> None:
+    if gateway_settings()['ASYNC']:
+        _get_executor().submit(_process_in_worker, payment_id)
+    else:
+        process(payment_id)
+
+
+def _process_in_worker(payment_id: int) -> None:
+    try:
+        outcome = charge(payment_id)
+        if outcome is not None:
+            _outcomes.put(outcome)
+    except Exception:
+        logger.exception('Payment %s could not be processed', payment_id)
+    finally:
+        connection.close()
+
+
+def charge(payment_id: int):
+    """Charge a pending payment through the gateway.
+
+    Returns the ``(payment_id, status, reference, error)`` outcome to apply,
+    or None when the payment is no longer pending.
+    """
+    payment = Payment.objects.filter(pk=payment_id, status='pending').first()
+    if payment is None:
+        return None
+    result = get_gateway().charge(payment.amount, payment.idempotency_key, f'ParkEasy booking #{payment.booking_id}')
+    return payment_id, 'success' if result.succeeded else 'failed', result.reference, result.error
+
+
+def process(payment_id: int) -> Payment | None:
+    """Charge a pending payment and apply the outcome right away."""
+    outcome = charge(payment_id)
+    return apply_result(*outcome) if outcome is not None else None
+
+
+def _apply(payment_id: int, status: str, reference: str, error: str) -> Payment:
+    if status not in TERMINAL_STATUSES:
+        raise PaymentError(f'Unknown payment status {status!r}.')
+    payment = Payment.objects.select_for_update().get(pk=payment_id)
+    if payment.status in TERMINAL_STATUSES:
+        return payment
+    payment.status = status
+    payment.reference = reference[:64]
+    payment.failure_reason = error[:255]
+    payment.save(update_fields=['status', 'reference', 'failure_reason', 'updated_at'])
+    if status == 'success':
+        # The slot comes along for the live update the confirmation publishes.
+        booking = Booking.objects.select_for_update(of=('self',)).select_related('slot').get(pk=payment.booking_id)
+        if booking.status == 'pending':
+            booking.status = 'confirmed'
+            booking.save(update_fields=['status'])
+        elif booking.status != 'confirmed':
+            logger.warning('Payment %s succeeded for %s booking %s; it needs a refund', payment.pk, booking.status, booking.pk)
+    return payment
+
+
+def apply_result(payment_id: int, status: str, reference: str = '', error: str = '') -> Payment:
+    """Record a gateway outcome; confirms the booking when the charge succeeded."""
+    with transaction.atomic():
+        return _apply(payment_id, status, reference, error)
+
+
+def apply_results(outcomes) -> None:
+    """apply_result() for many outcomes in one transaction."""
+    with transaction.atomic():
+        for payment_id, status, reference, error in outcomes:
+            try:
+                with transaction.atomic():
+                    _apply(payment_id, status, reference, error)
+            except (Payment.DoesNotExist, PaymentError):
+                logger.warning('Dropping outcome for payment %s', payment_id)
+
+
+def _recharge(payment_id: int, give_up: bool):
+    try:
+        return charge(payment_id)
+    except Exception:
+        logger.exception('Payment %s could not be charged again', payment_id)
+        return (payment_id, 'failed', '', GAVE_UP) if give_up else None
+    finally:
+        if gateway_settings()['ASYNC']:
+            connection.close()
+
+
+def recover_stale(now=None, limit: int = MAX_APPLY_BATCH) -> tuple[int, int]:
+    """Charge again up to ``limit`` payments pending for longer than
+    ``RETRY_AFTER_MINUTES`` and apply the outcomes; a payment the gateway
+    still does not answer fails once it is ``GIVE_UP_AFTER_MINUTES`` old.
+
+    Each payment is retried at most once per ``RETRY_AFTER_MINUTES``.
+    Returns (retried, failed).
+    """
+    conf = gateway_settings()
+    now = now or timezone.now()
+    stale = list(
+        Payment.objects.filter(status='pending', updated_at__lt=now - timedelta(minutes=conf['RETRY_AFTER_MINUTES']))
+        .order_by('updated_at').values_list('pk', 'created_at')[:limit]
+    )
+    if not stale:
+        return 0, 0
+    Payment.objects.filter(pk__in=[pk for pk, _ in stale]).update(updated_at=now)
+    give_up_before = now - timedelta(minutes=conf['GIVE_UP_AFTER_MINUTES'])
+    jobs = [(pk, created_at < give_up_before) for pk, created_at in stale]
+    if conf['ASYNC']:
+        with ThreadPoolExecutor(max_workers=min(conf['WORKERS'], len(jobs)), thread_name_prefix='payments-recovery') as pool:
+            outcomes = list(pool.map(lambda job: _recharge(*job), jobs))
+    else:
+        outcomes = [_recharge(*job) for job in jobs]
+    outcomes = [outcome for outcome in outcomes if outcome is not None]
+    apply_results(outcomes)
+    return len(stale), sum(1 for outcome in outcomes if outcome[3] == GAVE_UP)
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from customer.models import CustomerStats
+from owner import analytics
+from owner.deletion import handlers_muted
+from owner.models import OwnerStats
+from .models import Payment
+
+
+def _add_revenue(payment: Payment, sign: int) -> None:
+    amount = sign * payment.amount
+    OwnerStats.bump(OwnerStats.objects.filter(owner__parking_places__slots__bookings=payment.booking_id), revenue=amount)
+    CustomerStats.bump(CustomerStats.objects.filter(customer__bookings=payment.booking_id), total_spent=amount)
+    analytics.record_payment(payment, sign)
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance: Payment, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_paid = getattr(instance, '_saved_status', None) == 'success'
+    instance._saved_status = instance.status
+    is_paid = instance.status == 'success'
+    if is_paid != was_paid:
+        _add_revenue(instance, 1 if is_paid else -1)
+
+
+@receiver(post_delete, sender=Payment)
+def payment_deleted(sender, instance: Payment, **kwargs):
+    if handlers_muted():
+        return
+    if getattr(instance, '_saved_status', instance.status) == 'success':
+        _add_revenue(instance, -1)
@@ -0,0 +1,143 @@
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from customer.models import Booking
+from customer.services import create_booking
+from customer.sweeper import sweep
+from owner.models import ParkingSlot
+from parkeasy.testing import Budget, QueryBudgetMixin, shared_seed
+from .models import Payment
+from .pipeline import GAVE_UP, recover_stale
+
+
+@override_settings(PAYMENT_GATEWAY={**settings.PAYMENT_GATEWAY, 'ASYNC': False, 'OPTIONS': {'latency': 0}})
+class PaymentViewBudgetTests(QueryBudgetMixin, TestCase):
+    urls_module = 'payment.urls'
+    budgets = {
+        'checkout': Budget(queries=10),
+        'payment_success': Budget(queries=1),
+        'payment_failed': Budget(queries=1),
+        'payment_status': Budget(queries=2),
+        'payment_webhook': Budget(queries=11),
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.customer = self.seed.customer
+
+    def test_checkout(self):
+        self.assertWithinBudget('checkout', user=self.customer, query=f'booking={self.seed.booking.id}')
+
+    def test_checkout_post(self):
+        booking = self.seed.booking
+        with self.captureOnCommitCallbacks(execute=False):
+            self.assertWithinBudget('checkout', user=self.customer, query=f'booking={booking.id}', method='post', status=302, data={
+                'idempotency_key': 'budget-checkout-1',
+            })
+        self.assertTrue(Payment.objects.filter(booking=booking, idempotency_key='budget-checkout-1').exists())
+
+    def test_checkout_charges_the_quoted_price(self):
+        start = timezone.localtime().replace(minute=0, second=0, microsecond=0) + timedelta(days=60)
+        booking = create_booking(self.customer, self.seed.slot.id, start, start + timedelta(hours=2))
+        place = self.seed.slot.place
+        place.price_per_hour *= 3
+        place.save()
+        ParkingSlot.objects.filter(place=place).update(price_per_hour=None)
+        response = self.assertWithinBudget('checkout', user=self.customer, query=f'booking={booking.id}')
+        self.assertEqual(response.context['amount'], booking.amount)
+        with self.captureOnCommitCallbacks(execute=False):
+            self.assertWithinBudget('checkout', user=self.customer, query=f'booking={booking.id}', method='post', status=302, data={
+                'idempotency_key': 'budget-quoted-1',
+            })
+        self.assertEqual(Payment.objects.get(idempotency_key='budget-quoted-1').amount, booking.amount)
+
+    def test_checkout_needs_a_booking_id(self):
+        for value in ('abc', '1.5', ''):
+            self.assertWithinBudget('checkout', user=self.customer, query=f'booking={value}', status=404)
+
+    def test_checkout_paid_booking_redirects(self):
+        booking_id = self.seed.payment.booking_id
+        self.assertWithinBudget('checkout', user=self.customer, query=f'booking={booking_id}', status=302)
+
+    def test_status(self):
+        self.assertWithinBudget('payment_status', args=[self.seed.payment.id], user=self.customer, status=302)
+        pending = Payment.objects.create(booking=self.seed.booking, amount=100, idempotency_key='budget-status')
+        self.assertWithinBudget('payment_status', args=[pending.id], user=self.customer)
+
+    def test_success(self):
+        self.assertWithinBudget('payment_success', user=self.customer)
+
+    def test_failed(self):
+        self.assertWithinBudget('payment_failed', user=self.customer)
+
+    def test_webhook(self):
+        payment = Payment.objects.create(booking=self.seed.booking, amount=100, idempotency_key='budget-webhook')
+        body = json.dumps({'payment': payment.id, 'status': 'success', 'reference': 'ch_1'}).encode()
+        signature = hmac.new(settings.PAYMENT_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+        self.assertWithinBudget(
+            'payment_webhook', method='post', data=body, content_type='application/json',
+            headers={'X-Signature': signature},
+        )
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'success')
+
+    def test_webhook_rejects_bad_signature(self):
+        self.assertWithinBudget(
+            'payment_webhook', method='post', data=b'{}', content_type='application/json',
+            headers={'X-Signature': 'nope'}, status=403,
+        )
+
+
+@override_settings(PAYMENT_GATEWAY={**settings.PAYMENT_GATEWAY, 'ASYNC': False, 'OPTIONS': {'latency': 0}})
+class RecoverStaleTests(TestCase):
+    def setUp(self):
+        self.booking = shared_seed().booking
+        self.now = timezone.now()
+
+    def stale_payment(self, key, minutes):
+        payment = Payment.objects.create(booking=self.booking, amount=100, idempotency_key=key)
+        then = self.now - timedelta(minutes=minutes)
+        Payment.objects.filter(pk=payment.pk).update(created_at=then, updated_at=then)
+        return payment
+
+    def test_charges_stale_payment_again(self):
+        payment = self.stale_payment('recover-1', 10)
+        self.assertEqual(recover_stale(self.now), (1, 0))
+        payment.refresh_from_db()
+        self.booking.refresh_from_db()
+        self.assertEqual(payment.status, 'success')
+        self.assertEqual(self.booking.status, 'confirmed')
+
+    def test_leaves_recent_payment_alone(self):
+        payment = self.stale_payment('recover-2', 1)
+        self.assertEqual(recover_stale(self.now), (0, 0))
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending')
+
+    @mock.patch('payment.pipeline.get_gateway', side_effect=ConnectionError)
+    def test_unreachable_gateway_retries_later(self, _):
+        payment = self.stale_payment('recover-3', 10)
+        self.assertEqual(recover_stale(self.now), (1, 0))
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending')
+        self.assertEqual(payment.updated_at, self.now)
+        # Not retried again until RETRY_AFTER_MINUTES have passed.
+        self.assertEqual(recover_stale(self.now + timedelta(minutes=1)), (0, 0))
+
+    @mock.patch('payment.pipeline.get_gateway', side_effect=ConnectionError)
+    def test_gives_up_and_lets_the_hold_lapse(self, _):
+        payment = self.stale_payment('recover-4', 90)
+        Booking.objects.filter(pk=self.booking.pk).update(created_at=self.now - timedelta(minutes=90))
+        result = sweep(self.now)
+        self.assertEqual((result.payments_retried, result.payments_failed), (1, 1))
+        payment.refresh_from_db()
+        self.booking.refresh_from_db()
+        self.assertEqual((payment.status, payment.failure_reason), ('failed', GAVE_UP))
+        self.assertEqual(self.booking.status, 'expired')
@@ -5,4 +5,6 @@ urlpatterns = [
     path('checkout/', views.checkout, name='checkout'),
     path('success/', views.success, name='payment_success'),
     path('failed/', views.failed, name='payment_failed'),
+    path('<int:payment_id>/status/', views.status, name='payment_status'),
+    path('webhook/', views.webhook, name='payment_webhook'),
 ]
@@ -1,20 +1,80 @@
+import hashlib
+import hmac
+import json
+import uuid
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib import messages
+from django.http import Http404, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from customer.models import Booking
+from customer.services import amount_due
 from .models import Payment
+from .pipeline import PaymentError, apply_result, start_payment
 
 
 @login_required
 def checkout(request):
-    booking_id = request.GET.get('booking')
-    booking = get_object_or_404(Booking, id=booking_id, customer=request.user)
-    amount = 100  # placeholder fixed amount
+    try:
+        booking_id = int(request.GET.get('booking', ''))
+    except ValueError:
+        raise Http404('No such booking.')
+    booking = get_object_or_404(Booking.objects.select_related('slot__place'), id=booking_id, customer=request.user)
+    payment = Payment.objects.filter(booking=booking).first()
+    if payment is not None and payment.status == 'success':
+        return redirect('payment_success')
+    amount = amount_due(booking)
     if request.method == 'POST':
-        payment = Payment.objects.create(booking=booking, amount=amount, status='success')
-        booking.status = 'confirmed'
-        booking.save(update_fields=['status'])
+        key = (request.POST.get('idempotency_key') or '').strip()[:64] or uuid.uuid4().hex
+        try:
+            payment = start_payment(booking.id, request.user, amount, key)
+        except PaymentError as exc:
+            messages.error(request, str(exc))
+            return redirect('payment_failed')
+        return redirect('payment_status', payment_id=payment.id)
+    return render(request, 'payments/checkout.html', {
+        'booking': booking,
+        'amount': amount,
+        # A fresh key per rendered form: re-posting the same form is a no-op.
+        'idempotency_key': uuid.uuid4().hex,
+    })
+
+
+@login_required
+def status(request, payment_id: int):
+    payment = get_object_or_404(Payment, id=payment_id, booking__customer=request.user)
+    if payment.status == 'success':
         return redirect('payment_success')
-    return render(request, 'payments/checkout.html', {'booking': booking, 'amount': amount})
+    if payment.status == 'failed':
+        return render(request, 'payments/failed.html', {'payment': payment})
+    return render(request, 'payments/processing.html', {'payment': payment})
+
+
+@csrf_exempt
+@require_POST
+def webhook(request):
+    """Gateway callback: ``{"payment": id, "status": "success"|"failed",
+    "reference": "...", "error": "..."}`` signed with an HMAC-SHA256 of the
+    body in the ``X-Signature`` header."""
+    secret = settings.PAYMENT_WEBHOOK_SECRET.encode()
+    expected = hmac.new(secret, request.body, hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(expected, request.headers.get('X-Signature', '')):
+        return JsonResponse({'error': 'Invalid signature.'}, status=403)
+    try:
+        event = json.loads(request.body)
+        payment_id = int(event['payment'])
+        payment = apply_result(
+            payment_id, event['status'],
+            reference=str(event.get('reference') or ''), error=str(event.get('error') or ''),
+        )
+    except (ValueError, KeyError, TypeError, PaymentError):
+        return JsonResponse({'error': 'Malformed event.'}, status=400)
+    except Payment.DoesNotExist:
+        return JsonResponse({'error': 'Unknown payment.'}, status=404)
+    return JsonResponse({'payment': payment.id, 'status': payment.status})
 
 
 @login_required